@@ -0,0 +1,189 @@
+# app/binary_history.py
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from decimal import Decimal
+from fractions import Fraction
+from itertools import islice
+from app.calculation import Calculation
+from app.history_io import CSV_COLUMNS, DEFAULT_CHUNK_SIZE, iter_csv_chunks, write_csv
+from app.history_store import OVERFLOW_EXPONENT, pack_decimal, unpack_decimal
+from app.numeric_backends import Interval
+
+# File layout (all integers little-endian):
+#   header   magic, version, sizes, row count, section offsets and the schema
+#   records  row_count fixed-width records, so row i lives at a known offset
+#   ops      the operation name table that record op codes index into
+#   heap     tagged text for values that do not fit a packed record field
+# The ops table and heap offsets form the index; readers map the file and only
+# decode the records they touch.
+MAGIC = b"CALCHIST"
+VERSION = 1
+SCHEMA = ",".join(CSV_COLUMNS).encode()
+HEADER = struct.Struct("<8sHHHHQQQ48s")
+# op code, then (coefficient, exponent) for operand_a, operand_b and result.
+# For values stored in the heap the exponent is OVERFLOW_EXPONENT and the
+# coefficient is the value's offset into the heap.
+RECORD = struct.Struct("<Iqhqhqh")
+_LENGTH = struct.Struct("<I")
+
+_HEAP_TYPES = {
+    Decimal: b"D",
+    int: b"I",
+    float: b"F",
+    Fraction: b"Q",
+    Interval: b"R",
+}
+_HEAP_PARSERS = {
+    b"D": Decimal,
+    b"I": int,
+    b"F": float,
+    b"Q": Fraction,
+    b"R": Interval.parse,
+}
+
+class BinaryHistoryError(ValueError):
+    """Raised when a binary history file is malformed or uses an unsupported version."""
+    pass
+
+def write_binary(file_path: str, calculations, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None) -> int:
+    """Writes calculations to a binary history file and returns the number of rows written."""
+    op_codes = {}
+    heap = bytearray()
+
+    def field(value):
+        packed = pack_decimal(value)
+        if packed is not None:
+            return packed
+        tag = _HEAP_TYPES.get(type(value))
+        if tag is None:
+            raise BinaryHistoryError(f"Cannot store a value of type {type(value).__name__}")
+        offset = len(heap)
+        text = str(value).encode()
+        heap.extend(tag + _LENGTH.pack(len(text)) + text)
+        return offset, OVERFLOW_EXPONENT
+
+    rows_written = 0
+    with open(file_path, "wb") as binary_file:
+        binary_file.write(b"\0" * HEADER.size)
+        iterator = iter(calculations)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            buffer = bytearray()
+            for calc in chunk:
+                code = op_codes.setdefault(calc.operation, len(op_codes))
+                buffer += RECORD.pack(code, *field(calc.a), *field(calc.b), *field(calc.result))
+            binary_file.write(buffer)
+            rows_written += len(chunk)
+            if progress is not None:
+                progress(rows_written)
+
+        ops_offset = binary_file.tell()
+        binary_file.write(_LENGTH.pack(len(op_codes)))
+        for name in op_codes:
+            encoded = name.encode()
+            binary_file.write(_LENGTH.pack(len(encoded)) + encoded)
+        heap_offset = binary_file.tell()
+        binary_file.write(heap)
+
+        binary_file.seek(0)
+        binary_file.write(HEADER.pack(MAGIC, VERSION, HEADER.size, RECORD.size, 0,
+                                      rows_written, ops_offset, heap_offset, SCHEMA))
+    return rows_written
+
+class BinaryHistoryFile(Sequence):
+    """
+    Read-only, memory-mapped access to a binary history file.
+
+    Indexing and range queries decode only the records they touch, so a large
+    file can be inspected without loading it.
+    """
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        with open(file_path, "rb") as binary_file:
+            if os.fstat(binary_file.fileno()).st_size < HEADER.size:
+                raise BinaryHistoryError(f"{self.file_path} is not a binary history file")
+            self._map = mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except BaseException:
+            self._map.close()
+            raise
+
+    def _read_header(self):
+        (magic, version, header_size, record_size, _, self._rows,
+         ops_offset, self._heap_offset, schema) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise BinaryHistoryError(f"{self.file_path} is not a binary history file")
+        if version != VERSION or record_size != RECORD.size:
+            raise BinaryHistoryError(f"Unsupported binary history version {version}")
+        self.schema = schema.rstrip(b"\0").decode().split(",")
+        self._records_offset = header_size
+
+        count, = _LENGTH.unpack_from(self._map, ops_offset)
+        position = ops_offset + _LENGTH.size
+        self.operations = []
+        for _ in range(count):
+            length, = _LENGTH.unpack_from(self._map, position)
+            position += _LENGTH.size
+            self.operations.append(self._map[position:position + length].decode())
+            position += length
+
+    def _value(self, coefficient: int, exponent: int):
+        if exponent != OVERFLOW_EXPONENT:
+            return unpack_decimal(coefficient, exponent)
+        position = self._heap_offset + coefficient
+        tag = self._map[position:position + 1]
+        length, = _LENGTH.unpack_from(self._map, position + 1)
+        start = position + 1 + _LENGTH.size
+        return _HEAP_PARSERS[tag](self._map[start:start + length].decode())
+
+    def _get(self, index: int) -> Calculation:
+        code, a_coef, a_exp, b_coef, b_exp, r_coef, r_exp = RECORD.unpack_from(
+            self._map, self._records_offset + index * RECORD.size)
+        return Calculation(self._value(a_coef, a_exp), self._value(b_coef, b_exp),
+                           self.operations[code], self._value(r_coef, r_exp))
+
+    def __len__(self):
+        return self._rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(self._rows))]
+        if index < 0:
+            index += self._rows
+        if not 0 <= index < self._rows:
+            raise IndexError("history index out of range")
+        return self._get(index)
+
+    def range(self, start: int, stop: int):
+        """Yields the calculations in rows [start, stop)."""
+        for index in range(max(start, 0), min(stop, self._rows)):
+            yield self._get(index)
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def read_binary(file_path: str) -> list:
+    """Reads every calculation from a binary history file."""
+    with BinaryHistoryFile(file_path) as history_file:
+        return list(history_file)
+
+def csv_to_binary(csv_path: str, binary_path: str) -> int:
+    """Converts a CSV history file to the binary format and returns the row count."""
+    rows = (calc for chunk in iter_csv_chunks(csv_path) for calc in chunk)
+    return write_binary(binary_path, rows)
+
+def binary_to_csv(binary_path: str, csv_path: str) -> int:
+    """Converts a binary history file to the CSV layout and returns the row count."""
+    with BinaryHistoryFile(binary_path) as history_file:
+        return write_csv(csv_path, history_file)
@@ -0,0 +1,85 @@
+# app/cache.py
+import decimal
+import threading
+import time
+from collections import OrderedDict
+from app import numeric
+
+class ResultCache:
+    """
+    An LRU cache of operation outcomes with an optional time-to-live.
+
+    Keys include the exact text and type of both operands (Decimal('1') and
+    Decimal('1.0') are cached separately), the active decimal context and the
+    numeric limits of power() and root(), so a cached result is identical to
+    what a fresh computation would return.
+    Failed operations are cached by their error message and replayed as the
+    same error. All methods are safe to call from several threads.
+    """
+    def __init__(self, max_size: int = 1024, ttl: float = None, operations=None, clock=time.monotonic):
+        if max_size < 1:
+            raise ValueError("The cache must hold at least one entry.")
+        self.max_size = max_size
+        self.ttl = ttl or None
+        # None caches every operation; otherwise only the named ones
+        self.operations = frozenset(operations) if operations is not None else None
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def enabled_for(self, operation_name: str) -> bool:
+        return self.operations is None or operation_name in self.operations
+
+    @staticmethod
+    def make_key(operation_name: str, a, b) -> tuple:
+        context = decimal.getcontext()
+        traps = tuple(signal.__name__ for signal, enabled in context.traps.items() if enabled)
+        return (operation_name, type(a), str(a), type(b), str(b),
+                context.prec, context.rounding, context.Emin, context.Emax,
+                context.capitals, context.clamp, traps,
+                numeric.LIMITS.max_exponent, numeric.LIMITS.max_digits)
+
+    def get(self, key):
+        """Returns the cached (is_error, value) outcome for a key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            outcome, expires = entry
+            if expires is not None and self._clock() >= expires:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return outcome
+
+    def put(self, key, is_error: bool, value):
+        """Stores an outcome: a result, or an error message when is_error is True."""
+        expires = self._clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = ((is_error, value), expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -1,12 +1,20 @@
 # app/calculation.py
+import sys
 from decimal import Decimal
 
 class Calculation:
-    """A class to represent a single calculation and its result."""
+    """
+    A class to represent a single calculation and its result.
+    Calculations are not changed once made, so history snapshots share them instead of copying.
+    """
+    # Slots keep each entry compact; a long history holds millions of these.
+    __slots__ = ("a", "b", "operation", "result")
+
     def __init__(self, a: Decimal, b: Decimal, operation: str, result: Decimal):
         self.a = a
         self.b = b
-        self.operation = operation
+        # Interning lets every entry share one copy of each operation name.
+        self.operation = sys.intern(operation) if type(operation) is str else operation
         self.result = result
 
     def __repr__(self):
@@ -1,42 +1,415 @@
 # app/calculator.py
+import threading
+import time
 from decimal import Decimal
 from app.operations import OperationFactory
 from app.calculation import Calculation
 from app.exceptions import OperationError
+from app.dispatcher import AsyncDispatcher
+from app.parallel import ParallelExecutor
+from app.expression import compile_expression
+from app.numeric_backends import auto_backend, get_backend
+from app.metrics import METRICS
+
+# The factory keeps this mapping up to date as operations are registered
+_DISPATCH = OperationFactory.dispatch_table()
 
 class Subject:
-    """The base class for a Subject that can be observed."""
+    """
+    The base class for a Subject that can be observed.
+
+    The observers are kept in a tuple that attach() and detach() replace
+    (copy-on-write), so notifying reads one consistent list without taking a
+    lock and never holds one while an observer runs.
+    """
     def __init__(self):
-        self._observers = []
+        self._observers = ()
+        self._observers_lock = threading.Lock()
+        self._dispatcher = None
 
     def attach(self, observer):
-        if observer not in self._observers:
-            self._observers.append(observer)
+        with self._observers_lock:
+            if observer not in self._observers:
+                self._observers = self._observers + (observer,)
 
     def detach(self, observer):
-        self._observers.remove(observer)
+        with self._observers_lock:
+            observers = list(self._observers)
+            observers.remove(observer)
+            self._observers = tuple(observers)
+
+    def start_async_dispatch(self, max_queue: int = 1024, policy: str = "block"):
+        """Switches to asynchronous notification through a background worker thread."""
+        if self._dispatcher is None:
+            self._dispatcher = AsyncDispatcher(max_queue, policy)
+        return self._dispatcher
 
     def notify(self, calculation: Calculation):
+        if self._dispatcher is not None:
+            self._dispatcher.submit(self._observers, (calculation,))
+            return
         for observer in self._observers:
-            observer.update(calculation)
+            if METRICS.enabled:
+                METRICS.timed("observer_seconds", ("observer", type(observer).__name__), observer.update, calculation)
+            else:
+                observer.update(calculation)
+
+    def notify_batch(self, calculations: list):
+        """Notifies each observer once for a whole batch of calculations."""
+        if not calculations:
+            return
+        if self._dispatcher is not None:
+            self._dispatcher.submit(self._observers, calculations)
+            return
+        for observer in self._observers:
+            if METRICS.enabled:
+                METRICS.timed("observer_seconds", ("observer", type(observer).__name__),
+                              self._deliver_batch, observer, calculations)
+            else:
+                self._deliver_batch(observer, calculations)
+
+    @staticmethod
+    def _deliver_batch(observer, calculations: list):
+        update_batch = getattr(observer, "update_batch", None)
+        if update_batch is not None:
+            update_batch(calculations)
+        else:
+            for calculation in calculations:
+                observer.update(calculation)
+
+    def flush(self):
+        """Waits for pending notifications, then flushes every observer that buffers."""
+        if self._dispatcher is not None:
+            self._dispatcher.flush()
+        for observer in self._observers:
+            flush = getattr(observer, "flush", None)
+            if flush is not None:
+                flush()
+
+    def close(self):
+        """Delivers pending notifications, stops async dispatch and closes the observers."""
+        if self._dispatcher is not None:
+            self._dispatcher.close()
+            self._dispatcher = None
+        for observer in self._observers:
+            close = getattr(observer, "close", None)
+            if close is not None:
+                close()
+
+class BatchResult:
+    """The outcome of a batch: one entry per input row, plus the rows that failed."""
+    def __init__(self, calculations: list, errors: list):
+        # calculations[i] is the Calculation for input row i, or None if that row failed
+        self.calculations = calculations
+        # errors is a list of (row_index, OperationError) pairs in row order
+        self.errors = errors
+
+    @property
+    def succeeded(self) -> list:
+        """Returns the successful calculations in input order."""
+        return [calc for calc in self.calculations if calc is not None]
+
+    def __len__(self):
+        return len(self.calculations)
 
 class Calculator(Subject):
-    """The main calculator class that performs calculations and notifies observers."""
-    def __init__(self):
+    """
+    The main calculator class that performs calculations and notifies observers.
+
+    `backend` selects the numeric backend for the session (see
+    app.numeric_backends): "decimal", "rational", "interval" or "float".
+    Without one, operands are used as they are, except that calculations on
+    ints alone or floats alone run on the integer or float backend.
+    """
+    def __init__(self, cache=None, backend=None):
+        """`cache` is an optional ResultCache consulted before running an operation."""
         super().__init__()
+        self.cache = cache
+        self.backend = get_backend(backend) if backend is not None else None
+        self._parallel = None
+        self._parallel_min_rows = 0
+
+    def start_parallel(self, workers: int = None, chunk_size: int = 256, min_rows: int = 1000):
+        """
+        Runs exact batches of at least `min_rows` rows across `workers` processes.
+        Smaller batches stay in-process, where the pool's startup and pickling
+        costs would outweigh the gain.
+        """
+        if self._parallel is None:
+            self._parallel = ParallelExecutor(workers, chunk_size)
+            self._parallel_min_rows = min_rows
+        return self._parallel
+
+    def close(self):
+        super().close()
+        if self._parallel is not None:
+            self._parallel.close()
+            self._parallel = None
 
-    def calculate(self, a: Decimal, b: Decimal, operation_name: str) -> Calculation:
-        """Performs a calculation and notifies attached observers."""
-        calculation = self._perform_operation(a, b, operation_name)
-        self.notify(calculation)
+    def calculate(self, a: Decimal, b: Decimal, operation_name: str, backend=None,
+                  notify: bool = True) -> Calculation:
+        """Performs a calculation and notifies attached observers. `backend` overrides the session's."""
+        backend = self._choose_backend(backend, (a, b))
+        try:
+            if METRICS.enabled:
+                calculation = self._perform_measured(a, b, operation_name, backend)
+            elif backend is None:
+                calculation = self._perform_operation(a, b, operation_name)
+            else:
+                calculation = self._perform_on_backend(backend, a, b, operation_name)
+        except OperationError as e:
+            # The helpers below raise the operation's own message; it is prefixed once here
+            raise OperationError(f"Error during calculation: {e}") from e
+        if notify:
+            self.notify(calculation)
         return calculation
 
-    def _perform_operation(self, a: Decimal, b: Decimal, operation_name: str) -> Calculation:
-        """Private method to perform the operation logic."""
+    def _choose_backend(self, backend, operands):
+        """Returns the backend for a call: the one given, the session's, or the automatic choice."""
+        if backend is not None:
+            return get_backend(backend)
+        if self.backend is not None:
+            return self.backend
+        if all(type(operand) is Decimal for operand in operands):
+            return None  # The common case: Decimal operands run on the operations directly
+        return auto_backend(operands)
+
+    def evaluate(self, source: str, variables: dict = None, notify: bool = True) -> Calculation:
+        """
+        Evaluates an expression such as "(3 + 4) ^ 2 % 5" and notifies observers once.
+        The whole expression is recorded as a single Calculation whose operation is
+        the expression text and whose operands are those of its outermost operator.
+        """
+        start = time.perf_counter() if METRICS.enabled else None
+        expression = compile_expression(source)
         try:
-            operation_instance = OperationFactory.get_operation(operation_name)
-            result = operation_instance.execute(a, b)
-            return Calculation(a, b, operation_name, result)
+            a, b, result = expression.evaluate_operands(variables)
         except OperationError as e:
-            # Correctly indented block to re-raise the custom error
-            raise OperationError(f"Error during calculation: {e}") from e
\ No newline at end of file
+            if start is not None:
+                METRICS.increment("operation_errors_total")
+            raise OperationError(f"Error during calculation: {e}") from e
+        calculation = Calculation(a, b, expression.source, result)
+        if start is not None:
+            METRICS.observe("operation_seconds", time.perf_counter() - start, ("operation", "eval"))
+        if notify:
+            self.notify(calculation)
+        return calculation
+
+    def calculate_many(self, rows=None, a=None, b=None, operations=None, fast=False,
+                       notify: bool = True, backend=None) -> BatchResult:
+        """
+        Performs a batch of calculations and notifies observers once for the batch.
+
+        Rows are given either as an iterable of (a, b, operation_name) triples or as
+        the columns `a`, `b` and `operations` (a sequence, or one name for every row).
+        Rows are grouped by operation and each group is run in a single pass. Errors
+        are collected per row instead of aborting the batch.
+
+        By default every row keeps exact Decimal semantics. With fast=True,
+        vectorizable operations run over float64 NumPy arrays instead; their
+        results are converted back to Decimal. Once start_parallel() has been
+        called, large exact batches are spread across worker processes; results
+        and errors still come back in input order. With notify=False the caller
+        is responsible for calling notify_batch. `backend` overrides the
+        session's numeric backend; without either, a batch of ints alone or
+        floats alone runs on the integer or float backend.
+        """
+        if rows is not None:
+            rows = list(rows)
+            a_values = [row[0] for row in rows]
+            b_values = [row[1] for row in rows]
+            op_names = [row[2] for row in rows]
+        else:
+            a_values, b_values = list(a), list(b)
+            if len(a_values) != len(b_values):
+                raise ValueError("Operand columns must have the same length.")
+            if isinstance(operations, str):
+                op_names = [operations] * len(a_values)
+            else:
+                op_names = list(operations)
+                if len(op_names) != len(a_values):
+                    raise ValueError("The operations column must match the operand columns.")
+
+        start = time.perf_counter() if METRICS.enabled else None
+        if not fast:
+            backend = self._choose_backend(backend, a_values + b_values) if a_values else None
+        elif backend is not None:
+            raise ValueError("fast=True runs on NumPy floats and cannot be combined with a numeric backend.")
+        if backend is not None:
+            calculations, errors = self._run_on_backend(backend, a_values, b_values, op_names)
+        elif self._parallel is not None and not fast and len(a_values) >= self._parallel_min_rows:
+            calculations, errors = self._run_parallel(a_values, b_values, op_names)
+        else:
+            calculations, errors = self._run_grouped(a_values, b_values, op_names, fast)
+        if start is not None:
+            METRICS.observe("batch_seconds", time.perf_counter() - start)
+            METRICS.increment("batch_rows_total", len(a_values))
+            METRICS.increment("operation_errors_total", len(errors))
+
+        errors.sort(key=lambda error: error[0])
+        result = BatchResult(calculations, errors)
+        if notify:
+            self.notify_batch(result.succeeded)
+        return result
+
+    @staticmethod
+    def _run_exact(execute, name, indices, a_values, b_values, calculations, errors):
+        """Runs one operation group row by row with the operation's own semantics."""
+        for index in indices:
+            a, b = a_values[index], b_values[index]
+            try:
+                calculations[index] = Calculation(a, b, name, execute(a, b))
+            except (OperationError, ArithmeticError) as e:
+                errors.append((index, OperationError(f"Error during calculation: {e}")))
+
+    def _run_grouped(self, a_values, b_values, op_names, fast):
+        """Groups rows by operation and runs each group in a single in-process pass."""
+        groups = {}
+        for index, name in enumerate(op_names):
+            groups.setdefault(name, []).append(index)
+
+        calculations = [None] * len(a_values)
+        errors = []
+        for name, indices in groups.items():
+            try:
+                spec = OperationFactory.get_spec(name)
+            except OperationError as e:
+                error = OperationError(f"Error during calculation: {e}")
+                errors.extend((index, error) for index in indices)
+                continue
+            operation = spec.operation
+            if fast and spec.vectorizable and _numpy_available():
+                self._run_vectorized(operation, name, indices, a_values, b_values, calculations, errors)
+            else:
+                self._run_exact(operation.execute, name, indices, a_values, b_values, calculations, errors)
+        return calculations, errors
+
+    def _run_on_backend(self, backend, a_values, b_values, op_names):
+        """Converts the operands once, then runs each operation group on the backend."""
+        groups = {}
+        for index, name in enumerate(op_names):
+            groups.setdefault(name, []).append(index)
+
+        calculations = [None] * len(a_values)
+        errors = []
+        coerced_a, coerced_b = [None] * len(a_values), [None] * len(b_values)
+        valid = set()
+        for index, (a, b) in enumerate(zip(a_values, b_values)):
+            try:
+                coerced_a[index], coerced_b[index] = backend.coerce(a), backend.coerce(b)
+                valid.add(index)
+            except (OperationError, ArithmeticError, ValueError) as e:
+                errors.append((index, OperationError(f"Error during calculation: {e}")))
+        for name, indices in groups.items():
+            try:
+                execute = backend.executor(name)
+            except OperationError as e:
+                error = OperationError(f"Error during calculation: {e}")
+                errors.extend((index, error) for index in indices if index in valid)
+                continue
+            indices = [index for index in indices if index in valid]
+            self._run_exact(execute, name, indices, coerced_a, coerced_b, calculations, errors)
+        return calculations, errors
+
+    def _run_parallel(self, a_values, b_values, op_names):
+        """Runs every row on the worker pool and rebuilds the results in input order."""
+        outcomes = self._parallel.run(zip(a_values, b_values, op_names))
+        calculations = [None] * len(outcomes)
+        errors = []
+        for index, (is_error, value) in enumerate(outcomes):
+            if is_error:
+                errors.append((index, OperationError(f"Error during calculation: {value}")))
+            else:
+                calculations[index] = Calculation(a_values[index], b_values[index], op_names[index], value)
+        return calculations, errors
+
+    @staticmethod
+    def _run_vectorized(operation, name, indices, a_values, b_values, calculations, errors):
+        """Runs one operation group in a single NumPy pass."""
+        import numpy as np
+        a_array = np.array([a_values[index] for index in indices], dtype=np.float64)
+        b_array = np.array([b_values[index] for index in indices], dtype=np.float64)
+        with np.errstate(all="ignore"):
+            results, invalid = operation.execute_vectorized(a_array, b_array)
+            if operation.domain is not None:
+                # Rows outside the declared domain go through execute() for its error
+                outside = operation.domain.invalid_mask(a_array, b_array)
+                invalid = outside if invalid is None else invalid | outside
+        invalid_rows = set(np.flatnonzero(invalid).tolist()) if invalid is not None else ()
+        # Finite operands with a non-finite result overflowed float64
+        overflow = ~np.isfinite(results) & np.isfinite(a_array) & np.isfinite(b_array)
+        overflow_rows = set(np.flatnonzero(overflow).tolist())
+        for position, index in enumerate(indices):
+            a, b = a_values[index], b_values[index]
+            if position in invalid_rows:
+                # Let the exact implementation produce the proper error (or value)
+                Calculator._run_exact(operation.execute, name, [index], a_values, b_values, calculations, errors)
+            elif position in overflow_rows:
+                errors.append((index, OperationError(
+                    "Error during calculation: the result is out of float range in fast mode.")))
+            else:
+                calculations[index] = Calculation(a, b, name, Decimal(repr(float(results[position]))))
+
+    def _perform_operation(self, a: Decimal, b: Decimal, operation_name: str) -> Calculation:
+        """Private method to perform the operation logic. OperationErrors propagate to calculate()."""
+        execute = _DISPATCH.get(operation_name)
+        if execute is None:
+            raise OperationError(f"Unknown operation: {operation_name}")
+        cache = self.cache
+        if cache is not None and cache.enabled_for(operation_name):
+            return self._perform_cached(cache, execute, a, b, operation_name)
+        return Calculation(a, b, operation_name, execute(a, b))
+
+    def _perform_on_backend(self, backend, a, b, operation_name: str) -> Calculation:
+        """_perform_operation on a numeric backend: converts the operands, then runs its implementation."""
+        try:
+            execute = backend.executor(operation_name)
+            a, b = backend.coerce(a), backend.coerce(b)
+        except (ArithmeticError, ValueError) as e:
+            raise OperationError(str(e)) from e
+        cache = self.cache
+        if cache is not None and cache.enabled_for(operation_name):
+            return self._perform_cached(cache, execute, a, b, operation_name)
+        try:
+            result = execute(a, b)
+        except ArithmeticError as e:
+            raise OperationError(str(e)) from e
+        return Calculation(a, b, operation_name, result)
+
+    def _perform_measured(self, a, b, operation_name: str, backend=None) -> Calculation:
+        """_perform_operation, recording its latency per operation (failures are only counted)."""
+        start = time.perf_counter()
+        try:
+            if backend is None:
+                calculation = self._perform_operation(a, b, operation_name)
+            else:
+                calculation = self._perform_on_backend(backend, a, b, operation_name)
+        except OperationError:
+            METRICS.increment("operation_errors_total")
+            raise
+        METRICS.observe("operation_seconds", time.perf_counter() - start, ("operation", operation_name))
+        return calculation
+
+    @staticmethod
+    def _perform_cached(cache, execute, a, b, operation_name: str) -> Calculation:
+        """Runs an operation through the result cache, replaying cached errors."""
+        key = cache.make_key(operation_name, a, b)
+        outcome = cache.get(key)
+        if outcome is None:
+            try:
+                outcome = (False, execute(a, b))
+            except OperationError as e:
+                outcome = (True, str(e))
+            cache.put(key, *outcome)
+        is_error, value = outcome
+        if is_error:
+            raise OperationError(value)
+        return Calculation(a, b, operation_name, value)
+
+def _numpy_available() -> bool:
+    """Checks whether NumPy can be imported for the fast batch mode."""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
@@ -1,15 +1,34 @@
 # app/calculator_config.py
 import os
-from dotenv import load_dotenv
 
 class Config:
     """A class to manage loading and accessing configuration settings."""
     @staticmethod
     def load():
         """Loads environment variables from a .env file."""
+        from dotenv import load_dotenv
         load_dotenv()
 
     @staticmethod
     def get(variable_name, default_value=None):
         """Gets a configuration variable's value."""
-        return os.getenv(variable_name, default_value)
\ No newline at end of file
+        return os.getenv(variable_name, default_value)
+
+    @staticmethod
+    def get_int(variable_name, default_value=0):
+        """Gets a configuration variable as an integer, falling back to the default."""
+        value = os.getenv(variable_name)
+        if value is None or not value.strip():
+            return default_value
+        try:
+            return int(value)
+        except ValueError:
+            return default_value
+
+    @staticmethod
+    def get_bool(variable_name, default_value=False):
+        """Gets a configuration variable as a boolean ('1', 'true', 'yes', 'on' are true)."""
+        value = os.getenv(variable_name)
+        if value is None or not value.strip():
+            return default_value
+        return value.strip().lower() in ("1", "true", "yes", "on")
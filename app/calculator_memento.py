@@ -1,13 +1,154 @@
 # app/calculator_memento.py
-import copy
+import pickle
+import zlib
+from app.persistent import PersistentVector
 
 class CalculatorMemento:
-    """A Memento to store a snapshot of the calculation history."""
-    def __init__(self, history_state: list):
-        # We use deepcopy to ensure the state is a completely independent clone.
-        # This prevents accidental changes to the stored state.
-        self._state = copy.deepcopy(history_state)
+    """
+    A Memento to store a snapshot of the calculation history.
 
-    def get_state(self) -> list:
+    The state is a PersistentVector, which cannot be changed in place, and
+    Calculations are immutable, so nothing is deep-copied. Given the vector of
+    an earlier snapshot (`base`), how many leading entries are unchanged since
+    (`unchanged`) and which of those were replaced in place (`replaced`), the
+    new snapshot reuses every chunk it does not change. compress() packs the
+    chunks of a snapshot that is unlikely to be needed soon, except those it
+    shares with other snapshots; get_state() unpacks them again.
+    """
+    def __init__(self, history_state, base: PersistentVector = None, unchanged: int = 0, replaced=()):
+        if base is None or isinstance(history_state, PersistentVector):
+            self._state = PersistentVector(history_state)
+        else:
+            unchanged = min(unchanged, len(base), len(history_state))
+            state = base.truncate(unchanged)
+            for position in sorted(replaced):
+                if position < unchanged:
+                    state = state.set(position, history_state[position])
+            self._state = state.extend(history_state[unchanged:])
+        self._packed = None
+        # While compressed: each full chunk in order, or None where it is packed
+        self._layout = None
+
+    def get_state(self) -> PersistentVector:
         """Returns the stored history state."""
-        return self._state
\ No newline at end of file
+        if self._state is None:
+            packed = iter(pickle.loads(zlib.decompress(self._packed)))
+            leaves = [leaf if leaf is not None else next(packed) for leaf in self._layout]
+            self._state = PersistentVector.from_chunks(leaves, next(packed))
+            self._packed = self._layout = None
+        return self._state
+
+    @property
+    def compressed(self) -> bool:
+        return self._state is None
+
+    def chunk_ids(self) -> set:
+        """The ids of the full chunks this snapshot holds in memory."""
+        if self._state is not None:
+            leaves, _ = self._state.chunks()
+        else:
+            leaves = self._layout
+        return {id(leaf) for leaf in leaves if leaf is not None}
+
+    def compress(self, shared=frozenset()):
+        """
+        Packs the chunks whose ids are not in `shared` (see chunk_ids()) into
+        one compressed blob. The chunks in `shared` are kept as they are, so
+        they stay shared with the snapshots that hold them too.
+        """
+        state = self._state
+        if state is not None:
+            leaves, tail = state.chunks()
+            unshared = [leaf for leaf in leaves if id(leaf) not in shared]
+            packed = zlib.compress(pickle.dumps(unshared + [tail], pickle.HIGHEST_PROTOCOL))
+            # get_state() may run meanwhile: the state is only dropped once the packed copy is complete
+            self._layout = [leaf if id(leaf) in shared else None for leaf in leaves]
+            self._packed = packed
+            self._state = None
+
+    def nbytes(self) -> int:
+        """The size of the packed chunks, or 0 while the state is not compressed."""
+        return len(self._packed) if self._packed is not None else 0
+
+# --- Undo/redo log records ---
+# Instead of snapshotting the whole history on every change, the History keeps
+# a log of small, invertible records. Each record knows how to re-apply and
+# revert its own change, so undo and redo cost O(1) per calculation.
+
+class AppendRecord:
+    """Records a single calculation appended to the history."""
+    replaces_all = False
+
+    def __init__(self, calculation):
+        self.calculation = calculation
+
+    def apply(self, calculations: list):
+        calculations.append(self.calculation)
+
+    def revert(self, calculations: list):
+        del calculations[-1]
+
+class ExtendRecord:
+    """Records a group of calculations appended as one undoable step."""
+    replaces_all = False
+
+    def __init__(self, new_calculations: list):
+        self.calculations = list(new_calculations)
+
+    def apply(self, calculations: list):
+        calculations.extend(self.calculations)
+
+    def revert(self, calculations: list):
+        if self.calculations:
+            del calculations[-len(self.calculations):]
+
+class BulkLoadRecord:
+    """Records a wholesale replacement of the history, keeping both states."""
+    replaces_all = True
+
+    def __init__(self, previous: CalculatorMemento, current: CalculatorMemento):
+        self.previous = previous
+        self.current = current
+
+    def apply(self, calculations: list):
+        calculations[:] = self.current.get_state()
+
+    def revert(self, calculations: list):
+        calculations[:] = self.previous.get_state()
+
+class UpdateRecord:
+    """
+    Records calculations replaced in place (a recomputation), keeping both
+    versions of each. `bindings`, if given, is a (mapping, changes) pair:
+    changes maps keys of the mapping to their (old, new) values, which are
+    set along with the calculations (None removes the key).
+    """
+    replaces_all = False
+
+    def __init__(self, calculations, replacements: dict, bindings=None):
+        self.positions = sorted(replacements)
+        self.before = [calculations[position] for position in self.positions]
+        self.after = [replacements[position] for position in self.positions]
+        self.bindings = bindings
+
+    @property
+    def first_position(self):
+        """The first position the record changes, or None if it changes no calculation."""
+        return self.positions[0] if self.positions else None
+
+    def _set(self, calculations: list, values: list, side: int):
+        for position, calculation in zip(self.positions, values):
+            calculations[position] = calculation
+        if self.bindings is not None:
+            mapping, changes = self.bindings
+            for key, pair in changes.items():
+                if pair[side] is None:
+                    mapping.pop(key, None)
+                else:
+                    mapping[key] = pair[side]
+
+    def apply(self, calculations: list):
+        self._set(calculations, self.after, 1)
+
+    def revert(self, calculations: list):
+        self._set(calculations, self.before, 0)
@@ -0,0 +1,107 @@
+# app/dispatcher.py
+import logging
+import threading
+from collections import deque
+from app.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+class AsyncDispatcher:
+    """
+    Delivers observer notifications on a background worker thread.
+
+    Events wait in a bounded queue. When the queue is full, the backpressure
+    policy decides what happens to a new event:
+      - "block": the caller waits until the worker makes room
+      - "drop_oldest": the oldest queued event is discarded
+      - "coalesce": the new calculations are merged into the newest queued
+        event, so observers receive them together through update_batch
+    An observer that raises does not stop the others from being notified.
+    """
+    POLICIES = ("block", "drop_oldest", "coalesce")
+
+    def __init__(self, max_queue: int = 1024, policy: str = "block"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        if max_queue < 1:
+            raise ValueError("The dispatch queue must hold at least one event.")
+        self.max_queue = max_queue
+        self.policy = policy
+        self.dropped = 0
+        self.errors = deque(maxlen=100)
+        self._queue = deque()
+        self._busy = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name="observer-dispatch", daemon=True)
+        self._worker.start()
+
+    def submit(self, observers, calculations):
+        """Queues a notification of `calculations` for each of `observers`."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The dispatcher has been closed.")
+            if len(self._queue) >= self.max_queue:
+                if self.policy == "block":
+                    while len(self._queue) >= self.max_queue and not self._closed:
+                        self._condition.wait()
+                    if self._closed:
+                        raise RuntimeError("The dispatcher has been closed.")
+                elif self.policy == "drop_oldest":
+                    _, oldest = self._queue.popleft()
+                    self.dropped += len(oldest)
+                elif self._queue[-1][0] == observers:
+                    self._queue[-1][1].extend(calculations)
+                    return
+                else:
+                    # Different observers cannot be merged; drop the oldest instead
+                    _, oldest = self._queue.popleft()
+                    self.dropped += len(oldest)
+            self._queue.append((observers, list(calculations)))
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                observers, calculations = self._queue.popleft()
+                self._busy = True
+                self._condition.notify_all()
+            for observer in observers:
+                self._deliver(observer, calculations)
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+    def _deliver(self, observer, calculations):
+        update_batch = getattr(observer, "update_batch", None)
+        if len(calculations) > 1 and update_batch is not None:
+            self._call(observer, update_batch, calculations)
+        else:
+            for calculation in calculations:
+                self._call(observer, observer.update, calculation)
+
+    def _call(self, observer, method, argument):
+        try:
+            if METRICS.enabled:
+                METRICS.timed("observer_seconds", ("observer", type(observer).__name__), method, argument)
+            else:
+                method(argument)
+        except Exception as e:
+            self.errors.append((observer, e))
+            logger.warning("Observer %r failed: %s", observer, e)
+
+    def flush(self, timeout: float = None) -> bool:
+        """Waits until every queued event has been delivered. Returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    def close(self, timeout: float = None):
+        """Delivers everything still queued, then stops the worker thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join(timeout)
@@ -0,0 +1,232 @@
+# app/expression.py
+import decimal
+import re
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from app.exceptions import OperationError, ValidationError
+from app.operations import OperationFactory
+
+# Binary operators, their operation names and precedence (higher binds tighter).
+# '^' is right-associative; everything else is left-associative.
+BINARY_OPERATORS = {
+    '+': ('add', 1),
+    '-': ('subtract', 1),
+    '*': ('multiply', 2),
+    '/': ('divide', 2),
+    '//': ('int_divide', 2),
+    '%': ('modulus', 2),
+    '^': ('power', 4),
+}
+_UNARY_PRECEDENCE = 3
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+      | (?P<op>//|[-+*/%^(),])
+    )""", re.VERBOSE)
+
+def tokenize(source: str) -> list:
+    """Splits an expression into (kind, text) tokens."""
+    tokens = []
+    position = 0
+    source = source.rstrip()
+    while position < len(source):
+        match = _TOKEN.match(source, position)
+        if match is None:
+            raise ValidationError(f"Unexpected character {source[position:].lstrip()[:1]!r} in expression.")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+# --- Parsing: a precedence-climbing parser producing a small tuple-based AST ---
+#   ('num', Decimal) | ('var', name) | ('neg', node) | ('op', name, left, right)
+
+class _Parser:
+    def __init__(self, tokens: list):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self, text=None):
+        kind, value = self.peek()
+        if kind is None or (text is not None and value != text):
+            expected = f"{text!r}" if text is not None else "more input"
+            found = f"{value!r}" if value is not None else "end of expression"
+            raise ValidationError(f"Expected {expected} but found {found}.")
+        self.position += 1
+        return kind, value
+
+    def parse(self):
+        if not self.tokens:
+            raise ValidationError("Empty expression.")
+        node = self.expression(0)
+        if self.position != len(self.tokens):
+            raise ValidationError(f"Unexpected {self.peek()[1]!r} in expression.")
+        return node
+
+    def expression(self, min_precedence: int):
+        left = self.unary()
+        while True:
+            kind, value = self.peek()
+            if kind != 'op' or value not in BINARY_OPERATORS:
+                return left
+            name, precedence = BINARY_OPERATORS[value]
+            if precedence < min_precedence:
+                return left
+            self.take()
+            # Right-associative '^' parses its right side at the same level
+            next_precedence = precedence if value == '^' else precedence + 1
+            right = self.expression(next_precedence)
+            left = ('op', name, left, right)
+
+    def unary(self):
+        kind, value = self.peek()
+        if kind == 'op' and value in ('-', '+'):
+            self.take()
+            operand = self.expression(_UNARY_PRECEDENCE)
+            return ('neg', operand) if value == '-' else operand
+        return self.primary()
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == 'number':
+            try:
+                return ('num', Decimal(value))
+            except InvalidOperation:
+                raise ValidationError(f"Invalid number {value!r}.") from None
+        if kind == 'name':
+            if self.peek()[1] == '(':
+                # Function-call syntax for any registered two-operand operation, e.g. root(27, 3)
+                self.take('(')
+                left = self.expression(0)
+                self.take(',')
+                right = self.expression(0)
+                self.take(')')
+                return ('op', value, left, right)
+            return ('var', value)
+        if value == '(':
+            node = self.expression(0)
+            self.take(')')
+            return node
+        raise ValidationError(f"Unexpected {value!r} in expression.")
+
+def parse(source: str):
+    """Parses an expression into its AST."""
+    return _Parser(tokenize(source)).parse()
+
+# --- Compilation: the AST becomes a tree of closures taking the variable mapping ---
+
+class _Constant:
+    """Marks a compiled node whose value is known at compile time."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+def _compile(node):
+    """Returns (function, constant) where constant is a _Constant if the node folds."""
+    kind = node[0]
+    if kind == 'num':
+        value = node[1]
+        return (lambda env: value), _Constant(value)
+    if kind == 'var':
+        name = node[1]
+
+        def variable(env):
+            try:
+                return env[name]
+            except KeyError:
+                raise OperationError(f"Unknown variable: {name}") from None
+        return variable, None
+    if kind == 'neg':
+        operand, constant = _compile(node[1])
+        if constant is not None:
+            value = -constant.value
+            return (lambda env: value), _Constant(value)
+        return (lambda env: -operand(env)), None
+
+    _, name, left_node, right_node = node
+    return _combine(name, _compile(left_node), _compile(right_node))
+
+def _combine(name, left_compiled, right_compiled):
+    """Compiles operation `name` over two compiled operands; returns (function, constant)."""
+    try:
+        execute = OperationFactory.get_spec(name).execute
+    except OperationError:
+        raise ValidationError(f"Unknown operation: {name}") from None
+    left, left_constant = left_compiled
+    right, right_constant = right_compiled
+    if left_constant is not None and right_constant is not None:
+        try:
+            value = execute(left_constant.value, right_constant.value)
+        except (OperationError, ArithmeticError):
+            # Leave failing subexpressions to raise when the expression is evaluated
+            pass
+        else:
+            return (lambda env: value), _Constant(value)
+    return (lambda env: execute(left(env), right(env))), None
+
+def _variables(node, found):
+    if node[0] == 'var':
+        found.add(node[1])
+    elif node[0] == 'neg':
+        _variables(node[1], found)
+    elif node[0] == 'op':
+        _variables(node[2], found)
+        _variables(node[3], found)
+    return found
+
+class CompiledExpression:
+    """A parsed expression compiled to a reusable closure tree."""
+    def __init__(self, source: str, tree):
+        self.source = source
+        self.variables = frozenset(_variables(tree, set()))
+        if tree[0] == 'op':
+            # Keep the top-level operands separate so they can be recorded in the history;
+            # each is compiled once and the root is built over them
+            left, right = _compile(tree[2]), _compile(tree[3])
+            _, constant = _combine(tree[1], left, right)
+            self.operation = tree[1]
+            self._execute = OperationFactory.get_spec(tree[1]).execute
+            self._left, self._right = left[0], right[0]
+        else:
+            function, constant = _compile(tree)
+            self.operation = None
+            self._left = function
+        self.constant = constant.value if constant is not None else None
+
+    def evaluate_operands(self, variables: dict = None) -> tuple:
+        """Returns (a, b, result): the top-level operands and the value of the expression."""
+        env = variables or {}
+        a = self._left(env)
+        if self.operation is None:
+            return a, Decimal(0), a
+        b = self._right(env)
+        result = self.constant if self.constant is not None else self._execute(a, b)
+        return a, b, result
+
+    def evaluate(self, variables: dict = None):
+        """Returns the value of the expression."""
+        if self.constant is not None:
+            return self.constant
+        return self.evaluate_operands(variables)[2]
+
+def _context_key() -> tuple:
+    context = decimal.getcontext()
+    return (context.prec, context.rounding, context.Emin, context.Emax, context.clamp)
+
+@lru_cache(maxsize=512)
+def _compile_cached(source: str, context_key: tuple) -> CompiledExpression:
+    return CompiledExpression(source, parse(source))
+
+def compile_expression(source: str) -> CompiledExpression:
+    """
+    Compiles an expression such as "(3 + 4) ^ 2 % 5".
+    Compiled expressions are cached by source text (and decimal context, since
+    constant subexpressions are folded at compile time).
+    """
+    return _compile_cached(" ".join(source.split()), _context_key())
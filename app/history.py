@@ -1,87 +1,351 @@
 # app/history.py
-import pandas as pd
-from decimal import Decimal
+import itertools
+import sys
+import threading
+import time
+import weakref
+from collections.abc import Sequence
 from app.calculation import Calculation
-from app.calculator_memento import CalculatorMemento
+from app.storage import STORAGE_BACKENDS, get_backend
+from app.history_store import ColumnarHistoryStore
+from app.segment_store import SegmentedHistoryStore
+from app.history_index import HistoryIndex
+from app.metrics import METRICS
+from app.calculator_memento import CalculatorMemento, AppendRecord, ExtendRecord, BulkLoadRecord, UpdateRecord
+
+class ChangeCursor:
+    """
+    Tracks how many leading history entries are unchanged since a consumer last synced.
+    With track_replaced=True, entries replaced in place are collected in
+    `replaced` instead of lowering `stable`.
+    """
+    def __init__(self, stable: int = 0, track_replaced: bool = False):
+        self.stable = stable
+        self.replaced = set() if track_replaced else None
+
+class StepTimeline(Sequence):
+    """A read-only view of the undo stack followed by the redo stack in redo order."""
+    def __init__(self, undo_stack: list, redo_stack: list):
+        self._undo = undo_stack
+        self._redo = redo_stack
+
+    def __len__(self):
+        return len(self._undo) + len(self._redo)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("step index out of range")
+        if index < len(self._undo):
+            return self._undo[index]
+        return self._redo[len(self) - 1 - index]
 
 class History:
-    """The Caretaker class that manages the history of calculations and mementos."""
-    def __init__(self):
-        """Initializes the history, creating a memento of the initial empty state."""
-        self.calculations = []
-        self._undo_stack = [self.create_memento()] # Start with a memento of the empty list
+    """
+    The Caretaker class that manages the history of calculations and mementos.
+
+    Every change (add, undo, redo, restore, load) happens under `lock`, an
+    RLock, so a History can be shared by several threads: each change is
+    atomic and snapshot() returns a consistent copy. Hold `lock` yourself to
+    read several attributes consistently.
+    """
+    BACKENDS = ("list", "columnar")
+
+    def __init__(self, backend: str = "list", verbose: bool = True, max_in_memory: int = 0,
+                 max_bytes: int = 0, max_undo_depth: int = 0, spill_dir: str = None,
+                 compress_after: int = 0):
+        """
+        Initializes an empty history with empty undo/redo logs.
+        The "columnar" backend packs entries into arrays to save memory;
+        `calculations` behaves like a list with either backend.
+        With verbose=False the status messages are not printed.
+
+        Retention limits (0 = unlimited): past `max_in_memory` entries or an
+        estimated `max_bytes`, older entries spill to disk and are read back
+        on demand (see app.segment_store); at most `max_undo_depth` steps can
+        be undone, older steps are forgotten. Mementos held by steps more than
+        `compress_after` steps back in the undo log are compressed.
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown history backend: {backend}")
+        self.backend = backend
+        self.max_in_memory = max_in_memory
+        self.max_bytes = max_bytes
+        self.max_undo_depth = max_undo_depth
+        self.spill_dir = spill_dir
+        self.compress_after = compress_after
+        self.evicted_steps = 0
+        self.calculations = self._new_store()
+        # The undo/redo stacks hold small delta records rather than full snapshots,
+        # so every change costs O(1) regardless of how long the history is.
+        self._undo_stack = []
         self._redo_stack = []
+        self._cursors = weakref.WeakSet()
+        self.verbose = verbose
+        self.index = None
+        self.lock = threading.RLock()
+        # The newest memento's state, for the next one to share its chunks with
+        self._last_snapshot = None
+        self._snapshot_cursor = self.track_changes(track_replaced=True)
+
+    def _new_store(self):
+        chunk_factory = ColumnarHistoryStore if self.backend == "columnar" else list
+        if self.max_in_memory or self.max_bytes:
+            return SegmentedHistoryStore(max_in_memory=self.max_in_memory, max_bytes=self.max_bytes,
+                                         spill_dir=self.spill_dir, chunk_factory=chunk_factory)
+        return chunk_factory()
+
+    def _report(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def track_changes(self, track_replaced: bool = False) -> ChangeCursor:
+        """Returns a cursor whose `stable` count drops whenever existing entries are removed or replaced."""
+        with self.lock:
+            cursor = ChangeCursor(len(self.calculations), track_replaced)
+            self._cursors.add(cursor)
+            return cursor
+
+    def snapshot(self) -> list:
+        """Returns a copy of the calculations as they are at one instant."""
+        with self.lock:
+            return list(self.calculations)
+
+    def _changed_from(self, position: int, record=None):
+        """
+        Lowers every cursor that still considers entries at or after `position`
+        unchanged. Cursors tracking replaced entries note the positions of an
+        in-place update (`record`) instead.
+        """
+        replaced = record.positions if isinstance(record, UpdateRecord) else None
+        for cursor in self._cursors:
+            if replaced is not None and cursor.replaced is not None:
+                cursor.replaced.update(p for p in replaced if p < cursor.stable)
+            elif position < cursor.stable:
+                cursor.stable = position
+
+    def enable_index(self) -> HistoryIndex:
+        """Starts maintaining query indexes (see app.history_index) and returns them."""
+        with self.lock:
+            if self.index is None:
+                self.index = HistoryIndex(self)
+            return self.index
+
+    def _sync_index(self):
+        if self.index is not None:
+            self.index.sync()
+
+    def query(self, **filters) -> list:
+        """Returns the calculations matching HistoryIndex.query() filters, in history order."""
+        with self.lock:
+            index = self.enable_index()
+            return [self.calculations[position] for position in index.query(**filters)]
+
+    def _change_position(self, record) -> int:
+        """The first position a record changes: 0 for a replacement, the end of the history for appends."""
+        if record.replaces_all:
+            return 0
+        if isinstance(record, UpdateRecord) and record.first_position is not None:
+            return record.first_position
+        return len(self.calculations)
+
+    def _record(self, record):
+        """Applies a record to the history and pushes it onto the undo log."""
+        start = time.perf_counter() if METRICS.enabled else None
+        with self.lock:
+            position = self._change_position(record)
+            record.apply(self.calculations)
+            self._changed_from(position, record)
+            self._redo_stack.clear()
+            self._undo_stack.append(record)
+            if self.max_undo_depth and len(self._undo_stack) > self.max_undo_depth:
+                # The oldest step (and any memento it holds) can no longer be undone
+                del self._undo_stack[0]
+                self.evicted_steps += 1
+            cold = None
+            if self.compress_after and len(self._undo_stack) > self.compress_after:
+                cold = self._undo_stack[-self.compress_after - 1]
+                if cold.replaces_all and not (cold.previous.compressed and cold.current.compressed):
+                    shared = self._snapshot_chunk_ids(cold)
+                else:
+                    cold = None
+            self._sync_index()
+        if cold is not None:
+            # Mementos cannot change, so they are packed after the lock is released
+            self._compress_step(cold, shared)
+        if start is not None:
+            METRICS.observe("history_record_seconds", time.perf_counter() - start)
+
+    @staticmethod
+    def _compress_step(record, shared: set):
+        """
+        Compresses the mementos of a step that has gone cold. Only the chunks
+        that no neighbouring snapshot holds (their ids are not in `shared`,
+        nor in the other memento of the step) are packed: the rest stay shared.
+        """
+        record.previous.compress(shared | record.current.chunk_ids())
+        record.current.compress(shared | record.previous.chunk_ids())
+
+    def _snapshot_chunk_ids(self, excluded) -> set:
+        """The ids of the chunks held by the newest snapshot and by every memento in the undo log but `excluded`'s."""
+        shared = set()
+        newest = self._last_snapshot() if self._last_snapshot is not None else None
+        if newest is not None:
+            shared.update(id(leaf) for leaf in newest.chunks()[0])
+        for record in itertools.chain(self._undo_stack, self._redo_stack):
+            if record.replaces_all and record is not excluded:
+                shared |= record.previous.chunk_ids() | record.current.chunk_ids()
+        return shared
+
+    def memory_bytes(self) -> int:
+        """Estimates the memory held by the calculation entries (not the undo log)."""
+        calculations = self.calculations
+        if isinstance(calculations, (ColumnarHistoryStore, SegmentedHistoryStore)):
+            return calculations.nbytes()
+        size = sys.getsizeof(calculations)
+        for calc in calculations:
+            size += (sys.getsizeof(calc) + sys.getsizeof(calc.a)
+                     + sys.getsizeof(calc.b) + sys.getsizeof(calc.result))
+        return size
+
+    def metrics(self) -> list:
+        """Gauge readings for the metrics registry (see app.metrics.Metrics.add_collector)."""
+        readings = [
+            ("history_entries", None, len(self.calculations)),
+            ("history_memory_bytes", None, self.memory_bytes()),
+            ("history_undo_depth", None, len(self._undo_stack)),
+            ("history_undo_evictions", None, self.evicted_steps),
+        ]
+        if isinstance(self.calculations, SegmentedHistoryStore):
+            stats = self.calculations.stats()
+            readings += [
+                ("history_spilled_entries", None, stats["spilled"]),
+                ("history_spill_segments", None, stats["segments"]),
+                ("history_spill_bytes", None, stats["disk_bytes"]),
+                ("history_spills", None, stats["spills"]),
+                ("history_page_ins", None, stats["page_ins"]),
+            ]
+        return readings
 
     def add_calculation(self, calculation: Calculation):
-        """Adds a new calculation to the history and saves a memento."""
-        self.calculations.append(calculation)
-        self._redo_stack.clear()
-        self._undo_stack.append(self.create_memento())
+        """Adds a new calculation to the history and records it for undo."""
+        self._record(AppendRecord(calculation))
+
+    def add_calculations(self, calculations: list):
+        """Adds a batch of calculations as a single undoable step."""
+        if calculations:
+            self._record(ExtendRecord(calculations))
+
+    def replace_calculations(self, replacements: dict, bindings=None):
+        """
+        Replaces entries in place as a single undoable step. `replacements`
+        maps positions to new calculations; `bindings` is passed on to
+        UpdateRecord, for state that must be undone along with them.
+        """
+        with self.lock:
+            self._record(UpdateRecord(self.calculations, replacements, bindings))
+
+    def timeline(self) -> tuple:
+        """
+        Returns (steps, applied): every undoable step, oldest first, including
+        the ones that can be redone, and how many of them are applied.
+        """
+        with self.lock:
+            return StepTimeline(self._undo_stack, self._redo_stack), len(self._undo_stack)
 
     def create_memento(self) -> CalculatorMemento:
-        """Creates a memento of the current calculation list."""
-        return CalculatorMemento(self.calculations)
+        """
+        Creates a memento of the current calculation list. It shares the chunks
+        of the entries that are unchanged since the previous memento, so taking
+        one after a few changes costs O(changes * log n), not a copy.
+        """
+        with self.lock:
+            cursor = self._snapshot_cursor
+            base = self._last_snapshot() if self._last_snapshot is not None else None
+            memento = CalculatorMemento(self.calculations, base=base, unchanged=cursor.stable,
+                                        replaced=cursor.replaced)
+            self._last_snapshot = weakref.ref(memento.get_state())
+            cursor.stable = len(self.calculations)
+            cursor.replaced.clear()
+            return memento
 
     def restore_from_memento(self, memento: CalculatorMemento):
-        """Restores the calculation list from a memento."""
-        self.calculations = memento.get_state()
-
-    def undo(self):
-        """Performs an undo operation."""
-        if len(self._undo_stack) <= 1:
-            print("Nothing to undo.")
-            return
-
-        self._redo_stack.append(self._undo_stack.pop())
-        self.restore_from_memento(self._undo_stack[-1])
-        print("Last calculation undone.")
-
-    def redo(self):
-        """Performs a redo operation."""
-        if not self._redo_stack:
-            print("Nothing to redo.")
-            return
-
-        memento_to_restore = self._redo_stack.pop()
-        self._undo_stack.append(memento_to_restore)
-        self.restore_from_memento(memento_to_restore)
-        print("Last calculation redone.")
-
-    def save_history(self, file_path: str):
-        """Saves the current calculation history to a CSV file."""
-        if not self.calculations:
-            print("History is empty. Nothing to save.")
-            return
-        
-        history_list = [{
-            'operand_a': calc.a, 
-            'operand_b': calc.b, 
-            'operation': calc.operation, 
-            'result': calc.result
-        } for calc in self.calculations]
-        
-        df = pd.DataFrame(history_list)
-        df.to_csv(file_path, index=False)
-        print(f"History successfully saved to {file_path}")
-
-    def load_history(self, file_path: str):
-        """Loads calculation history from a CSV file."""
+        """Restores the calculation list from a memento as an undoable step."""
+        with self.lock:
+            self._record(BulkLoadRecord(self.create_memento(), memento))
+            # The history now holds exactly the memento's state: the next snapshot can share it
+            self._last_snapshot = weakref.ref(memento.get_state())
+            self._snapshot_cursor.stable = len(self.calculations)
+            self._snapshot_cursor.replaced.clear()
+
+    def undo(self) -> bool:
+        """Performs an undo operation. Returns False if there was nothing to undo."""
+        with self.lock:
+            if not self._undo_stack:
+                self._report("Nothing to undo.")
+                return False
+
+            record = self._undo_stack.pop()
+            record.revert(self.calculations)
+            self._changed_from(self._change_position(record), record)
+            self._redo_stack.append(record)
+            self._sync_index()
+        self._report("Last calculation undone.")
+        return True
+
+    def redo(self) -> bool:
+        """Performs a redo operation. Returns False if there was nothing to redo."""
+        with self.lock:
+            if not self._redo_stack:
+                self._report("Nothing to redo.")
+                return False
+
+            record = self._redo_stack.pop()
+            position = self._change_position(record)
+            record.apply(self.calculations)
+            self._changed_from(position, record)
+            self._undo_stack.append(record)
+            self._sync_index()
+        self._report("Last calculation redone.")
+        return True
+
+    FILE_FORMATS = tuple(STORAGE_BACKENDS)
+
+    def save_history(self, file_path: str, progress=None, file_format: str = "csv"):
+        """
+        Saves the current calculation history, streaming it in chunks.
+        `file_format` is "csv", "binary" (see app.binary_history) or "sqlite",
+        which also keeps the undo/redo steps (see app.storage). Changes from
+        other threads wait until the save is complete.
+        """
+        backend = get_backend(file_format)
+        with self.lock:
+            if not self.calculations:
+                self._report("History is empty. Nothing to save.")
+                return
+            backend.save(file_path, self, progress=progress)
+        self._report(f"History successfully saved to {file_path}")
+
+    def load_history(self, file_path: str, progress=None, file_format: str = "csv"):
+        """
+        Loads calculation history from a file, streaming it in chunks.
+        The current history is only replaced once the whole file has been read.
+        """
         try:
-            df = pd.read_csv(file_path)
-            self.calculations.clear()
-            for index, row in df.iterrows():
-                calc = Calculation(
-                    Decimal(str(row['operand_a'])),
-                    Decimal(str(row['operand_b'])),
-                    row['operation'],
-                    Decimal(str(row['result']))
-                )
-                self.calculations.append(calc)
-            # After loading, save an initial state for undo/redo to work correctly
-            self._undo_stack = [self.create_memento()]
-            self._redo_stack.clear()
-            print(f"History successfully loaded from {file_path}")
+            loaded = self._new_store()
+            undo_stack, redo_stack = get_backend(file_format).load(file_path, loaded, progress=progress)
+            with self.lock:
+                self.calculations = loaded
+                self._changed_from(0)
+                # The loaded state becomes the new baseline unless the file kept the undo/redo steps
+                self._undo_stack[:] = undo_stack
+                self._redo_stack[:] = redo_stack
+                self._sync_index()
+            self._report(f"History successfully loaded from {file_path}")
         except FileNotFoundError:
-            print(f"Error: No history file found at {file_path}")
+            self._report(f"Error: No history file found at {file_path}")
         except Exception as e:
-            print(f"An error occurred while loading history: {e}")
\ No newline at end of file
+            self._report(f"An error occurred while loading history: {e}")
@@ -0,0 +1,343 @@
+# app/history_index.py
+import decimal
+import functools
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from app.numeric_backends import as_decimal
+
+# Exact arithmetic for the running sums: additions and the subtractions made
+# on undo never round, so the sums always match a fresh total.
+_EXACT = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN, traps=[])
+
+def _synced(method):
+    """Runs a query under the history's lock, on indexes brought up to date first."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.history.lock:
+            self._sync()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class SortedKeys:
+    """
+    A sorted collection of keys stored as a list of blocks, so an insert or a
+    removal shifts at most one block instead of the whole collection.
+    """
+    BLOCK = 512
+
+    def __init__(self, keys=()):
+        self._blocks = []
+        self._maxes = []
+        self._len = 0
+        if keys:
+            self._rebuild(sorted(keys))
+
+    def _rebuild(self, ordered: list):
+        self._blocks = [ordered[i:i + self.BLOCK] for i in range(0, len(ordered), self.BLOCK)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._len = len(ordered)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from block
+
+    def add(self, key):
+        self._len += 1
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._blocks[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._blocks[i], key)
+        block = self._blocks[i]
+        if len(block) > 2 * self.BLOCK:
+            self._blocks[i:i + 1] = [block[:self.BLOCK], block[self.BLOCK:]]
+            self._maxes[i:i + 1] = [block[self.BLOCK - 1], block[-1]]
+
+    def update(self, keys: list):
+        """Adds many keys; large batches are merged with one sort instead of one insert each."""
+        if len(keys) > max(self._len, self.BLOCK):
+            self._rebuild(sorted([*self, *keys]))
+        else:
+            for key in keys:
+                self.add(key)
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        block = self._blocks[i] if i < len(self._blocks) else None
+        j = bisect_left(block, key) if block is not None else 0
+        if block is None or j == len(block) or block[j] != key:
+            raise KeyError(key)
+        del block[j]
+        self._len -= 1
+        if block:
+            self._maxes[i] = block[-1]
+        else:
+            del self._blocks[i]
+            del self._maxes[i]
+
+    def _rank(self, key, right: bool = False) -> int:
+        """Returns how many keys are below `key` (or at most `key` when right=True)."""
+        find = bisect_right if right else bisect_left
+        i = find(self._maxes, key)
+        if i == len(self._blocks):
+            return self._len
+        return sum(len(block) for block in self._blocks[:i]) + find(self._blocks[i], key)
+
+    def count(self, low=None, high=None) -> int:
+        """Returns the number of keys k with low <= k <= high."""
+        start = 0 if low is None else self._rank(low)
+        end = self._len if high is None else self._rank(high, right=True)
+        return max(end - start, 0)
+
+    def irange(self, low=None, high=None, reverse: bool = False):
+        """Yields the keys k with low <= k <= high (either bound may be None) in order."""
+        if reverse:
+            start = len(self._blocks) - 1 if high is None else min(bisect_left(self._maxes, high), len(self._blocks) - 1)
+            for i in range(start, -1, -1):
+                block = self._blocks[i]
+                end = len(block) if high is None else bisect_right(block, high)
+                for j in range(end - 1, -1, -1):
+                    if low is not None and block[j] < low:
+                        return
+                    yield block[j]
+        else:
+            start = 0 if low is None else bisect_left(self._maxes, low)
+            for i in range(start, len(self._blocks)):
+                block = self._blocks[i]
+                begin = 0 if low is None else bisect_left(block, low)
+                for j in range(begin, len(block)):
+                    if high is not None and block[j] > high:
+                        return
+                    yield block[j]
+
+class HistoryIndex:
+    """
+    Secondary indexes over a History, kept up to date as entries are added,
+    undone and redone:
+      - the positions of each operation (ascending arrays)
+      - every comparable result, sorted as (result, position) keys
+      - the time each entry entered the history (non-decreasing, so searchable)
+      - an exact running count and sum of results per operation
+    Changes are applied incrementally through a ChangeCursor: entries that
+    disappear from the end are removed from the indexes, new ones are added,
+    and entries replaced in place are updated where they are. An entry
+    replaced in place keeps the time its position was filled, and so does a
+    re-indexed entry (after a load or a restore) with the same operation and
+    result as before, as long as the times stay in order.
+    """
+    def __init__(self, history, clock=time.time):
+        self.history = history
+        self._clock = clock
+        self._cursor = history.track_changes(track_replaced=True)
+        self._cursor.stable = 0
+        self._clear()
+        self.sync()
+
+    def _clear(self):
+        self._op_names = []
+        self._op_codes = {}
+        self._entry_ops = array('I')
+        self._results = []
+        self._timestamps = array('d')
+        self._positions = {}
+        self._sorted = SortedKeys()
+        self._counts = {}
+        self._sums = {}
+
+    def __len__(self):
+        return len(self._results)
+
+    # --- Maintenance ---
+
+    def sync(self):
+        """Brings the indexes up to date with the history."""
+        with self.history.lock:
+            self._sync()
+
+    def _sync(self):
+        calculations = self.history.calculations
+        stable = min(self._cursor.stable, len(self._results))
+        for position in sorted(self._cursor.replaced):
+            if position < stable:
+                self._replace(position, calculations[position])
+        self._cursor.replaced.clear()
+        # The entries about to be re-indexed keep their times if they come back unchanged
+        previous = (self._op_names, self._entry_ops[stable:], self._results[stable:], self._timestamps[stable:])
+        if stable == 0:
+            # Everything was replaced (a load or a memento restore): rebuild in one pass
+            self._clear()
+        elif stable < len(self._results):
+            self._truncate(stable)
+        if len(self._results) < len(calculations):
+            self._extend(calculations, len(self._results), previous)
+        self._cursor.stable = len(self._results)
+
+    def _truncate(self, position: int):
+        for index in range(len(self._results) - 1, position - 1, -1):
+            code = self._entry_ops[index]
+            name = self._op_names[code]
+            result = self._results[index]
+            positions = self._positions[name]
+            positions.pop()  # The entries being removed are always the newest ones
+            self._counts[name] -= 1
+            self._sums[name] = _EXACT.subtract(self._sums[name], result)
+            if not result.is_nan():
+                self._sorted.remove((result, index))
+        del self._entry_ops[position:]
+        del self._results[position:]
+        del self._timestamps[position:]
+
+    def _code(self, name: str) -> int:
+        code = self._op_codes.get(name)
+        if code is None:
+            code = self._op_codes[name] = len(self._op_names)
+            self._op_names.append(name)
+            self._positions[name] = array('q')
+            self._counts[name] = 0
+            self._sums[name] = decimal.Decimal(0)
+        return code
+
+    @staticmethod
+    def _result(calculation) -> decimal.Decimal:
+        result = calculation.result
+        if type(result) is not decimal.Decimal:
+            # Results of the other numeric backends are indexed by their Decimal value
+            result = as_decimal(result)
+        return result
+
+    def _extend(self, calculations, start: int, previous=None):
+        """Indexes the entries from `start` on. `previous` holds what was indexed there before, see _sync()."""
+        now = self._clock()
+        old_names, old_ops, old_results, old_times = previous if previous is not None else ((), (), (), ())
+        keys = []
+        for index in range(start, len(calculations)):
+            calculation = calculations[index]
+            name = calculation.operation
+            code = self._code(name)
+            result = self._result(calculation)
+            timestamp = now
+            offset = index - start
+            if offset < len(old_times) and old_names[old_ops[offset]] == name and old_results[offset] == result:
+                if not self._timestamps or old_times[offset] >= self._timestamps[-1]:
+                    timestamp = old_times[offset]
+            self._entry_ops.append(code)
+            self._results.append(result)
+            self._timestamps.append(timestamp)
+            self._positions[name].append(index)
+            self._counts[name] += 1
+            self._sums[name] = _EXACT.add(self._sums[name], result)
+            if not result.is_nan():
+                keys.append((result, index))
+        self._sorted.update(keys)
+
+    def _replace(self, position: int, calculation):
+        """Re-indexes an entry replaced in place; its time stays."""
+        name = self._op_names[self._entry_ops[position]]
+        result = self._results[position]
+        positions = self._positions[name]
+        del positions[bisect_left(positions, position)]
+        self._counts[name] -= 1
+        self._sums[name] = _EXACT.subtract(self._sums[name], result)
+        if not result.is_nan():
+            self._sorted.remove((result, position))
+
+        name = calculation.operation
+        code = self._code(name)
+        result = self._result(calculation)
+        positions = self._positions[name]
+        positions.insert(bisect_left(positions, position), position)
+        self._counts[name] += 1
+        self._sums[name] = _EXACT.add(self._sums[name], result)
+        if not result.is_nan():
+            self._sorted.add((result, position))
+        self._entry_ops[position] = code
+        self._results[position] = result
+
+    # --- Queries ---
+
+    def operations(self) -> list:
+        return [name for name in self._op_names if self._counts[name]]
+
+    def timestamp(self, position: int) -> float:
+        return self._timestamps[position]
+
+    def _time_window(self, since, until) -> tuple:
+        low = 0 if since is None else bisect_left(self._timestamps, since)
+        high = len(self._timestamps) if until is None else bisect_right(self._timestamps, until)
+        return low, high
+
+    @_synced
+    def query(self, operation: str = None, min_result=None, max_result=None,
+              since: float = None, until: float = None, limit: int = None) -> list:
+        """
+        Returns the positions of matching entries in history order (the newest
+        `limit` when limit is given). Time bounds are epoch seconds; result
+        bounds are inclusive.
+        """
+        low, high = self._time_window(since, until)
+        candidates = range(low, high)
+        if operation is not None:
+            positions = self._positions.get(operation, array('q'))
+            candidates = positions[bisect_left(positions, low):bisect_left(positions, high)]
+        if min_result is not None or max_result is not None:
+            low_key = (min_result, -1) if min_result is not None else None
+            high_key = (max_result, len(self._results)) if max_result is not None else None
+            # Walk whichever is smaller: the result range or the candidates so far
+            if self._sorted.count(low_key, high_key) < len(candidates):
+                code = self._op_codes.get(operation)
+                candidates = sorted(
+                    p for _, p in self._sorted.irange(low_key, high_key)
+                    if low <= p < high and (operation is None or self._entry_ops[p] == code)
+                )
+            else:
+                candidates = [p for p in candidates if self._in_range(self._results[p], min_result, max_result)]
+        if limit is not None:
+            candidates = candidates[max(len(candidates) - limit, 0):]
+        return list(candidates)
+
+    @staticmethod
+    def _in_range(result, min_result, max_result) -> bool:
+        if result.is_nan():
+            return False
+        return (min_result is None or result >= min_result) and (max_result is None or result <= max_result)
+
+    @_synced
+    def top(self, n: int, operation: str = None, smallest: bool = False) -> list:
+        """Returns the positions of the n largest (or smallest) results, best first."""
+        found = []
+        code = self._op_codes.get(operation) if operation is not None else None
+        if n <= 0 or (operation is not None and code is None):
+            return found
+        for _, position in self._sorted.irange(reverse=not smallest):
+            if code is None or self._entry_ops[position] == code:
+                found.append(position)
+                if len(found) == n:
+                    break
+        return found
+
+    @_synced
+    def aggregates(self, operation: str = None) -> dict:
+        """Returns {operation: {"count", "sum", "mean"}} using the exact running sums."""
+        names = [operation] if operation is not None else self.operations()
+        summary = {}
+        for name in names:
+            count = self._counts.get(name, 0)
+            if not count:
+                continue
+            total = self._sums[name]
+            summary[name] = {
+                "count": count,
+                "sum": +total,  # Rounded to the current context for display
+                "mean": total / count,
+            }
+        return summary
@@ -0,0 +1,95 @@
+# app/history_io.py
+import csv
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+from itertools import islice
+from app.calculation import Calculation
+from app.numeric_backends import Interval
+
+# Column order used by History.save_history
+CSV_COLUMNS = ['operand_a', 'operand_b', 'operation', 'result']
+DEFAULT_CHUNK_SIZE = 10_000
+
+def parse_decimal(text: str) -> Decimal:
+    """Parses a CSV cell straight into a Decimal, without a float round-trip."""
+    try:
+        return Decimal(text.strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid number in history file: {text!r}") from None
+
+def parse_number(text: str):
+    """
+    Parses a CSV cell written by any numeric backend: "1/3" is read back as a
+    Fraction and "[lo, hi]" as an Interval; everything else is a Decimal.
+    """
+    text = text.strip()
+    try:
+        if text.startswith("["):
+            return Interval.parse(text)
+        if "/" in text:
+            return Fraction(text)
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid number in history file: {text!r}") from None
+    return parse_decimal(text)
+
+def iter_csv_chunks(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Streams a history CSV file as lists of at most `chunk_size` Calculations.
+
+    Columns are matched by header name, so files written by History and by
+    AutoSaveObserver (which order the columns differently) are both accepted.
+    `progress`, if given, is called with the number of rows read so far after
+    every chunk.
+    """
+    with open(file_path, newline='') as csv_file:
+        reader = csv.reader(csv_file)
+        header = next(reader, None)
+        if header is None:
+            return
+        try:
+            a_col, b_col, op_col, result_col = (header.index(name) for name in CSV_COLUMNS)
+        except ValueError:
+            raise ValueError(f"History file {file_path} must have the columns {', '.join(CSV_COLUMNS)}") from None
+
+        rows_read = 0
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                return
+            chunk = [
+                Calculation(parse_number(row[a_col]), parse_number(row[b_col]),
+                            row[op_col], parse_number(row[result_col]))
+                for row in rows if row
+            ]
+            rows_read += len(chunk)
+            yield chunk
+            if progress is not None:
+                progress(rows_read)
+
+def write_csv(file_path: str, calculations, columns=CSV_COLUMNS,
+              chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None) -> int:
+    """
+    Writes calculations to a CSV file in chunks and returns the number of rows written.
+    `progress`, if given, is called with the number of rows written so far after every chunk.
+    """
+    fields = {
+        'operand_a': lambda calc: calc.a,
+        'operand_b': lambda calc: calc.b,
+        'operation': lambda calc: calc.operation,
+        'result': lambda calc: calc.result,
+    }
+    getters = [fields[name] for name in columns]
+    rows_written = 0
+    with open(file_path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file, lineterminator='\n')
+        writer.writerow(columns)
+        iterator = iter(calculations)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            writer.writerows([getter(calc) for getter in getters] for calc in chunk)
+            rows_written += len(chunk)
+            if progress is not None:
+                progress(rows_written)
+    return rows_written
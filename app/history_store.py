@@ -0,0 +1,201 @@
+# app/history_store.py
+from array import array
+from collections.abc import MutableSequence
+from decimal import Decimal
+from app.calculation import Calculation
+
+# Decimals are packed as a signed 64-bit coefficient and a 16-bit exponent.
+# Values that do not fit (more than 18 digits, huge exponents, -0, NaN,
+# infinities or non-Decimal numbers) are kept as-is in a side table and
+# flagged with this exponent.
+OVERFLOW_EXPONENT = -32768
+_MAX_DIGITS = 18
+
+def pack_decimal(value):
+    """Packs a Decimal into a (coefficient, exponent) pair, or returns None if it does not fit."""
+    if type(value) is Decimal and value.is_finite():
+        sign, digits, exponent = value.as_tuple()
+        if len(digits) <= _MAX_DIGITS and OVERFLOW_EXPONENT < exponent <= 32767 and not (sign and value == 0):
+            coefficient = 0
+            for digit in digits:
+                coefficient = coefficient * 10 + digit
+            return (-coefficient if sign else coefficient), exponent
+    return None
+
+def unpack_decimal(coefficient: int, exponent: int) -> Decimal:
+    """Rebuilds a Decimal from a packed pair; building from text is exact and keeps the exponent."""
+    return Decimal(f"{coefficient}E{exponent}")
+
+class _DecimalColumn:
+    """A packed column of Decimal values."""
+    __slots__ = ("coefficients", "exponents", "overflow")
+
+    def __init__(self):
+        self.coefficients = array('q')
+        self.exponents = array('h')
+        self.overflow = {}
+
+    def append(self, value):
+        packed = pack_decimal(value)
+        if packed is None:
+            self.overflow[len(self.exponents)] = value
+            packed = (0, OVERFLOW_EXPONENT)
+        self.coefficients.append(packed[0])
+        self.exponents.append(packed[1])
+
+    def set(self, index: int, value):
+        packed = pack_decimal(value)
+        if packed is None:
+            self.overflow[index] = value
+            packed = (0, OVERFLOW_EXPONENT)
+        else:
+            self.overflow.pop(index, None)
+        self.coefficients[index], self.exponents[index] = packed
+
+    def get(self, index: int):
+        exponent = self.exponents[index]
+        if exponent == OVERFLOW_EXPONENT:
+            return self.overflow[index]
+        return unpack_decimal(self.coefficients[index], exponent)
+
+    def truncate(self, length: int):
+        del self.coefficients[length:]
+        del self.exponents[length:]
+        if self.overflow:
+            for index in [i for i in self.overflow if i >= length]:
+                del self.overflow[index]
+
+    def nbytes(self) -> int:
+        return (self.coefficients.itemsize * len(self.coefficients)
+                + self.exponents.itemsize * len(self.exponents))
+
+class ColumnarHistoryStore(MutableSequence):
+    """
+    A list-like container of Calculations stored column by column.
+
+    Operands and results live in packed integer arrays and operation names are
+    stored as small integer codes into a shared table, so a large history costs
+    a few dozen bytes per entry instead of several Python objects. Indexing
+    builds a Calculation on demand.
+    """
+    def __init__(self, calculations=()):
+        self._a = _DecimalColumn()
+        self._b = _DecimalColumn()
+        self._result = _DecimalColumn()
+        self._op_codes = array('H')
+        self._op_names = []
+        self._op_lookup = {}
+        self.extend(calculations)
+
+    def _op_code(self, name) -> int:
+        code = self._op_lookup.get(name)
+        if code is None:
+            code = len(self._op_names)
+            if code > 0xFFFF and self._op_codes.typecode == 'H':
+                self._op_codes = array('I', self._op_codes)
+            self._op_names.append(name)
+            self._op_lookup[name] = code
+        return code
+
+    def __len__(self):
+        return len(self._op_codes)
+
+    def _get(self, index: int) -> Calculation:
+        return Calculation(
+            self._a.get(index),
+            self._b.get(index),
+            self._op_names[self._op_codes[index]],
+            self._result.get(index),
+        )
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return self._get(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._get(index)
+
+    def append(self, calculation: Calculation):
+        self._a.append(calculation.a)
+        self._b.append(calculation.b)
+        self._result.append(calculation.result)
+        self._op_codes.append(self._op_code(calculation.operation))
+
+    def extend(self, calculations):
+        for calculation in calculations:
+            self.append(calculation)
+
+    def truncate(self, length: int):
+        """Drops every entry from `length` onwards."""
+        for column in (self._a, self._b, self._result):
+            column.truncate(length)
+        del self._op_codes[length:]
+
+    def clear(self):
+        self.truncate(0)
+
+    def __delitem__(self, index):
+        length = len(self)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(length)
+            if step == 1 and stop >= length:
+                # Deleting from the tail (undo) is the common case and needs no copying
+                self.truncate(min(start, length))
+                return
+        elif index in (-1, length - 1) and length:
+            self.truncate(length - 1)
+            return
+        remaining = list(self)
+        del remaining[index]
+        self.clear()
+        self.extend(remaining)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice) and index == slice(None):
+            values = list(value)
+            self.clear()
+            self.extend(values)
+            return
+        if not isinstance(index, slice):
+            # Replacing one entry (a recomputation) rewrites its fields in place
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("history index out of range")
+            self._a.set(index, value.a)
+            self._b.set(index, value.b)
+            self._result.set(index, value.result)
+            self._op_codes[index] = self._op_code(value.operation)
+            return
+        remaining = list(self)
+        remaining[index] = value
+        self.clear()
+        self.extend(remaining)
+
+    def insert(self, index, calculation):
+        if index >= len(self):
+            self.append(calculation)
+            return
+        remaining = list(self)
+        remaining.insert(index, calculation)
+        self.clear()
+        self.extend(remaining)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, ColumnarHistoryStore)):
+            return len(self) == len(other) and all(x == y for x, y in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ColumnarHistoryStore({list(self)!r})"
+
+    def nbytes(self) -> int:
+        """Returns the approximate size of the packed columns in bytes."""
+        return (self._a.nbytes() + self._b.nbytes() + self._result.nbytes()
+                + self._op_codes.itemsize * len(self._op_codes))
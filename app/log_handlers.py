@@ -0,0 +1,187 @@
+# app/log_handlers.py
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# The %-template used for calculation records; arguments are (operation, a, b, result)
+CALCULATION_MESSAGE = "Operation: %s, Operands: (%s, %s), Result: %s"
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats each record as one JSON object; calculation records get structured fields."""
+    def format(self, record: logging.LogRecord) -> str:
+        data = {"time": self.formatTime(record), "level": record.levelname}
+        if record.msg == CALCULATION_MESSAGE and isinstance(record.args, tuple) and len(record.args) == 4:
+            operation, a, b, result = record.args
+            data.update(operation=str(operation), a=str(a), b=str(b), result=str(result))
+        else:
+            data["message"] = record.getMessage()
+        return json.dumps(data)
+
+class BatchFileHandler(logging.Handler):
+    """
+    A file handler that writes a whole batch of records with one write and one
+    flush, with optional size- and time-based rotation.
+
+    Rotated files are renamed to <file>.1, <file>.2, ... (oldest last) and,
+    with compress=True, gzipped to <file>.1.gz and so on. At most
+    `backup_count` rotated files are kept. The file is opened on the first write.
+    """
+    def __init__(self, filename: str, max_bytes: int = 0, rotate_seconds: float = 0,
+                 backup_count: int = 5, compress: bool = False, encoding: str = "utf-8"):
+        super().__init__()
+        self.filename = os.path.abspath(filename)
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.compress = compress
+        self.encoding = encoding
+        self.stream = None
+        self._size = 0
+        self._rollover_at = None
+
+    def _open(self):
+        self.stream = open(self.filename, "a", encoding=self.encoding)
+        self._size = self.stream.tell()
+        if self.rotate_seconds:
+            self._rollover_at = time.time() + self.rotate_seconds
+
+    def emit(self, record: logging.LogRecord):
+        self.emit_batch([record])
+
+    def emit_batch(self, records: list):
+        """Formats and writes `records`, rotating between records when a limit is reached."""
+        with self.lock:
+            try:
+                if self.stream is None:
+                    self._open()
+                pending = []
+                for record in records:
+                    line = self.format(record) + "\n"
+                    size = len(line.encode(self.encoding))
+                    if self._should_rotate(size):
+                        self._write(pending)
+                        pending = []
+                        self._rotate()
+                    pending.append(line)
+                    self._size += size
+                self._write(pending)
+            except Exception:
+                self.handleError(records[-1] if records else None)
+
+    def _should_rotate(self, size: int) -> bool:
+        if self.max_bytes and self._size and self._size + size > self.max_bytes:
+            return True
+        return self._rollover_at is not None and time.time() >= self._rollover_at
+
+    def _write(self, lines: list):
+        if lines:
+            self.stream.write("".join(lines))
+            self.stream.flush()
+
+    def _backup_name(self, index: int) -> str:
+        return f"{self.filename}.{index}" + (".gz" if self.compress else "")
+
+    def _rotate(self):
+        self.stream.close()
+        self.stream = None
+        if self.backup_count > 0:
+            oldest = self._backup_name(self.backup_count)
+            if os.path.exists(oldest):
+                os.remove(oldest)
+            for index in range(self.backup_count - 1, 0, -1):
+                source = self._backup_name(index)
+                if os.path.exists(source):
+                    os.replace(source, self._backup_name(index + 1))
+            if self.compress:
+                with open(self.filename, "rb") as source, gzip.open(self._backup_name(1), "wb") as target:
+                    shutil.copyfileobj(source, target)
+                os.remove(self.filename)
+            else:
+                os.replace(self.filename, self._backup_name(1))
+        else:
+            os.remove(self.filename)
+        self._open()
+
+    def flush(self):
+        with self.lock:
+            if self.stream is not None:
+                self.stream.flush()
+
+    def close(self):
+        with self.lock:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+        super().close()
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    A QueueHandler that enqueues records unformatted. The standard one formats
+    every message on the caller's thread; here the %-arguments travel with the
+    record and are only formatted when the listener writes it.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class BatchQueueListener:
+    """
+    Drains a queue of log records on a background thread and hands them to a
+    BatchFileHandler in groups of up to `batch_size`, so a burst of records is
+    committed with a single write. flush() waits until everything queued before
+    it has been written; stop() writes whatever is left and ends the thread.
+    """
+    _STOP = object()
+
+    def __init__(self, record_queue, handler: BatchFileHandler, batch_size: int = 512):
+        self.queue = record_queue
+        self.handler = handler
+        self.batch_size = batch_size
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = []
+            for item in batch:
+                if isinstance(item, logging.LogRecord):
+                    records.append(item)
+                    continue
+                # A marker: write what came before it, then act on it
+                if records:
+                    self.handler.emit_batch(records)
+                    records = []
+                if item is self._STOP:
+                    return
+                item.set()
+            if records:
+                self.handler.emit_batch(records)
+
+    def flush(self, timeout: float = None) -> bool:
+        """Waits until every record queued so far is written. Returns False on timeout."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        written = threading.Event()
+        self.queue.put(written)
+        return written.wait(timeout)
+
+    def stop(self):
+        if self._thread is not None:
+            self.queue.put(self._STOP)
+            self._thread.join()
+            self._thread = None
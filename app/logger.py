@@ -1,24 +1,72 @@
 # app/logger.py
 import logging
+import queue
+from app.log_handlers import (BatchFileHandler, BatchQueueListener, DeferredQueueHandler,
+                              JsonLinesFormatter, CALCULATION_MESSAGE, TEXT_FORMAT)
 
 class LoggingObserver:
-    """An observer that logs calculations to a file."""
-    def __init__(self, log_file="calculator.log"):
+    """An observer that logs calculations to a file.
+
+    In "sync" mode (the default) each record is written as soon as it is logged.
+    In "buffered" mode records are queued and a background listener writes them
+    in batches; flush() and close() guarantee that nothing queued is lost.
+    Either mode can rotate the log by size (max_bytes) or age (rotate_seconds),
+    optionally gzipping rotated files, and write "text" or "jsonl" records.
+    """
+    MODES = ("sync", "buffered")
+    FORMATS = ("text", "jsonl")
+
+    def __init__(self, log_file="calculator.log", mode="sync", log_format="text", max_bytes=0,
+                 rotate_seconds=0, backup_count=5, compress=False, batch_size=512):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown logging mode: {mode}")
+        if log_format not in self.FORMATS:
+            raise ValueError(f"Unknown log format: {log_format}")
         # Create a unique logger instance to avoid conflicts in tests
         self.logger = logging.getLogger(f"Logger_{log_file}")
         self.logger.setLevel(logging.INFO)
 
         # Remove existing handlers to prevent duplicate logs
         if self.logger.hasHandlers():
+            for handler in list(self.logger.handlers):
+                handler.close()
             self.logger.handlers.clear()
 
-        # Create a file handler to write to the specified file
-        handler = logging.FileHandler(log_file)
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        self.logger.addHandler(handler)
+        # Create a file handler to write to the specified file; the file is
+        # only opened when the first record is logged
+        self.file_handler = BatchFileHandler(log_file, max_bytes=max_bytes, rotate_seconds=rotate_seconds,
+                                             backup_count=backup_count, compress=compress)
+        formatter = JsonLinesFormatter() if log_format == "jsonl" else logging.Formatter(TEXT_FORMAT)
+        self.file_handler.setFormatter(formatter)
+
+        self._listener = None
+        if mode == "buffered":
+            records = queue.SimpleQueue()
+            self.logger.addHandler(DeferredQueueHandler(records))
+            self._listener = BatchQueueListener(records, self.file_handler, batch_size)
+            self._listener.start()
+        else:
+            self.logger.addHandler(self.file_handler)
 
     def update(self, calculation):
         """Receives notification and logs the calculation details."""
-        log_message = f"Operation: {calculation.operation}, Operands: ({calculation.a}, {calculation.b}), Result: {calculation.result}"
-        self.logger.info(log_message)
\ No newline at end of file
+        # The message is only formatted when the record is written
+        self.logger.info(CALCULATION_MESSAGE, calculation.operation, calculation.a, calculation.b, calculation.result)
+
+    def update_batch(self, calculations):
+        """Receives a whole batch of calculations and logs each of them."""
+        for calculation in calculations:
+            self.update(calculation)
+
+    def flush(self):
+        """Writes every record logged so far."""
+        if self._listener is not None:
+            self._listener.flush()
+        self.file_handler.flush()
+
+    def close(self):
+        """Writes pending records and closes the log file."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        self.file_handler.close()
@@ -0,0 +1,219 @@
+# app/metrics.py
+import bisect
+import json
+import threading
+import time
+
+# Histogram bucket upper bounds: latencies in seconds (1 us to 10 s) and sizes in bytes (256 B to 256 MiB)
+LATENCY_BUCKETS = tuple(m * 10.0 ** e for e in range(-6, 1) for m in (1, 2.5, 5)) + (10.0,)
+SIZE_BUCKETS = tuple(float(4 ** e) for e in range(4, 15))
+
+PROMETHEUS_PREFIX = "calculator_"
+
+class Histogram:
+    """A fixed-bucket histogram: observing a value costs one bisect and a few additions."""
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last bucket holds values above every bound
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def copy(self) -> "Histogram":
+        copied = Histogram(self.bounds)
+        copied.counts = list(self.counts)
+        copied.count, copied.sum, copied.max = self.count, self.sum, self.max
+        return copied
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile as the upper bound of the bucket that contains it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+def _series_name(name: str, label) -> str:
+    return f"{name}{{{label[0]}={label[1]}}}" if label else name
+
+def _prometheus_labels(label, extra: str = "") -> str:
+    parts = []
+    if label:
+        value = str(label[1]).replace("\\", "\\\\").replace('"', '\\"')
+        parts.append(f'{label[0]}="{value}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Metrics:
+    """
+    Process-wide instrumentation: histograms, counters and gauges, each with an
+    optional single (name, value) label.
+
+    Instrumented code checks `METRICS.enabled` before reading the clock, so a
+    disabled registry costs one attribute lookup per call site. Collectors are
+    callables run on every snapshot; they report gauges that would be too
+    expensive to keep up to date on each change (such as history memory).
+
+    Updates and snapshots take one lock, so threads (the server's executor,
+    a shared calculator) never lose an increment. Collectors run outside it.
+    """
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._collectors = []
+        self._profiler = None
+        self.reset()
+
+    def reset(self):
+        """Discards every recorded value (collectors stay registered)."""
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+            self.gauges = {}
+            self.started = time.time()
+
+    def observe(self, name: str, value: float, label: tuple = None, buckets: tuple = LATENCY_BUCKETS):
+        key = (name, label)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def timed(self, name: str, label: tuple, function, *args):
+        """Calls function(*args) and records how long it took, even if it raises."""
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.observe(name, time.perf_counter() - start, label)
+
+    def increment(self, name: str, amount: float = 1, label: tuple = None):
+        key = (name, label)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, label: tuple = None):
+        with self._lock:
+            self.gauges[(name, label)] = value
+
+    def add_collector(self, collector):
+        """Registers a callable returning (name, label, value) gauge readings."""
+        self._collectors.append(collector)
+
+    def _collect(self) -> tuple:
+        """Returns consistent copies of (histograms, counters, gauges), collectors included."""
+        with self._lock:
+            histograms = {key: histogram.copy() for key, histogram in self.histograms.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        # Collectors may take other locks (the history's), so they run after this one is released
+        for collector in self._collectors:
+            for name, label, value in collector():
+                gauges[(name, label)] = value
+        return histograms, counters, gauges
+
+    # --- Export ---
+
+    def snapshot(self) -> dict:
+        histograms, counters, gauges = self._collect()
+        return {
+            "enabled": self.enabled,
+            "uptime": time.time() - self.started,
+            "histograms": {_series_name(*key): h.to_dict() for key, h in sorted(histograms.items(), key=_sort_key)},
+            "counters": {_series_name(*key): value for key, value in sorted(counters.items(), key=_sort_key)},
+            "gauges": {_series_name(*key): value for key, value in sorted(gauges.items(), key=_sort_key)},
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        histograms, counters, gauges = self._collect()
+        lines = []
+        typed = set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, label), histogram in sorted(histograms.items(), key=_sort_key):
+            metric = PROMETHEUS_PREFIX + name
+            declare(metric, "histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.counts):
+                cumulative += count
+                bucket_labels = _prometheus_labels(label, 'le="%.12g"' % bound)
+                lines.append(f"{metric}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _prometheus_labels(label, 'le="+Inf"')
+            lines.append(f"{metric}_bucket{bucket_labels} {histogram.count}")
+            lines.append(f"{metric}_sum{_prometheus_labels(label)} {histogram.sum!r}")
+            lines.append(f"{metric}_count{_prometheus_labels(label)} {histogram.count}")
+        for (name, label), value in sorted(counters.items(), key=_sort_key):
+            metric = PROMETHEUS_PREFIX + name
+            declare(metric, "counter")
+            lines.append(f"{metric}{_prometheus_labels(label)} {value}")
+        for (name, label), value in sorted(gauges.items(), key=_sort_key):
+            metric = PROMETHEUS_PREFIX + name
+            declare(metric, "gauge")
+            lines.append(f"{metric}{_prometheus_labels(label)} {value}")
+        return "\n".join(lines) + "\n"
+
+    # --- Profiling ---
+
+    @property
+    def profiling(self) -> bool:
+        return self._profiler is not None
+
+    def start_profile(self):
+        """Starts a cProfile capture of everything that runs until stop_profile()."""
+        if self._profiler is None:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop_profile(self, path: str = None, limit: int = 20) -> str:
+        """Stops the capture, optionally dumps it to `path`, and returns the top entries by cumulative time."""
+        if self._profiler is None:
+            return ""
+        import io
+        import pstats
+        profiler, self._profiler = self._profiler, None
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(limit)
+        return report.getvalue()
+
+def _sort_key(item):
+    (name, label), _ = item
+    return (name, label or ())
+
+METRICS = Metrics()
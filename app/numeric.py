@@ -0,0 +1,140 @@
+# app/numeric.py
+import decimal
+from decimal import Decimal
+from app.exceptions import OperationError
+
+# Extra digits carried through intermediate steps before the final rounding
+GUARD_DIGITS = 10
+
+class NumericLimits:
+    """Operand-size limits that reject pathological inputs before any work starts."""
+    def __init__(self, max_exponent: int = 1_000_000, max_digits: int = 10_000):
+        self.max_exponent = max_exponent
+        self.max_digits = max_digits
+
+LIMITS = NumericLimits()
+
+def configure(max_exponent: int = None, max_digits: int = None):
+    """Updates the global limits used by power() and root()."""
+    if max_exponent is not None:
+        LIMITS.max_exponent = max_exponent
+    if max_digits is not None:
+        LIMITS.max_digits = max_digits
+
+def _target_context(precision: int = None) -> decimal.Context:
+    context = decimal.getcontext().copy()
+    if precision is not None:
+        if precision < 1:
+            raise OperationError("Precision must be at least 1 digit.")
+        context.prec = precision
+    return context
+
+def _check_digits(*operands):
+    for operand in operands:
+        if operand.is_finite() and len(operand.as_tuple().digits) > LIMITS.max_digits:
+            raise OperationError(f"Operand has more than {LIMITS.max_digits} digits.")
+
+def _check_magnitude(base: Decimal, exponent: Decimal, context: decimal.Context):
+    """Estimates log10 of base ** exponent and rejects results the context cannot represent."""
+    if base == 0 or not base.is_finite() or not exponent.is_finite():
+        return
+    with decimal.localcontext() as estimate:
+        estimate.prec = 12
+        estimate.traps[decimal.Overflow] = False
+        magnitude = abs(base).log10() * exponent
+    if magnitude > context.Emax + 1:
+        raise OperationError("Result is too large to represent.")
+    if magnitude < context.Etiny() - 1:
+        raise OperationError("Result is too small to represent.")
+
+def _is_integral(value: Decimal) -> bool:
+    return value.is_finite() and value == value.to_integral_value()
+
+def power(a: Decimal, b: Decimal, precision: int = None) -> Decimal:
+    """
+    Computes a ** b rounded to `precision` significant digits (default: the
+    active context's precision). Integer exponents use exponentiation by
+    squaring. Oversized operands and out-of-range results are rejected first.
+    """
+    context = _target_context(precision)
+    _check_digits(a, b)
+    if a == 0 and b < 0:
+        raise OperationError("Cannot raise zero to a negative power.")
+    if a < 0 and not _is_integral(b):
+        raise OperationError("Cannot raise a negative number to a fractional power.")
+    if not _is_integral(b) or a == 0 or not a.is_finite():
+        # Fractional exponents and the special cases keep Decimal's own semantics
+        _check_magnitude(a, b, context)
+        with decimal.localcontext(context):
+            return a ** b
+
+    exponent = int(b)
+    if abs(exponent) > LIMITS.max_exponent:
+        raise OperationError(f"Exponent is larger than {LIMITS.max_exponent}.")
+    _check_magnitude(a, b, context)
+
+    with decimal.localcontext(context) as working:
+        working.prec = context.prec + GUARD_DIGITS + len(str(abs(exponent)))
+        result = Decimal(1)
+        base = a
+        remaining = abs(exponent)
+        while remaining:
+            if remaining & 1:
+                result *= base
+            remaining >>= 1
+            if remaining:
+                base *= base
+        if exponent < 0:
+            result = 1 / result
+    return context.plus(result)
+
+def root(a: Decimal, n: Decimal, precision: int = None) -> Decimal:
+    """
+    Computes the n-th root of a rounded to `precision` significant digits.
+    Integer degrees use Newton's iteration; odd roots of negative numbers are
+    negative. Fractional degrees fall back to a ** (1 / n).
+    """
+    context = _target_context(precision)
+    _check_digits(a, n)
+    if n == 0:
+        raise OperationError("Cannot calculate a zeroth root.")
+    if a < 0 and _is_integral(n) and int(n) % 2 == 0:
+        raise OperationError("Cannot calculate an even root of a negative number.")
+    if a < 0:
+        return -root(-a, n, precision)
+
+    if not _is_integral(n) or not a.is_finite():
+        with decimal.localcontext(context) as working:
+            working.prec = context.prec + GUARD_DIGITS
+            exponent = 1 / n
+        return power(a, exponent, precision)
+    degree = int(n)
+    if abs(degree) > LIMITS.max_exponent:
+        raise OperationError(f"Root degree is larger than {LIMITS.max_exponent}.")
+    if a == 0:
+        if degree < 0:
+            raise OperationError("Cannot calculate a negative root of zero.")
+        return context.plus(Decimal(0))
+    if degree < 0:
+        with decimal.localcontext(context) as working:
+            working.prec = context.prec + GUARD_DIGITS
+            inverse = 1 / a
+        return root(inverse, Decimal(-degree), precision)
+
+    with decimal.localcontext(context) as working:
+        working.prec = context.prec + GUARD_DIGITS
+        # Start from a low-precision estimate, then refine with Newton's iteration:
+        # x <- ((n - 1) * x + a / x ** (n - 1)) / n
+        with decimal.localcontext() as estimate:
+            estimate.prec = 20
+            x = (a.ln() / degree).exp()
+        tolerance = Decimal(10) ** (x.adjusted() - working.prec + 2)
+        for _ in range(200):
+            previous = x
+            x = ((degree - 1) * x + a / x ** (degree - 1)) / degree
+            if abs(x - previous) <= tolerance:
+                break
+    result = context.plus(x)
+    # Report every significant digit, as Decimal's own power does for inexact roots
+    exponent = max(result.adjusted() - context.prec + 1, context.Etiny())
+    return result.quantize(Decimal(1).scaleb(exponent), context=context)
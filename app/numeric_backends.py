@@ -0,0 +1,597 @@
+# app/numeric_backends.py
+import decimal
+import math
+from decimal import Decimal, InvalidOperation, ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR
+from fractions import Fraction
+from app import numeric
+from app.exceptions import OperationError, ValidationError
+from app.operations import OperationFactory
+
+# The factory keeps this mapping up to date as operations are registered
+_DISPATCH = OperationFactory.dispatch_table()
+
+# Longest exact power (in digits) computed before falling back to a rounded one
+EXACT_POWER_DIGITS = 2_000
+
+# --- Intervals ---
+
+_DIRECTED = {}
+
+def _directed_contexts() -> tuple:
+    """Returns (round down, round up) copies of the active context, cached per precision and range."""
+    context = decimal.getcontext()
+    key = (context.prec, context.Emin, context.Emax)
+    contexts = _DIRECTED.get(key)
+    if contexts is None:
+        down = decimal.Context(prec=context.prec, Emin=context.Emin, Emax=context.Emax, rounding=ROUND_FLOOR)
+        up = decimal.Context(prec=context.prec, Emin=context.Emin, Emax=context.Emax, rounding=ROUND_CEILING)
+        contexts = _DIRECTED[key] = (down, up)
+    return contexts
+
+def _as_bound(value) -> Decimal:
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, (int, float, str)):
+        return Decimal(value)
+    raise TypeError(f"Cannot use {type(value).__name__} as an interval bound.")
+
+class Interval:
+    """
+    A closed interval [lo, hi] of Decimals known to contain the true value.
+
+    Arithmetic rounds the lower bound down and the upper bound up at the
+    active context's precision (outward rounding), so a result always
+    encloses every value the exact operation takes over its operands.
+    """
+    __slots__ = ("lo", "hi")
+
+    def __init__(self, lo, hi=None):
+        lo = _as_bound(lo)
+        hi = lo if hi is None else _as_bound(hi)
+        if lo.is_nan() or hi.is_nan() or lo > hi:
+            raise ValueError(f"Invalid interval bounds: {lo}, {hi}")
+        self.lo = lo
+        self.hi = hi
+
+    @classmethod
+    def around(cls, value, error) -> "Interval":
+        """Returns value ± error, rounded outward."""
+        value, error = _as_bound(value), abs(_as_bound(error))
+        down, up = _directed_contexts()
+        return cls(down.subtract(value, error), up.add(value, error))
+
+    @classmethod
+    def of(cls, value) -> "Interval":
+        """Encloses a number; a Fraction that Decimal cannot hold exactly gets a one-ulp-wide interval."""
+        if isinstance(value, Interval):
+            return value
+        if isinstance(value, Fraction):
+            down, up = _directed_contexts()
+            numerator, denominator = Decimal(value.numerator), Decimal(value.denominator)
+            return cls(down.divide(numerator, denominator), up.divide(numerator, denominator))
+        if isinstance(value, float):
+            # Every float has an exact Decimal value
+            return cls(Decimal(value))
+        return cls(value)
+
+    @classmethod
+    def parse(cls, text: str) -> "Interval":
+        """Parses "[lo, hi]", "x+-e", "x±e" or a plain number."""
+        text = text.strip()
+        if text.startswith("[") and text.endswith("]"):
+            lo, separator, hi = text[1:-1].partition(",")
+            if not separator:
+                raise ValueError(f"Invalid interval: {text!r}")
+            return cls(Decimal(lo.strip()), Decimal(hi.strip()))
+        for separator in ("+-", "±"):
+            value, found, error = text.partition(separator)
+            if found:
+                return cls.around(Decimal(value), Decimal(error))
+        return cls(Decimal(text))
+
+    @property
+    def is_point(self) -> bool:
+        return self.lo == self.hi
+
+    def midpoint(self) -> Decimal:
+        return (self.lo + self.hi) / 2
+
+    def width(self) -> Decimal:
+        _, up = _directed_contexts()
+        return up.subtract(self.hi, self.lo)
+
+    def __contains__(self, value) -> bool:
+        return self.lo <= value <= self.hi
+
+    def __eq__(self, other):
+        if isinstance(other, Interval):
+            return self.lo == other.lo and self.hi == other.hi
+        if isinstance(other, (Decimal, int, float, Fraction)):
+            return self.lo == other and self.hi == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.lo) if self.is_point else hash((self.lo, self.hi))
+
+    def __repr__(self):
+        return f"Interval({str(self.lo)!r}, {str(self.hi)!r})"
+
+    def __str__(self):
+        return f"[{self.lo}, {self.hi}]"
+
+    # --- Arithmetic ---
+
+    def __add__(self, other):
+        other = Interval.of(other)
+        down, up = _directed_contexts()
+        return Interval(down.add(self.lo, other.lo), up.add(self.hi, other.hi))
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = Interval.of(other)
+        down, up = _directed_contexts()
+        return Interval(down.subtract(self.lo, other.hi), up.subtract(self.hi, other.lo))
+
+    def __rsub__(self, other):
+        return Interval.of(other) - self
+
+    def __mul__(self, other):
+        other = Interval.of(other)
+        down, up = _directed_contexts()
+        corners = [(x, y) for x in (self.lo, self.hi) for y in (other.lo, other.hi)]
+        return Interval(min(down.multiply(x, y) for x, y in corners), max(up.multiply(x, y) for x, y in corners))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        other = Interval.of(other)
+        if other.lo <= 0 <= other.hi:
+            raise OperationError("Cannot divide by an interval that contains zero.")
+        down, up = _directed_contexts()
+        corners = [(x, y) for x in (self.lo, self.hi) for y in (other.lo, other.hi)]
+        return Interval(min(down.divide(x, y) for x, y in corners), max(up.divide(x, y) for x, y in corners))
+
+    def __rtruediv__(self, other):
+        return Interval.of(other) / self
+
+    def __neg__(self):
+        return Interval(-self.hi, -self.lo)
+
+    def __abs__(self):
+        if self.lo >= 0:
+            return self
+        if self.hi <= 0:
+            return -self
+        return Interval(Decimal(0), max(-self.lo, self.hi))
+
+def as_decimal(value) -> Decimal:
+    """Converts a result of any backend to a Decimal (an interval to its midpoint) for sorting and sums."""
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, Interval):
+        return value.midpoint()
+    if isinstance(value, Fraction):
+        return Decimal(value.numerator) / Decimal(value.denominator)
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+# --- Exact helpers ---
+
+def _int_root(value: int, degree: int) -> int:
+    """Returns the floor of the degree-th root of a non-negative integer (Newton's iteration on ints)."""
+    if value < 2:
+        return value
+    x = 1 << -(-value.bit_length() // degree)  # Always at or above the root
+    while True:
+        y = ((degree - 1) * x + value // x ** (degree - 1)) // degree
+        if y >= x:
+            return x
+        x = y
+
+def _rational_root(value: Fraction, degree: int):
+    """Returns the exact degree-th root of a rational, or None if it is irrational."""
+    if value < 0:
+        root = _rational_root(-value, degree)
+        return -root if root is not None else None
+    numerator = _int_root(value.numerator, degree)
+    denominator = _int_root(value.denominator, degree)
+    if numerator ** degree != value.numerator or denominator ** degree != value.denominator:
+        return None
+    return Fraction(numerator, denominator)
+
+def _check_result_digits(value: Fraction, exponent: int):
+    """Rejects an exact power whose numerator or denominator would exceed the digit limit."""
+    bits = max(abs(value.numerator).bit_length(), value.denominator.bit_length()) * abs(exponent)
+    if bits * 0.30103 > numeric.LIMITS.max_digits:
+        raise OperationError(f"Exact result would have more than {numeric.LIMITS.max_digits} digits.")
+
+def _exact_decimal_power(x: Decimal, exponent: int):
+    """Returns x ** exponent (exponent >= 0) without rounding, or None if it is too long to compute."""
+    if not x.is_finite():
+        return None
+    digits = len(x.as_tuple().digits) * exponent + 1
+    if digits > EXACT_POWER_DIGITS:
+        return None
+    with decimal.localcontext() as context:
+        context.prec = digits
+        context.Emax, context.Emin = decimal.MAX_EMAX, decimal.MIN_EMIN
+        context.traps[decimal.Inexact] = True
+        try:
+            return x ** exponent
+        except ArithmeticError:
+            return None
+
+# --- Backends ---
+
+class NumericBackend:
+    """
+    Runs operations on one kind of number.
+
+    Operands are converted with coerce() (or parse() for text) before an
+    operation runs. Operations work through the shared instances in
+    app.operations unless the backend overrides them: `overrides` maps an
+    operation name to a function of (a, b), for operations whose generic
+    implementation does not suit the number type.
+    """
+    name = None
+    number_type = None
+    # True when results are never rounded
+    exact = False
+    overrides = {}
+
+    def coerce(self, value):
+        """Converts an operand to the backend's number type."""
+        raise NotImplementedError
+
+    def parse(self, text: str):
+        """Parses an operand typed by the user."""
+        try:
+            return self.coerce(Decimal(text))
+        except InvalidOperation:
+            raise ValidationError(f"Invalid number: {text}") from None
+
+    def executor(self, operation_name: str):
+        """Returns the function that runs an operation on this backend's numbers."""
+        execute = self.overrides.get(operation_name) or _DISPATCH.get(operation_name)
+        if execute is None:
+            raise OperationError(f"Unknown operation: {operation_name}")
+        return execute
+
+    def execute(self, operation_name: str, a, b):
+        return self.executor(operation_name)(self.coerce(a), self.coerce(b))
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name!r}>"
+
+class DecimalBackend(NumericBackend):
+    """Decimal arithmetic at the active context's precision (the calculator's own semantics)."""
+    name = "decimal"
+    number_type = Decimal
+
+    def coerce(self, value):
+        if type(value) is Decimal:
+            return value
+        if isinstance(value, float):
+            return Decimal(repr(value))
+        if isinstance(value, Fraction):
+            return Decimal(value.numerator) / Decimal(value.denominator)
+        if isinstance(value, Interval):
+            return value.midpoint()
+        return Decimal(value)
+
+def _truncated_quotient(a, b):
+    if b == 0:
+        raise OperationError("Cannot perform integer division by zero.")
+    return math.trunc(a / b) if not isinstance(a, int) or not isinstance(b, int) else _int_trunc_div(a, b)
+
+def _int_trunc_div(a: int, b: int) -> int:
+    quotient = abs(a) // abs(b)
+    return quotient if (a < 0) == (b < 0) else -quotient
+
+def _rational_int_divide(a, b):
+    return Fraction(_truncated_quotient(a, b))
+
+def _rational_modulus(a, b):
+    # Keeps the sign of the dividend, like Decimal's %
+    if b == 0:
+        raise OperationError("Cannot perform modulus by zero.")
+    return a - b * _truncated_quotient(a, b)
+
+class _IrrationalResult(OperationError):
+    """Raised by the rational backend when an exact result does not exist."""
+    pass
+
+def _rational_power(a: Fraction, b: Fraction) -> Fraction:
+    if a == 0 and b < 0:
+        raise OperationError("Cannot raise zero to a negative power.")
+    if a < 0 and b.denominator != 1:
+        raise OperationError("Cannot raise a negative number to a fractional power.")
+    if abs(b.numerator) > numeric.LIMITS.max_exponent or b.denominator > numeric.LIMITS.max_exponent:
+        raise OperationError(f"Exponent is larger than {numeric.LIMITS.max_exponent}.")
+    _check_result_digits(a, b.numerator)
+    power = a ** b.numerator
+    if b.denominator == 1:
+        return power
+    root = _rational_root(power, b.denominator)
+    if root is None:
+        raise _IrrationalResult("Result is irrational; use the decimal or interval backend.")
+    return root
+
+def _rational_root_operation(a: Fraction, b: Fraction) -> Fraction:
+    if b == 0:
+        raise OperationError("Cannot calculate a zeroth root.")
+    if a < 0 and b.numerator % 2 == 0:
+        raise OperationError("Cannot calculate an even root of a negative number.")
+    if a < 0:
+        # Odd roots of negative numbers are negative
+        return -_rational_power(-a, 1 / b)
+    return _rational_power(a, 1 / b)
+
+class RationalBackend(NumericBackend):
+    """Exact rational arithmetic with fractions.Fraction; irrational results are rejected."""
+    name = "rational"
+    number_type = Fraction
+    exact = True
+    overrides = {
+        "power": _rational_power,
+        "root": _rational_root_operation,
+        "modulus": _rational_modulus,
+        "int_divide": _rational_int_divide,
+    }
+
+    def coerce(self, value):
+        if type(value) is Fraction:
+            return value
+        if isinstance(value, Interval):
+            if not value.is_point:
+                raise OperationError(f"Cannot use the interval {value} as an exact rational.")
+            value = value.lo
+        try:
+            return Fraction(value)
+        except (ValueError, OverflowError):
+            raise OperationError(f"Cannot represent {value} as a rational number.") from None
+
+    def parse(self, text: str):
+        try:
+            return Fraction(text.strip())
+        except ValueError:
+            raise ValidationError(f"Invalid number: {text}") from None
+
+def _point_integer(value: Interval):
+    """Returns the integer an interval pins down exactly, or None."""
+    if value.is_point and value.lo.is_finite() and value.lo == value.lo.to_integral_value():
+        return int(value.lo)
+    return None
+
+def _contains_even_integer(value: Interval) -> bool:
+    """True when some even integer lies within the interval."""
+    if not (value.lo.is_finite() and value.hi.is_finite()):
+        return True
+    even = value.lo.to_integral_value(ROUND_CEILING)
+    if even % 2:
+        even += 1
+    return even <= value.hi
+
+def _enclose_power(x: Decimal, exponent: Decimal) -> tuple:
+    """Returns (lo, hi) bounds of x ** exponent."""
+    down, up = _directed_contexts()
+    if exponent == exponent.to_integral_value():
+        n = int(exponent)
+        exact = _exact_decimal_power(x, abs(n))
+        if exact is not None:
+            if n >= 0:
+                return down.plus(exact), up.plus(exact)
+            return down.divide(1, exact), up.divide(1, exact)
+    value = numeric.power(x, exponent)
+    return down.next_minus(value), up.next_plus(value)
+
+def _enclose_root(x: Decimal, degree: Decimal) -> tuple:
+    """Returns (lo, hi) bounds of the degree-th root of x."""
+    down, up = _directed_contexts()
+    value = numeric.root(x, degree)
+    if degree > 0 and degree == degree.to_integral_value():
+        if _exact_decimal_power(value, int(degree)) == x:
+            return value, value
+    return down.next_minus(value), up.next_plus(value)
+
+def _corners(enclose, a: Interval, b: Interval) -> Interval:
+    """Evaluates a function that is monotonic in each argument at the four corners."""
+    bounds = [enclose(x, y) for x in {a.lo, a.hi} for y in {b.lo, b.hi}]
+    return Interval(min(lo for lo, _ in bounds), max(hi for _, hi in bounds))
+
+def _interval_power(a: Interval, b: Interval) -> Interval:
+    n = _point_integer(b)
+    if n is not None:
+        if n < 0 and 0 in a:
+            raise OperationError("Cannot raise an interval that contains zero to a negative power.")
+        result = _corners(_enclose_power, a, b)
+        if n > 0 and n % 2 == 0 and a.lo < 0 < a.hi:
+            # An even power reaches its minimum at zero, inside the interval
+            return Interval(Decimal(0), result.hi)
+        return result
+    if a.lo < 0:
+        raise OperationError("Cannot raise an interval with negative values to a fractional power.")
+    if a.lo == 0 and b.lo < 0:
+        raise OperationError("Cannot raise zero to a negative power.")
+    return _corners(_enclose_power, a, b)
+
+def _interval_root(a: Interval, b: Interval) -> Interval:
+    if 0 in b:
+        raise OperationError("Cannot calculate a zeroth root.")
+    if a.lo < 0 and _contains_even_integer(b):
+        # numeric.root takes odd and fractional roots of negative numbers, but not even ones
+        raise OperationError("Cannot calculate an even root of a negative number.")
+    if b.hi < 0 and 0 in a:
+        raise OperationError("Cannot calculate a negative root of an interval that contains zero.")
+    return _corners(_enclose_root, a, b)
+
+def _interval_int_divide(a: Interval, b: Interval) -> Interval:
+    if b == 0:
+        raise OperationError("Cannot perform integer division by zero.")
+    quotient = a / b
+    # Truncation is monotonic, so truncating the bounds encloses every quotient
+    return Interval(quotient.lo.to_integral_value(ROUND_DOWN), quotient.hi.to_integral_value(ROUND_DOWN))
+
+def _interval_modulus(a: Interval, b: Interval) -> Interval:
+    if b == 0:
+        raise OperationError("Cannot perform modulus by zero.")
+    quotient = _interval_int_divide(a, b)
+    if not quotient.is_point:
+        raise OperationError("The remainder jumps within these intervals; narrow the operands.")
+    return a - b * quotient
+
+class IntervalBackend(NumericBackend):
+    """Interval arithmetic with outward rounding; results carry their own error bounds."""
+    name = "interval"
+    number_type = Interval
+    overrides = {
+        "power": _interval_power,
+        "root": _interval_root,
+        "modulus": _interval_modulus,
+        "int_divide": _interval_int_divide,
+    }
+
+    def coerce(self, value):
+        return Interval.of(value)
+
+    def parse(self, text: str):
+        try:
+            return Interval.parse(text)
+        except (InvalidOperation, ValueError):
+            raise ValidationError(f"Invalid number or interval: {text}") from None
+
+def _float_power(a: float, b: float) -> float:
+    if a == 0 and b < 0:
+        raise OperationError("Cannot raise zero to a negative power.")
+    if a < 0 and not b.is_integer():
+        raise OperationError("Cannot raise a negative number to a fractional power.")
+    try:
+        return math.pow(a, b)
+    except OverflowError:
+        raise OperationError("Result is too large to represent.") from None
+
+def _float_root(a: float, b: float) -> float:
+    if b == 0:
+        raise OperationError("Cannot calculate a zeroth root.")
+    return _DISPATCH["root"](a, b)
+
+def _float_modulus(a: float, b: float) -> float:
+    if b == 0:
+        raise OperationError("Cannot perform modulus by zero.")
+    return math.fmod(a, b)
+
+def _float_int_divide(a: float, b: float) -> float:
+    if b == 0:
+        raise OperationError("Cannot perform integer division by zero.")
+    return float(math.trunc(a / b))
+
+class FloatBackend(NumericBackend):
+    """Native binary floating point: the fastest backend, rounded to 53 bits at every step."""
+    name = "float"
+    number_type = float
+    overrides = {
+        "power": _float_power,
+        "root": _float_root,
+        "modulus": _float_modulus,
+        "int_divide": _float_int_divide,
+    }
+
+    def coerce(self, value):
+        if type(value) is float:
+            return value
+        if isinstance(value, Interval):
+            value = value.midpoint()
+        return float(value)
+
+def _integer_power(a: int, b: int):
+    if b < 0:
+        return _normalized(_rational_power(Fraction(a), Fraction(b)))
+    if b > numeric.LIMITS.max_exponent:
+        raise OperationError(f"Exponent is larger than {numeric.LIMITS.max_exponent}.")
+    _check_result_digits(Fraction(a), b)
+    return a ** b
+
+def _normalized(value: Fraction):
+    return value.numerator if value.denominator == 1 else value
+
+def _rational_fallback(name: str):
+    """Runs an operation that can leave the integers with exact rationals, or Decimals if it is irrational."""
+    def execute(a, b):
+        try:
+            return _normalized(RATIONAL.executor(name)(Fraction(a), Fraction(b)))
+        except _IrrationalResult:
+            return _DISPATCH[name](Decimal(a), Decimal(b))
+    return execute
+
+class IntegerBackend(NumericBackend):
+    """
+    Python ints, chosen automatically when every operand in a batch is an int.
+    Integer results stay exact ints; operations that can leave the integers
+    (divide, percent, root, negative powers) return exact Fractions instead,
+    and irrational roots and powers fall back to Decimal.
+    """
+    name = "integer"
+    number_type = int
+    exact = True
+    overrides = {
+        "divide": _rational_fallback("divide"),
+        "percent": _rational_fallback("percent"),
+        "root": _rational_fallback("root"),
+        "power": _integer_power,
+        "modulus": _rational_modulus,
+        "int_divide": _truncated_quotient,
+    }
+
+    def coerce(self, value):
+        if type(value) is int:
+            return value
+        if isinstance(value, Decimal) and value == value.to_integral_value():
+            return int(value)
+        if isinstance(value, Fraction) and value.denominator == 1:
+            return value.numerator
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        raise OperationError(f"{value} is not an integer.")
+
+RATIONAL = RationalBackend()
+INTEGER = IntegerBackend()
+FLOAT = FloatBackend()
+
+NUMERIC_BACKENDS = {
+    "decimal": DecimalBackend(),
+    "rational": RATIONAL,
+    "interval": IntervalBackend(),
+    "float": FLOAT,
+    "integer": INTEGER,
+}
+
+def get_backend(backend):
+    """Returns a backend by name (instances are passed through). Raises ValueError for unknown names."""
+    if isinstance(backend, NumericBackend):
+        return backend
+    try:
+        return NUMERIC_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown numeric backend: {backend}") from None
+
+def auto_backend(values):
+    """
+    Returns the cheapest backend that is exact for the operands: the integer
+    backend when they are all ints, the float backend when they are all
+    floats (which are already rounded), the interval backend when any is an
+    Interval and the rational backend when any is a Fraction, so that mixing
+    in a Decimal does not lose the bounds or exactness. Otherwise None (use
+    them as they are).
+    """
+    kinds = {type(value) for value in values}
+    if kinds == {int}:
+        return INTEGER
+    if kinds == {float}:
+        return FLOAT
+    if Interval in kinds:
+        return NUMERIC_BACKENDS["interval"]
+    if Fraction in kinds:
+        return RATIONAL
+    return None
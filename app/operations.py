@@ -3,41 +3,141 @@ from abc import ABC, abstractmethod
 from decimal import Decimal
 import math
 from app.exceptions import OperationError
+from app import numeric
+
+class Domain:
+    """
+    The operands an operation accepts, as (valid, message) rules. `valid(a, b)`
+    must work on scalars and elementwise on NumPy arrays, so use & and | rather
+    than `and` and `or`; `message` is the error for operands that break the rule.
+    """
+    __slots__ = ("rules",)
+
+    def __init__(self, *rules):
+        self.rules = rules
+
+    def check(self, a, b):
+        """Raises an OperationError for operands outside the domain."""
+        for valid, message in self.rules:
+            if not valid(a, b):
+                raise OperationError(message)
+
+    def invalid_mask(self, a, b):
+        """Returns a boolean array marking the rows of two NumPy arrays that are outside the domain."""
+        mask = False
+        for valid, _ in self.rules:
+            mask = mask | ~valid(a, b)
+        return mask
+
+_NONZERO_B = lambda a, b: b != 0
 
 class Operation(ABC):
     """The base class for all arithmetic operations."""
+    # Metadata published in the OperationFactory registry.
+    arity = 2
+    commutative = False
+    # The operands the operation accepts (a Domain), if restricted. execute()
+    # checks it with self.domain.check(a, b); calculate_many(fast=True) re-runs
+    # rows outside it through execute() to report the error.
+    domain = None
+    # Operations that implement execute_vectorized can run a whole column of
+    # float operands in one NumPy pass (see Calculator.calculate_many).
+    vectorizable = False
+
     @abstractmethod
     def execute(self, a, b):
         """Executes the arithmetic operation."""
         pass
 
+    def execute_vectorized(self, a, b):
+        """
+        Executes the operation over two NumPy float arrays.
+        Returns the result array and a boolean mask of rows that are invalid
+        (e.g. division by zero); those rows are re-checked by execute().
+        Calculator runs it with floating-point warnings silenced and reports
+        rows whose result overflowed as errors.
+
+        This default calls execute() row by row on Decimal operands; operations
+        that set `vectorizable` override it with a single NumPy pass.
+        """
+        import numpy as np
+        results = np.empty(len(a), dtype=np.float64)
+        invalid = np.zeros(len(a), dtype=bool)
+        for row, (x, y) in enumerate(zip(a.tolist(), b.tolist())):
+            try:
+                results[row] = float(self.execute(Decimal(repr(x)), Decimal(repr(y))))
+            except (OperationError, ArithmeticError, ValueError):
+                invalid[row] = True
+        return results, invalid
+
 class AddOperation(Operation):
+    commutative = True
+    vectorizable = True
+
     def execute(self, a, b):
         return a + b
 
+    def execute_vectorized(self, a, b):
+        return a + b, None
+
 class SubtractOperation(Operation):
+    vectorizable = True
+
     def execute(self, a, b):
         return a - b
 
+    def execute_vectorized(self, a, b):
+        return a - b, None
+
 class MultiplyOperation(Operation):
+    commutative = True
+    vectorizable = True
+
     def execute(self, a, b):
         return a * b
 
+    def execute_vectorized(self, a, b):
+        return a * b, None
+
 class DivideOperation(Operation):
+    domain = Domain((_NONZERO_B, "Cannot divide by zero."))
+    vectorizable = True
+
     def execute(self, a, b):
-        if b == 0:
-            raise OperationError("Cannot divide by zero.")
+        self.domain.check(a, b)
         return a / b
 
+    def execute_vectorized(self, a, b):
+        import numpy as np
+        invalid = self.domain.invalid_mask(a, b)
+        return a / np.where(invalid, 1.0, b), invalid
+
 class PowerOperation(Operation):
+    vectorizable = True
+
     def execute(self, a, b):
+        if isinstance(a, Decimal) and isinstance(b, Decimal):
+            return numeric.power(a, b)
         return a ** b
 
+    def execute_vectorized(self, a, b):
+        import numpy as np
+        # 0 ** negative and negative ** fraction have no real value; let execute() report them
+        invalid = ((a == 0) & (b < 0)) | ((a < 0) & (b != np.floor(b)))
+        return np.power(a, b), invalid
+
 class RootOperation(Operation):
+    domain = Domain(
+        (_NONZERO_B, "Cannot calculate a zeroth root."),
+        (lambda a, b: (a >= 0) | (b % 2 != 0), "Cannot calculate an even root of a negative number."),
+    )
+    vectorizable = True
+
     def execute(self, a, b):
-        # First, check for the invalid case: even root of a negative number
-        if a < 0 and b % 2 == 0:
-            raise OperationError("Cannot calculate an even root of a negative number.")
+        if isinstance(a, Decimal) and isinstance(b, Decimal):
+            return numeric.root(a, b)
+        # First, check for the invalid cases: degree zero, even root of a negative number
+        self.domain.check(a, b)
         
         # Handle the valid case for odd roots of negative numbers
         if a < 0:
@@ -47,55 +147,172 @@ class RootOperation(Operation):
         # Handle all positive numbers normally
         return a ** (1 / b)
 
+    def execute_vectorized(self, a, b):
+        import numpy as np
+        invalid = self.domain.invalid_mask(a, b)
+        magnitude = np.power(np.abs(a), 1.0 / np.where(b == 0, 1.0, b))
+        return np.where(a < 0, -magnitude, magnitude), invalid
+
 # --- Added Mandatory Operations ---
 
 class ModulusOperation(Operation):
+    domain = Domain((_NONZERO_B, "Cannot perform modulus by zero."))
+    vectorizable = True
+
     def execute(self, a, b):
-        if b == 0:
-            raise OperationError("Cannot perform modulus by zero.")
+        self.domain.check(a, b)
         return a % b
 
+    def execute_vectorized(self, a, b):
+        import numpy as np
+        # Decimal's % keeps the sign of the dividend, like C's fmod
+        invalid = self.domain.invalid_mask(a, b)
+        return np.fmod(a, np.where(invalid, 1.0, b)), invalid
+
 class IntegerDivisionOperation(Operation):
+    domain = Domain((_NONZERO_B, "Cannot perform integer division by zero."))
+    vectorizable = True
+
     def execute(self, a, b):
-        if b == 0:
-            raise OperationError("Cannot perform integer division by zero.")
+        self.domain.check(a, b)
         return a // b
 
+    def execute_vectorized(self, a, b):
+        import numpy as np
+        # Decimal's // truncates towards zero rather than flooring
+        invalid = self.domain.invalid_mask(a, b)
+        return np.trunc(a / np.where(invalid, 1.0, b)), invalid
+
 class PercentageOperation(Operation):
+    domain = Domain((_NONZERO_B, "Cannot calculate percentage with a zero denominator."))
+    vectorizable = True
+
     def execute(self, a, b):
-        if b == 0:
-            raise OperationError("Cannot calculate percentage with a zero denominator.")
+        self.domain.check(a, b)
         return (a / b) * 100
 
+    def execute_vectorized(self, a, b):
+        import numpy as np
+        invalid = self.domain.invalid_mask(a, b)
+        return (a / np.where(invalid, 1.0, b)) * 100, invalid
+
 class AbsoluteDifferenceOperation(Operation):
+    commutative = True
+    vectorizable = True
+
     def execute(self, a, b):
         return abs(a - b)
 
+    def execute_vectorized(self, a, b):
+        import numpy as np
+        return np.abs(a - b), None
+
 # --- End of Added Operations ---
 
+class OperationSpec:
+    """A registry entry: one shared operation instance, its bound execute method and its metadata."""
+    __slots__ = ("name", "operation", "execute", "arity", "commutative", "domain", "vectorizable")
+
+    def __init__(self, name: str, operation: Operation):
+        self.name = name
+        self.operation = operation
+        self.execute = operation.execute
+        self.arity = operation.arity
+        self.commutative = operation.commutative
+        self.domain = operation.domain
+        self.vectorizable = operation.vectorizable
+
+    def __repr__(self):
+        return f"OperationSpec({self.name!r}, {type(self.operation).__name__})"
+
 class OperationFactory:
-    """A factory for creating operation instances."""
-    _operations = {
-        "add": AddOperation,
-        "subtract": SubtractOperation,
-        "multiply": MultiplyOperation,
-        "divide": DivideOperation,
-        "power": PowerOperation,
-        "root": RootOperation,
-        # --- Registering new operations ---
-        "modulus": ModulusOperation,
-        "int_divide": IntegerDivisionOperation,
-        "percent": PercentageOperation,
-        "abs_diff": AbsoluteDifferenceOperation,
-    }
+    """
+    A registry of operations.
+
+    Operations are stateless, so each one is instantiated once at registration
+    and shared. The dispatch table maps every name straight to the bound
+    execute method of that shared instance.
+    """
+    ENTRY_POINT_GROUP = "advanced_calculator.operations"
+
+    _operations = {}
+    _registry = {}
+    _dispatch = {}
+
+    @classmethod
+    def register(cls, operation_name: str, operation_class=None):
+        """
+        Registers an Operation subclass under a name.
+        Can be called directly or used as a class decorator:
+
+            @OperationFactory.register("hypot")
+            class HypotOperation(Operation): ...
+        """
+        def decorator(op_class):
+            if not (isinstance(op_class, type) and issubclass(op_class, Operation)):
+                raise TypeError(f"{op_class!r} is not an Operation subclass.")
+            spec = OperationSpec(operation_name, op_class())
+            cls._operations[operation_name] = op_class
+            cls._registry[operation_name] = spec
+            cls._dispatch[operation_name] = spec.execute
+            return op_class
+
+        if operation_class is not None:
+            return decorator(operation_class)
+        return decorator
+
+    @classmethod
+    def unregister(cls, operation_name: str):
+        """Removes an operation from the registry."""
+        cls._operations.pop(operation_name, None)
+        cls._registry.pop(operation_name, None)
+        cls._dispatch.pop(operation_name, None)
+
+    @classmethod
+    def load_entry_points(cls, group: str = ENTRY_POINT_GROUP) -> list:
+        """Registers third-party operations advertised through package entry points."""
+        from importlib.metadata import entry_points
+        loaded = []
+        for entry_point in entry_points(group=group):
+            cls.register(entry_point.name, entry_point.load())
+            loaded.append(entry_point.name)
+        return loaded
 
     @staticmethod
     def get_operation(operation_name: str) -> Operation:
         """
-        Returns an instance of the requested operation class.
+        Returns the shared instance of the requested operation.
+        Raises an OperationError if the operation is not found.
+        """
+        return OperationFactory.get_spec(operation_name).operation
+
+    @staticmethod
+    def get_spec(operation_name: str) -> OperationSpec:
+        """
+        Returns the registry entry of the requested operation.
         Raises an OperationError if the operation is not found.
         """
-        op_class = OperationFactory._operations.get(operation_name)
-        if not op_class:
+        spec = OperationFactory._registry.get(operation_name)
+        if spec is None:
             raise OperationError(f"Unknown operation: {operation_name}")
-        return op_class()
\ No newline at end of file
+        return spec
+
+    @staticmethod
+    def dispatch_table() -> dict:
+        """Returns the live mapping of operation names to bound execute methods."""
+        return OperationFactory._dispatch
+
+for _name, _op_class in {
+    "add": AddOperation,
+    "subtract": SubtractOperation,
+    "multiply": MultiplyOperation,
+    "divide": DivideOperation,
+    "power": PowerOperation,
+    "root": RootOperation,
+    # --- Registering new operations ---
+    "modulus": ModulusOperation,
+    "int_divide": IntegerDivisionOperation,
+    "percent": PercentageOperation,
+    "abs_diff": AbsoluteDifferenceOperation,
+}.items():
+    OperationFactory.register(_name, _op_class)
@@ -0,0 +1,103 @@
+# app/parallel.py
+import decimal
+import os
+from app.exceptions import OperationError
+from app.operations import OperationFactory
+from app import numeric
+
+def _init_worker(max_exponent: int, max_digits: int):
+    """Prepares a worker process: the same operations and numeric limits as the parent."""
+    OperationFactory.load_entry_points()
+    numeric.configure(max_exponent=max_exponent, max_digits=max_digits)
+
+def _execute(execute, a, b) -> tuple:
+    try:
+        return False, execute(a, b)
+    except (OperationError, ArithmeticError) as e:
+        return True, str(e)
+
+def _run_chunk(context: decimal.Context, rows: list) -> list:
+    """
+    Runs one chunk of (a, b, operation_name) rows under the parent's decimal context.
+    Returns (is_error, value) per row, where value is the result or the error message.
+    A row whose operation the worker does not know gets (None, None): it may have
+    been registered in the parent after the worker started, so the parent runs it.
+    """
+    dispatch = OperationFactory.dispatch_table()
+    outcomes = []
+    with decimal.localcontext(context):
+        for a, b, name in rows:
+            execute = dispatch.get(name)
+            outcomes.append(_execute(execute, a, b) if execute is not None else (None, None))
+    return outcomes
+
+def _run_unknown(context: decimal.Context, rows: list, outcomes: list):
+    """Runs the rows the workers left to the parent (see _run_chunk) in this process."""
+    with decimal.localcontext(context):
+        for position, (is_error, _) in enumerate(outcomes):
+            if is_error is None:
+                a, b, name = rows[position]
+                try:
+                    execute = OperationFactory.get_spec(name).execute
+                except OperationError as e:
+                    outcomes[position] = (True, str(e))
+                    continue
+                outcomes[position] = _execute(execute, a, b)
+
+class ParallelExecutor:
+    """
+    Evaluates large batches across worker processes.
+
+    Rows are split into chunks of `chunk_size` and distributed over a
+    ProcessPoolExecutor. Chunks are returned in submission order, so outcomes
+    line up with the input rows no matter which worker finishes first. Every
+    chunk carries a copy of the caller's decimal context, and workers start
+    with the caller's numeric limits. Workers only know the built-in and
+    entry-point operations; rows of operations registered at runtime are run
+    in the calling process.
+    """
+    def __init__(self, workers: int = None, chunk_size: int = 256):
+        if workers is not None and workers < 1:
+            raise ValueError("At least one worker is required.")
+        if chunk_size < 1:
+            raise ValueError("The chunk size must be at least 1.")
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            # Imported here: it pulls in multiprocessing, which most sessions never need
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(numeric.LIMITS.max_exponent, numeric.LIMITS.max_digits),
+            )
+        return self._pool
+
+    def run(self, rows: list) -> list:
+        """Returns (is_error, value) for each (a, b, operation_name) row, in input order."""
+        rows = list(rows)
+        if not rows:
+            return []
+        context = decimal.getcontext().copy()
+        chunks = [rows[start:start + self.chunk_size] for start in range(0, len(rows), self.chunk_size)]
+        outcomes = []
+        for chunk_outcomes in self._get_pool().map(_run_chunk, [context] * len(chunks), chunks):
+            outcomes.extend(chunk_outcomes)
+        if any(is_error is None for is_error, _ in outcomes):
+            _run_unknown(context, rows, outcomes)
+        return outcomes
+
+    def close(self):
+        """Shuts the worker processes down."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,217 @@
+# app/persistent.py
+from collections.abc import Sequence
+from itertools import islice
+
+BITS = 5
+WIDTH = 1 << BITS  # 32 entries per node
+MASK = WIDTH - 1
+
+class PersistentVector(Sequence):
+    """
+    An immutable sequence that shares structure with the vectors it was made from.
+
+    Entries are stored in a trie of tuples with 32 slots per node: full chunks
+    of 32 entries are the leaves and the last, partial chunk is kept apart as
+    the tail. append(), extend(), set() and truncate() return new vectors that
+    reuse every node they did not change, so a vector that differs from
+    another in a few entries costs O(log32 n) new nodes, not a copy.
+    Reading an entry walks log32 n nodes (4 for a million entries).
+    """
+    __slots__ = ("_length", "_shift", "_root", "_tail", "__weakref__")
+
+    def __new__(cls, items=()):
+        if isinstance(items, PersistentVector):
+            return items
+        return _EMPTY.extend(items)
+
+    @classmethod
+    def _make(cls, length: int, shift: int, root: tuple, tail: tuple) -> "PersistentVector":
+        vector = object.__new__(cls)
+        vector._length = length
+        vector._shift = shift
+        vector._root = root
+        vector._tail = tail
+        return vector
+
+    # --- Reading ---
+
+    def __len__(self):
+        return self._length
+
+    def _tail_offset(self) -> int:
+        return self._length - len(self._tail)
+
+    def _leaf(self, index: int) -> tuple:
+        """Returns the chunk holding entry `index`."""
+        if index >= self._tail_offset():
+            return self._tail
+        node = self._root
+        for level in range(self._shift, 0, -BITS):
+            node = node[(index >> level) & MASK]
+        return node
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step == 1:
+                return list(islice(self._iter_from(start), max(stop - start, 0)))
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("vector index out of range")
+        return self._leaf(index)[index & MASK]
+
+    def _iter_from(self, start: int):
+        for first in range(start & ~MASK, self._length, WIDTH):
+            leaf = self._leaf(first)
+            yield from leaf[start - first:] if start > first else leaf
+
+    def __iter__(self):
+        for leaf in _leaves(self._root, self._shift):
+            yield from leaf
+        yield from self._tail
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence) and not isinstance(other, (str, bytes)):
+            return len(self) == len(other) and all(x == y for x, y in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"PersistentVector({len(self)} entries)"
+
+    def chunks(self) -> tuple:
+        """Returns (leaves, tail): the full chunks in order, and the partial last one."""
+        return list(_leaves(self._root, self._shift)), self._tail
+
+    @classmethod
+    def from_chunks(cls, leaves: list, tail: tuple) -> "PersistentVector":
+        """Builds a vector over full chunks (reused as they are) followed by `tail`."""
+        if not leaves:
+            return _EMPTY.extend(tail)
+        shift, root = _build(leaves)
+        return cls._make(len(leaves) * WIDTH + len(tail), shift, root, tuple(tail))
+
+    def shared_nodes(self, other: "PersistentVector") -> int:
+        """Counts the chunks this vector shares with `other` (the same tuple objects)."""
+        theirs = {id(leaf) for leaf in _leaves(other._root, other._shift)}
+        return sum(1 for leaf in _leaves(self._root, self._shift) if id(leaf) in theirs)
+
+    # --- Making new vectors ---
+
+    def append(self, item) -> "PersistentVector":
+        """Returns a new vector with `item` added at the end."""
+        if len(self._tail) < WIDTH:
+            return self._make(self._length + 1, self._shift, self._root, self._tail + (item,))
+        shift, root = self._push_leaf(self._tail)
+        return self._make(self._length + 1, shift, root, (item,))
+
+    def extend(self, items) -> "PersistentVector":
+        """Returns a new vector with `items` added at the end, filling whole chunks at a time."""
+        iterator = iter(items)
+        shift, root, count = self._shift, self._root, self._tail_offset()
+        tail = self._tail + tuple(islice(iterator, WIDTH - len(self._tail)))
+        if len(tail) < WIDTH:
+            return self._make(count + len(tail), shift, root, tail)
+        leaves = []
+        for chunk in iter(lambda: tuple(islice(iterator, WIDTH)), ()):
+            # More entries follow a full tail: it becomes a leaf of the trie
+            leaves.append(tail)
+            tail = chunk
+            if len(chunk) < WIDTH:
+                break
+        if count == 0 and leaves:
+            shift, root = _build(leaves)
+            count = len(leaves) * WIDTH
+        else:
+            for leaf in leaves:
+                shift, root = _push_leaf(root, shift, count, leaf)
+                count += WIDTH
+        return self._make(count + len(tail), shift, root, tail)
+
+    def _push_leaf(self, leaf: tuple) -> tuple:
+        return _push_leaf(self._root, self._shift, self._tail_offset(), leaf)
+
+    def set(self, index: int, item) -> "PersistentVector":
+        """Returns a new vector with entry `index` replaced; only the path to it is copied."""
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("vector index out of range")
+        offset = self._tail_offset()
+        if index >= offset:
+            position = index - offset
+            tail = self._tail[:position] + (item,) + self._tail[position + 1:]
+            return self._make(self._length, self._shift, self._root, tail)
+        return self._make(self._length, self._shift, _set(self._root, self._shift, index, item), self._tail)
+
+    def truncate(self, length: int) -> "PersistentVector":
+        """Returns the first `length` entries as a vector sharing every full chunk with this one."""
+        if length >= self._length:
+            return self
+        if length <= 0:
+            return _EMPTY
+        offset = self._tail_offset()
+        if length > offset:
+            return self._make(length, self._shift, self._root, self._tail[:length - offset])
+        # The chunk holding the last kept entry becomes the tail
+        first = (length - 1) & ~MASK
+        tail = self._leaf(first)[:length - first]
+        root, shift = _prefix(self._root, self._shift, first >> BITS), self._shift
+        while shift > BITS and len(root) == 1:
+            root, shift = root[0], shift - BITS
+        return self._make(length, shift, root, tail)
+
+def _leaves(node: tuple, shift: int):
+    """Yields the leaf chunks under `node`, in order."""
+    if shift == BITS:
+        yield from node
+    else:
+        for child in node:
+            yield from _leaves(child, shift - BITS)
+
+def _build(leaves: list) -> tuple:
+    """Builds a trie over full leaves bottom-up; returns (shift, root)."""
+    nodes, shift = leaves, BITS
+    while len(nodes) > WIDTH:
+        nodes = [tuple(nodes[i:i + WIDTH]) for i in range(0, len(nodes), WIDTH)]
+        shift += BITS
+    return shift, tuple(nodes)
+
+def _new_path(shift: int, leaf: tuple) -> tuple:
+    """Wraps `leaf` in single-child nodes up to the level `shift`."""
+    node = leaf
+    for _ in range(0, shift, BITS):
+        node = (node,)
+    return node
+
+def _push_leaf(root: tuple, shift: int, count: int, leaf: tuple) -> tuple:
+    """Adds a full leaf after the `count` entries of the trie; returns (shift, root)."""
+    if (count >> BITS) >= (1 << shift):
+        # The trie is full: grow a level
+        return shift + BITS, (root, _new_path(shift, leaf))
+    return shift, _push_into(root, shift, count, leaf)
+
+def _push_into(node: tuple, shift: int, count: int, leaf: tuple) -> tuple:
+    if shift == BITS:
+        return node + (leaf,)
+    index = (count >> shift) & MASK
+    if index < len(node):
+        return node[:index] + (_push_into(node[index], shift - BITS, count, leaf),)
+    return node + (_new_path(shift - BITS, leaf),)
+
+def _set(node: tuple, shift: int, index: int, item) -> tuple:
+    slot = (index >> shift) & MASK
+    child = item if shift == 0 else _set(node[slot], shift - BITS, index, item)
+    return node[:slot] + (child,) + node[slot + 1:]
+
+def _prefix(node: tuple, shift: int, leaves: int) -> tuple:
+    """Returns `node` cut down to its first `leaves` leaves, sharing the subtrees kept whole."""
+    capacity = 1 << (shift - BITS)  # Leaves under each child
+    whole, rest = divmod(leaves, capacity)
+    kept = node[:whole]
+    if rest:
+        kept += (_prefix(node[whole], shift - BITS, rest),)
+    return kept
+
+_EMPTY = PersistentVector._make(0, BITS, (), ())
@@ -0,0 +1,157 @@
+# app/pipeline.py
+import csv
+import io
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from app.exceptions import CalculatorError
+
+OUTPUT_FORMATS = ("plain", "csv", "jsonl")
+
+# --- Pipeline stages: each one is a generator feeding the next ---
+
+def read_commands(stream):
+    """Yields (line_number, text) for every non-blank, non-comment line."""
+    for line_number, line in enumerate(stream, start=1):
+        text = line.strip()
+        if text and not text.startswith("#"):
+            yield line_number, text
+
+def parse_commands(lines):
+    """
+    Turns command lines into jobs:
+      (line_number, "calc", (a, b, operation_name)) for "<operation> <a> <b>"
+      (line_number, "eval", source) for "eval <expression>"
+      (line_number, "error", message) for anything that fails validation
+    """
+    for line_number, text in lines:
+        parts = text.split()
+        if parts[0].lower() == "eval":
+            yield line_number, "eval", " ".join(parts[1:])
+            continue
+        if len(parts) != 3:
+            yield line_number, "error", "Invalid command format. Use: <operation> <a> <b>"
+            continue
+        op_name, val_a, val_b = parts
+        try:
+            yield line_number, "calc", (Decimal(val_a), Decimal(val_b), op_name.lower())
+        except InvalidOperation:
+            yield line_number, "error", f"Invalid number in: {text}"
+
+def calculate_chunks(calculator, history, jobs, chunk_size: int = 1000):
+    """
+    Evaluates jobs in chunks and yields (line_number, calculation, error) in input order.
+
+    Each chunk is calculated without per-row notifications, added to the history
+    as one undoable step, and then reported to the observers with a single
+    notify_batch call, so autosave and logging commit once per chunk.
+    """
+    jobs = iter(jobs)
+    while True:
+        chunk = list(islice(jobs, chunk_size))
+        if not chunk:
+            return
+        outcomes = [None] * len(chunk)
+        triples, positions = [], []
+        for position, (line_number, kind, payload) in enumerate(chunk):
+            if kind == "calc":
+                triples.append(payload)
+                positions.append(position)
+            elif kind == "eval":
+                try:
+                    outcomes[position] = (calculator.evaluate(payload, notify=False), None)
+                except (CalculatorError, ArithmeticError) as e:
+                    outcomes[position] = (None, str(e))
+            else:
+                outcomes[position] = (None, payload)
+
+        batch = calculator.calculate_many(triples, notify=False)
+        errors = dict(batch.errors)
+        for index, position in enumerate(positions):
+            calculation = batch.calculations[index]
+            outcomes[position] = (calculation, None if calculation is not None else str(errors[index]))
+
+        succeeded = [calculation for calculation, _ in outcomes if calculation is not None]
+        if history is not None:
+            history.add_calculations(succeeded)
+        calculator.notify_batch(succeeded)
+
+        for (line_number, _, _), (calculation, error) in zip(chunk, outcomes):
+            yield line_number, calculation, error
+
+# --- Output ---
+
+class ResultWriter:
+    """Formats results as plain text, CSV or JSON lines and writes them in buffered blocks."""
+    def __init__(self, stream, output_format: str = "plain", buffer_rows: int = 1000):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        self.stream = stream
+        self.output_format = output_format
+        self.buffer_rows = buffer_rows
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer, lineterminator="\n")
+        self._pending = 0
+        if output_format == "csv":
+            self._csv.writerow(["line", "operation", "operand_a", "operand_b", "result", "error"])
+
+    def write(self, line_number: int, calculation, error):
+        if self.output_format == "plain":
+            if calculation is not None:
+                self._buffer.write(f"Result: {calculation.result}\n")
+            else:
+                self._buffer.write(f"Error (line {line_number}): {error}\n")
+        elif self.output_format == "csv":
+            if calculation is not None:
+                self._csv.writerow([line_number, calculation.operation, calculation.a,
+                                    calculation.b, calculation.result, ""])
+            else:
+                self._csv.writerow([line_number, "", "", "", "", error])
+        else:
+            record = {"line": line_number, "error": error}
+            if calculation is not None:
+                record.update(operation=calculation.operation, a=str(calculation.a),
+                              b=str(calculation.b), result=str(calculation.result))
+            self._buffer.write(json.dumps(record) + "\n")
+        self._pending += 1
+        if self._pending >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        self.stream.write(self._buffer.getvalue())
+        self.stream.flush()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._pending = 0
+
+class BatchSummary:
+    """Row counts and throughput of a finished batch run."""
+    def __init__(self, rows: int, errors: int, seconds: float):
+        self.rows = rows
+        self.errors = errors
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self):
+        return (f"Processed {self.rows} rows ({self.errors} errors) in {self.seconds:.3f}s "
+                f"({self.rows_per_second:,.0f} rows/s)")
+
+def run_batch(calculator, history, input_stream, output_stream,
+              output_format: str = "plain", chunk_size: int = 1000) -> BatchSummary:
+    """Streams commands through parse -> validate -> calculate -> emit and returns a summary."""
+    writer = ResultWriter(output_stream, output_format, buffer_rows=chunk_size)
+    rows = errors = 0
+    start = time.perf_counter()
+    jobs = parse_commands(read_commands(input_stream))
+    for line_number, calculation, error in calculate_chunks(calculator, history, jobs, chunk_size):
+        writer.write(line_number, calculation, error)
+        rows += 1
+        if calculation is None:
+            errors += 1
+    writer.flush()
+    calculator.flush()
+    return BatchSummary(rows, errors, time.perf_counter() - start)
@@ -0,0 +1,386 @@
+# app/provenance.py
+import json
+import os
+import re
+import tempfile
+from decimal import Decimal, InvalidOperation
+from app.exceptions import OperationError, ValidationError
+from app.history_io import parse_number
+from app.operations import OperationFactory
+
+GRAPH_VERSION = 1
+_ENTRY_REFERENCE = re.compile(r"\$(\d+)$")
+_NAME = re.compile(r"[a-z_][a-z0-9_]*$")
+RESERVED_NAMES = frozenset({"ans"})
+
+class Ref:
+    """A reference to a node of the graph: ("entry", position) or ("cell", name)."""
+    __slots__ = ("kind", "key")
+
+    def __init__(self, kind: str, key):
+        self.kind = kind
+        self.key = key
+
+    def __eq__(self, other):
+        return isinstance(other, Ref) and (self.kind, self.key) == (other.kind, other.key)
+
+    def __hash__(self):
+        return hash((self.kind, self.key))
+
+    def __repr__(self):
+        return f"Ref({self.kind!r}, {self.key!r})"
+
+    def __str__(self):
+        return f"${self.key + 1}" if self.kind == "entry" else self.key
+
+    def to_json(self):
+        return {self.kind: self.key}
+
+    @staticmethod
+    def from_json(data: dict) -> "Ref":
+        (kind, key), = data.items()
+        if kind not in ("entry", "cell"):
+            raise ValueError(f"Unknown reference kind: {kind}")
+        return Ref(kind, key)
+
+class _Node:
+    """The sources of one history entry, remembered with the calculation they produced."""
+    __slots__ = ("calculation", "kind", "refs")
+
+    def __init__(self, calculation, kind: str, refs: dict):
+        self.calculation = calculation
+        # "operation": refs maps the operand slots "a"/"b" to references;
+        # "expression": refs maps the expression's variable names to references
+        self.kind = kind
+        self.refs = refs
+
+class ProvenanceGraph:
+    """
+    Records which results fed into which calculations, as a DAG over history
+    entries and named cells, and recomputes what depends on an edited value.
+
+    Operands can refer to `ans` (the newest entry), `$N` (entry N, counting
+    from 1) or a cell defined with let(). Editing a cell or an entry's
+    operands recomputes only the entries downstream of it, in topological
+    order; an entry whose inputs come out unchanged keeps its result and
+    stops the propagation. The recomputed entries are written back with
+    History.replace_calculations() as one undoable step, which also carries
+    the cell change, so undo and redo restore both together.
+
+    Sources are kept per position along with the calculation they produced,
+    and are only trusted while that calculation is still at its position:
+    undoing an entry hides its sources and redoing it brings them back.
+    A reverse index from each node to the positions that recorded it as a
+    source is kept up to date as sources are recorded, so a recomputation
+    looks only at the entries downstream of the change.
+    """
+    def __init__(self, history, calculator):
+        self.history = history
+        self.calculator = calculator
+        self.cells = {}
+        self._nodes = {}  # position -> list of _Node versions, newest last
+        self._readers = {}  # Ref -> positions with a version that reads it
+        self._pending = {}
+
+    def __bool__(self):
+        """True once the graph holds a cell or the sources of an entry."""
+        return bool(self.cells or self._nodes)
+
+    # --- References ---
+
+    def parse_operand(self, text: str, parse_number):
+        """
+        Returns (value, ref) for an operand typed by the user: a reference
+        resolves to its current value, anything else goes to `parse_number`
+        and has no ref.
+        """
+        ref = self.parse_reference(text)
+        if ref is None:
+            return parse_number(text), None
+        return self.value(ref), ref
+
+    def parse_reference(self, text: str):
+        """Returns the Ref for "ans", "$N" or a defined cell name, or None for anything else."""
+        if text == "ans":
+            if not len(self.history.calculations):
+                raise ValidationError("There is no previous result for 'ans'.")
+            return Ref("entry", len(self.history.calculations) - 1)
+        match = _ENTRY_REFERENCE.match(text)
+        if match:
+            position = int(match.group(1)) - 1
+            if not 0 <= position < len(self.history.calculations):
+                raise ValidationError(f"There is no history entry {text}.")
+            return Ref("entry", position)
+        if text in self.cells:
+            return Ref("cell", text)
+        return None
+
+    def value(self, ref: Ref):
+        """Returns the current value of a node."""
+        if ref.kind == "entry":
+            return self._current(ref.key).result
+        source = self.cells[ref.key]
+        return self.value(source) if isinstance(source, Ref) else source
+
+    def _current(self, position: int):
+        """The calculation at `position`, or its recomputed version while a recomputation runs."""
+        calculation = self._pending.get(position)
+        return calculation if calculation is not None else self.history.calculations[position]
+
+    def variables(self, names) -> tuple:
+        """Returns ({name: value}, {name: ref}) for the names an expression uses that the graph knows."""
+        values, refs = {}, {}
+        for name in names:
+            ref = self.parse_reference(name) if name == "ans" or name in self.cells else None
+            if ref is not None:
+                values[name], refs[name] = self.value(ref), ref
+        return values, refs
+
+    # --- Recording ---
+
+    def record(self, position: int, calculation, refs: dict, kind: str = "operation"):
+        """
+        Remembers where the operands of a new entry at `position` came from.
+        Sources recorded for an earlier entry at that position (since undone
+        and overwritten) are forgotten.
+        """
+        for node in self._nodes.pop(position, ()):
+            for ref in node.refs.values():
+                readers = self._readers.get(ref)
+                if readers is not None:
+                    readers.discard(position)
+                    if not readers:
+                        del self._readers[ref]
+        if refs:
+            self._add_node(position, _Node(calculation, kind, dict(refs)))
+
+    def _add_node(self, position: int, node: _Node):
+        self._nodes.setdefault(position, []).append(node)
+        for ref in node.refs.values():
+            self._readers.setdefault(ref, set()).add(position)
+
+    def node(self, position: int):
+        """Returns the sources of the entry at `position`, if they describe the calculation there now."""
+        versions = self._nodes.get(position)
+        if not versions or position >= len(self.history.calculations):
+            return None
+        current = self.history.calculations[position]
+        for node in reversed(versions):
+            if node.calculation is current or node.calculation == current:
+                return node
+        return None
+
+    def _dependents(self, cells: dict):
+        """
+        Returns a function mapping a node to the nodes that read it now. Entries
+        come from the reverse index, keeping only those whose current version
+        reads the node; cells come from `cells`.
+        """
+        cell_readers = {}
+        for name, source in cells.items():
+            if isinstance(source, Ref):
+                cell_readers.setdefault(source, []).append(Ref("cell", name))
+
+        def dependents(ref: Ref) -> list:
+            found = []
+            for position in sorted(self._readers.get(ref, ())):
+                node = self.node(position)
+                if node is not None and ref in node.refs.values():
+                    found.append(Ref("entry", position))
+            return found + cell_readers.get(ref, [])
+        return dependents
+
+    def _upstream(self, ref: Ref, cells: dict):
+        """Yields every node `ref` reads from, directly or not."""
+        stack, seen = [ref], set()
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            yield current
+            if current.kind == "cell":
+                source = cells.get(current.key)
+                if isinstance(source, Ref):
+                    stack.append(source)
+            else:
+                node = self.node(current.key)
+                if node is not None:
+                    stack.extend(node.refs.values())
+
+    def _check_acyclic(self, target: Ref, sources, cells: dict):
+        for source in sources:
+            if isinstance(source, Ref) and target in self._upstream(source, cells):
+                raise ValidationError(f"{target} cannot depend on itself.")
+
+    # --- Editing ---
+
+    def let(self, name: str, source):
+        """
+        Defines or changes a cell: `source` is a value or a Ref. Entries that
+        read the cell are recomputed. Returns the number of entries recomputed.
+        """
+        if not _NAME.match(name) or name in RESERVED_NAMES or _is_number(name):
+            raise ValidationError(f"Invalid cell name: {name}")
+        target = Ref("cell", name)
+        with self.history.lock:
+            cells = dict(self.cells, **{name: source})
+            self._check_acyclic(target, [source], cells)
+            changes = {name: (self.cells.get(name), source)}
+            return self._recompute([target], cells, {}, changes)
+
+    def edit(self, position: int, a, b, refs: dict):
+        """
+        Changes the operands of the entry at `position` (values plus the refs
+        they came from) and recomputes it and everything downstream of it.
+        Returns the number of entries recomputed.
+        """
+        with self.history.lock:
+            if not 0 <= position < len(self.history.calculations):
+                raise ValidationError(f"There is no history entry ${position + 1}.")
+            calculation = self.history.calculations[position]
+            if calculation.operation not in OperationFactory.dispatch_table():
+                raise ValidationError("Only entries made with an operation can be edited.")
+            target = Ref("entry", position)
+            self._check_acyclic(target, refs.values(), self.cells)
+            overrides = {position: ("operation", {"a": a, "b": b}, refs)}
+            return self._recompute([target], self.cells, overrides, None)
+
+    def _recompute(self, changed: list, cells: dict, overrides: dict, cell_changes) -> int:
+        """
+        Recomputes every entry downstream of `changed`, with `cells` as the cell
+        definitions, and writes the entries that changed back as one step.
+        `overrides` maps positions to (kind, operand values, refs) that replace
+        the recorded ones. Nothing changes if a recomputation fails.
+        """
+        graph_cells, self.cells = self.cells, cells
+        replacements, new_nodes = {}, {}
+        self._pending = replacements  # Later entries read the new results
+        try:
+            for ref in _topological_order(changed, self._dependents(cells)):
+                if ref.kind == "entry":
+                    updated = self._evaluate(ref.key, overrides.get(ref.key))
+                    if updated is not None:
+                        replacements[ref.key], new_nodes[ref.key] = updated
+        finally:
+            self.cells, self._pending = graph_cells, {}
+
+        bindings = (self.cells, cell_changes) if cell_changes else None
+        if replacements or bindings:
+            self.history.replace_calculations(replacements, bindings)
+        for position, node in new_nodes.items():
+            self._add_node(position, node)
+        return len(replacements)
+
+    def _evaluate(self, position: int, override):
+        """Returns (new calculation, node) for an entry whose inputs changed, or None if they did not."""
+        calculation = self._current(position)
+        if override is not None:
+            kind, operands, refs = override
+        else:
+            node = self.node(position)
+            if node is None:
+                return None
+            kind, refs = node.kind, node.refs
+            operands = {"a": calculation.a, "b": calculation.b} if kind == "operation" else {}
+        inputs = dict(operands, **{slot: self.value(ref) for slot, ref in refs.items()})
+        try:
+            if kind == "operation":
+                if override is None and (inputs["a"], inputs["b"]) == (calculation.a, calculation.b):
+                    return None  # Early cutoff: the cached result still holds
+                updated = self.calculator.calculate(inputs["a"], inputs["b"], calculation.operation, notify=False)
+            else:
+                updated = self.calculator.evaluate(calculation.operation, inputs, notify=False)
+                if updated == calculation:
+                    return None
+        except OperationError as e:
+            raise OperationError(f"Recomputing ${position + 1} failed: {e}") from e
+        return updated, _Node(updated, kind, refs)
+
+    # --- Persistence ---
+
+    def to_json(self) -> dict:
+        entries = []
+        for position in sorted(self._nodes):
+            node = self.node(position)
+            if node is not None and node.refs:
+                entries.append({"position": position, "kind": node.kind,
+                                "refs": {slot: ref.to_json() for slot, ref in node.refs.items()}})
+        cells = {
+            name: source.to_json() if isinstance(source, Ref) else {"value": str(source)}
+            for name, source in self.cells.items()
+        }
+        return {"version": GRAPH_VERSION, "cells": cells, "entries": entries}
+
+    def save(self, file_path: str):
+        """Atomically writes the graph as JSON (temp file plus rename)."""
+        directory = os.path.dirname(os.path.abspath(file_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as temp_file:
+                json.dump(self.to_json(), temp_file, indent=1)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def load(self, file_path: str):
+        """
+        Replaces the graph with one saved by save(). Entries are matched to the
+        history by position, so load the history first.
+        """
+        with open(file_path, encoding="utf-8") as graph_file:
+            data = json.load(graph_file)
+        if data.get("version") != GRAPH_VERSION:
+            raise ValueError(f"Unsupported graph file version: {data.get('version')}")
+        cells = {}
+        for name, source in data.get("cells", {}).items():
+            cells[name] = parse_number(source["value"]) if "value" in source else Ref.from_json(source)
+        nodes = []
+        calculations = self.history.calculations
+        for entry in data.get("entries", []):
+            position = entry["position"]
+            if position < len(calculations):
+                refs = {slot: Ref.from_json(ref) for slot, ref in entry["refs"].items()}
+                nodes.append((position, _Node(calculations[position], entry["kind"], refs)))
+        # Updated in place: undo steps hold on to this mapping
+        self.cells.clear()
+        self.cells.update(cells)
+        self._nodes, self._readers = {}, {}
+        for position, node in nodes:
+            self._add_node(position, node)
+
+    def clear(self):
+        self.cells.clear()
+        self._nodes, self._readers = {}, {}
+
+def _is_number(text: str) -> bool:
+    try:
+        Decimal(text)
+    except InvalidOperation:
+        return False
+    return True
+
+def _topological_order(changed: list, dependents) -> list:
+    """
+    Returns `changed` and everything downstream of it, each node after all of
+    its inputs. `dependents(ref)` returns the nodes that read `ref`.
+    """
+    order, state = [], {}
+    for start in changed:
+        # Iterative depth-first search; a node is emitted once all of its dependents are
+        stack = [(start, iter(dependents(start)))]
+        state[start] = "open"
+        while stack:
+            ref, children = stack[-1]
+            for child in children:
+                if state.get(child) is None:
+                    state[child] = "open"
+                    stack.append((child, iter(dependents(child))))
+                    break
+            else:
+                stack.pop()
+                state[ref] = "done"
+                order.append(ref)
+    order.reverse()
+    return order
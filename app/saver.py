@@ -1,23 +1,202 @@
 # app/saver.py
-import pandas as pd
+import csv
+import io
+import os
+import tempfile
+import threading
+import time
+from app.binary_history import write_binary
+from app.storage import SQLiteHistoryWriter
+from app.metrics import METRICS, SIZE_BUCKETS
+
+COLUMNS = ['operation', 'operand_a', 'operand_b', 'result']
+
+def _write_csv(file, calculations):
+    """
+    Writes the history as CSV. pandas is imported only here, on the first save,
+    so sessions that never save don't pay for it; without pandas the csv module
+    writes the same file.
+    """
+    try:
+        import pandas as pd
+    except ImportError:
+        writer = csv.writer(file, lineterminator='\n')
+        writer.writerow(COLUMNS)
+        writer.writerows([calc.operation, calc.a, calc.b, calc.result] for calc in calculations)
+        return
+    history_list = [{
+        'operation': calc.operation,
+        'operand_a': calc.a,
+        'operand_b': calc.b,
+        'result': calc.result
+    } for calc in calculations]
+    pd.DataFrame(history_list, columns=COLUMNS).to_csv(file, index=False)
 
 class AutoSaveObserver:
-    """An observer that auto-saves the calculation history to a CSV file."""
-    def __init__(self, history_instance, file_path="history.csv"):
+    """An observer that auto-saves the calculation history to a CSV file.
+
+    In "rewrite" mode (the default) the whole history is written on every update.
+    In "append" mode only the rows added since the last save are appended through
+    a buffered file handle; the file is compacted with a full rewrite whenever an
+    undo or a load makes it diverge from the history.
+    With file_format="binary" the history is written in the binary format, which
+    is always rewritten in full.
+    With file_format="sqlite" only the changes are written to an SQLite
+    database (see app.storage.SQLiteHistoryWriter), undo/redo steps included;
+    changes are committed every `flush_every` updates or `flush_interval`
+    seconds, whichever comes first.
+    Updates from several threads are serialized by the observer's own lock; the
+    history's lock is only held while the rows to write are picked out.
+    """
+    def __init__(self, history_instance, file_path="history.csv", mode="rewrite",
+                 flush_every=1, fsync=False, file_format="csv", verbose=True, flush_interval=0):
+        if mode not in ("rewrite", "append"):
+            raise ValueError(f"Unknown autosave mode: {mode}")
+        if file_format not in ("csv", "binary", "sqlite"):
+            raise ValueError(f"Unknown history file format: {file_format}")
+        if file_format == "binary":
+            mode = "rewrite"
+        if file_format == "sqlite":
+            mode = "sqlite"
         self.history = history_instance
         self.file_path = file_path
+        self.mode = mode
+        self.flush_every = flush_every
+        self.fsync = fsync
+        self.file_format = file_format
+        self.verbose = verbose
+        self._cursor = history_instance.track_changes()
+        self._saved_rows = None  # Unknown until the first full rewrite
+        self._pending_rows = 0
+        self._handle = None
+        self._writer = None
+        self._lock = threading.Lock()
+        if file_format == "sqlite":
+            self._writer = SQLiteHistoryWriter(file_path, history_instance, batch_size=max(flush_every, 1),
+                                               batch_interval=flush_interval,
+                                               synchronous="FULL" if fsync else "NORMAL")
 
     def update(self, calculation):
-        """Receives notification and saves the entire history."""
-        # Convert the list of Calculation objects to a list of dictionaries
-        history_list = [{
-            'operation': calc.operation,
-            'operand_a': calc.a,
-            'operand_b': calc.b,
-            'result': calc.result
-        } for calc in self.history.calculations]
-        
-        # Create a pandas DataFrame and save it to CSV
-        df = pd.DataFrame(history_list)
-        df.to_csv(self.file_path, index=False)
-        print(f"History auto-saved to {self.file_path}")
\ No newline at end of file
+        """Receives notification and saves the history."""
+        with self._lock:
+            if self._writer is not None:
+                start = time.perf_counter() if METRICS.enabled else None
+                self._writer.sync()
+                if start is not None:
+                    METRICS.observe("autosave_seconds", time.perf_counter() - start, ("mode", "sqlite"))
+            elif self.mode == "append":
+                self._sync()
+            else:
+                self._rewrite()
+        if self.verbose:
+            print(f"History auto-saved to {self.file_path}")
+
+    def save_steps(self):
+        """Records an undo or redo. Only the sqlite format keeps the undo/redo position."""
+        if self._writer is not None:
+            with self._lock:
+                self._writer.sync()
+
+    def update_batch(self, calculations):
+        """Receives a whole batch and saves the history once."""
+        self.update(calculations[-1])
+
+    def _sync(self):
+        """Appends new rows, or compacts the file if the history diverged from it."""
+        with self.history.lock:
+            diverged = self._saved_rows is None or self._cursor.stable < self._saved_rows
+            if not diverged:
+                new_rows = self.history.calculations[self._saved_rows:]
+                self._cursor.stable = self._saved_rows + len(new_rows)
+        if diverged:
+            self._rewrite()
+            return
+
+        start = time.perf_counter() if METRICS.enabled else None
+        if self._handle is None:
+            self._handle = open(self.file_path, 'a', newline='')
+        block = io.StringIO()
+        csv.writer(block, lineterminator='\n').writerows([calc.operation, calc.a, calc.b, calc.result] for calc in new_rows)
+        text = block.getvalue()
+        self._handle.write(text)
+        if start is not None:
+            self._measure("append", start, len(text))
+        self._saved_rows += len(new_rows)
+
+        self._pending_rows += len(new_rows)
+        if self.flush_every and self._pending_rows >= self.flush_every:
+            self._flush_handle()
+
+    def _rewrite(self):
+        """Atomically replaces the file with the full history (temp file plus rename)."""
+        self._close_handle()
+        with self.history.lock:
+            calculations = self.history.snapshot()
+            # Changes made while the file is written lower the cursor again
+            self._cursor.stable = len(calculations)
+
+        start = time.perf_counter() if METRICS.enabled else None
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            if self.file_format == "binary":
+                os.close(fd)
+                write_binary(temp_path, calculations)
+            else:
+                with os.fdopen(fd, 'w', newline='') as temp_file:
+                    _write_csv(temp_file, calculations)
+            if self.fsync:
+                with open(temp_path, 'rb') as temp_file:
+                    os.fsync(temp_file.fileno())
+            size = os.path.getsize(temp_path) if start is not None else 0
+            os.replace(temp_path, self.file_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        if start is not None:
+            self._measure("rewrite", start, size)
+        self._saved_rows = len(calculations)
+
+    @staticmethod
+    def _measure(mode: str, start: float, size: int):
+        METRICS.observe("autosave_seconds", time.perf_counter() - start, ("mode", mode))
+        METRICS.observe("autosave_bytes", size, ("mode", mode), buckets=SIZE_BUCKETS)
+        METRICS.increment("autosave_bytes_total", size)
+
+    def flush(self):
+        """Brings the file up to date with the history and flushes buffered rows to disk."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._writer is not None:
+            self._writer.sync()
+            self._writer.commit()
+        elif self._saved_rows is not None:
+            if self.mode == "append":
+                self._sync()
+            elif self._cursor.stable < self._saved_rows or self._saved_rows != len(self.history.calculations):
+                self._rewrite()
+        self._flush_handle()
+
+    def _flush_handle(self):
+        if self._handle is not None:
+            self._handle.flush()
+            if self.fsync:
+                os.fsync(self._handle.fileno())
+        self._pending_rows = 0
+
+    def _close_handle(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        self._pending_rows = 0
+
+    def close(self):
+        """Flushes any pending rows and releases the file handle."""
+        with self._lock:
+            self._flush()
+            self._close_handle()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
@@ -0,0 +1,314 @@
+# app/segment_store.py
+import os
+import shutil
+import sys
+import tempfile
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableSequence, Sequence
+from app.binary_history import BinaryHistoryFile, write_binary
+from app.history_store import ColumnarHistoryStore
+
+class _Segment:
+    """A full chunk of calculations spilled to a binary history file."""
+    __slots__ = ("path", "size")
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+
+def _chunk_bytes(chunk) -> int:
+    """Estimates the memory held by an in-memory chunk."""
+    if isinstance(chunk, ColumnarHistoryStore):
+        return chunk.nbytes()
+    size = sys.getsizeof(chunk)
+    for calc in chunk:
+        size += sys.getsizeof(calc) + sys.getsizeof(calc.a) + sys.getsizeof(calc.b) + sys.getsizeof(calc.result)
+    return size
+
+class SegmentedHistoryStore(MutableSequence):
+    """
+    A list-like container of Calculations that keeps only the newest entries
+    in memory and spills older ones to disk.
+
+    Entries are grouped in chunks of `segment_rows`; every chunk but the last
+    is full, so entry i lives in chunk i // segment_rows. Once the chunks in
+    memory hold more than `max_in_memory` entries (or an estimated `max_bytes`
+    bytes), the oldest full chunks are written to `spill_dir` in the binary
+    history format (see app.binary_history) and dropped from memory. Reading a
+    spilled entry maps its segment file; deleting entries back into a spilled
+    chunk (a deep undo) pages that chunk back into memory.
+
+    `chunk_factory` builds the in-memory chunks: list (the default) or
+    ColumnarHistoryStore. When no `spill_dir` is given a temporary directory is
+    used and removed when the store is closed or garbage collected.
+    """
+    MAX_OPEN_SEGMENTS = 4
+
+    def __init__(self, calculations=(), max_in_memory: int = 0, max_bytes: int = 0, segment_rows: int = 8192,
+                 spill_dir: str = None, chunk_factory=list):
+        if max_in_memory > 0:
+            segment_rows = min(segment_rows, max(max_in_memory // 2, 1))
+        self.max_in_memory = max_in_memory
+        self.max_bytes = max_bytes
+        self.segment_rows = segment_rows
+        self.chunk_factory = chunk_factory
+        self._spill_root = spill_dir
+        self._directory = None
+        self._cleanup = None
+        self._chunks = []  # _Segment for spilled chunks (always the oldest), containers for the rest
+        self._spilled = 0  # Number of leading chunks that are on disk
+        self._chunk_bytes = {}  # id(chunk) -> estimated bytes, for full in-memory chunks
+        self._memory_bytes = 0
+        self._length = 0
+        self._open = OrderedDict()  # path -> BinaryHistoryFile, least recently used first
+        self._next_segment = 0
+        self.spills = 0
+        self.page_ins = 0
+        self.spilled_bytes = 0
+        self.extend(calculations)
+
+    # --- Reading ---
+
+    def __len__(self):
+        return self._length
+
+    def _locate(self, index: int) -> tuple:
+        return divmod(index, self.segment_rows)
+
+    def _segment_file(self, segment: _Segment) -> BinaryHistoryFile:
+        history_file = self._open.get(segment.path)
+        if history_file is None:
+            history_file = self._open[segment.path] = BinaryHistoryFile(segment.path)
+            if len(self._open) > self.MAX_OPEN_SEGMENTS:
+                _, oldest = self._open.popitem(last=False)
+                oldest.close()
+        else:
+            self._open.move_to_end(segment.path)
+        return history_file
+
+    def _chunk_view(self, number: int):
+        """Returns chunk `number` as an indexable sequence, mapping it from disk if it was spilled."""
+        chunk = self._chunks[number]
+        return self._segment_file(chunk) if isinstance(chunk, _Segment) else chunk
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step == 1:
+                return list(self._iter_range(start, stop))
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("history index out of range")
+        number, offset = self._locate(index)
+        return self._chunk_view(number)[offset]
+
+    def _iter_range(self, start: int, stop: int):
+        while start < stop:
+            number, offset = self._locate(start)
+            count = min(self.segment_rows - offset, stop - start)
+            yield from self._chunk_view(number)[offset:offset + count]
+            start += count
+
+    def __iter__(self):
+        return self._iter_range(0, self._length)
+
+    # --- Appending and spilling ---
+
+    def append(self, calculation):
+        chunks = self._chunks
+        if not chunks or isinstance(chunks[-1], _Segment) or len(chunks[-1]) == self.segment_rows:
+            if chunks and not isinstance(chunks[-1], _Segment) and id(chunks[-1]) not in self._chunk_bytes:
+                self._sealed(chunks[-1])
+            chunks.append(self.chunk_factory())
+        chunks[-1].append(calculation)
+        self._length += 1
+
+    def extend(self, calculations):
+        for calculation in calculations:
+            self.append(calculation)
+
+    def _sealed(self, chunk):
+        """Called when an in-memory chunk becomes full; spills old chunks if a limit is exceeded."""
+        size = _chunk_bytes(chunk)
+        self._chunk_bytes[id(chunk)] = size
+        self._memory_bytes += size
+        while self._over_limit() and self._spilled < len(self._chunks) - 1:
+            self._spill(self._spilled)
+
+    def _over_limit(self) -> bool:
+        in_memory = self._length - self._spilled * self.segment_rows
+        if self.max_in_memory and in_memory > self.max_in_memory:
+            return True
+        return bool(self.max_bytes) and self._memory_bytes > self.max_bytes
+
+    def _spill_directory(self) -> str:
+        if self._directory is None:
+            if self._spill_root is not None:
+                os.makedirs(self._spill_root, exist_ok=True)
+            self._directory = tempfile.mkdtemp(prefix="calculator-history-", dir=self._spill_root)
+            self._cleanup = weakref.finalize(self, shutil.rmtree, self._directory, ignore_errors=True)
+        return self._directory
+
+    def _spill(self, number: int):
+        chunk = self._chunks[number]
+        path = os.path.join(self._spill_directory(), f"segment-{self._next_segment:08d}.bin")
+        self._next_segment += 1
+        write_binary(path, chunk)
+        self._chunks[number] = _Segment(path, len(chunk))
+        self._memory_bytes -= self._chunk_bytes.pop(id(chunk))
+        self._spilled += 1
+        self.spills += 1
+        self.spilled_bytes += os.path.getsize(path)
+
+    def _page_in(self, number: int):
+        """Reads a spilled chunk back into memory, as the open chunk, and deletes its file."""
+        segment = self._chunks[number]
+        history_file = self._open.pop(segment.path, None)
+        if history_file is not None:
+            history_file.close()
+        with BinaryHistoryFile(segment.path) as history_file:
+            chunk = self.chunk_factory()
+            chunk.extend(history_file)
+        self.spilled_bytes -= os.path.getsize(segment.path)
+        os.remove(segment.path)
+        self._chunks[number] = chunk
+        self._spilled -= 1
+        self.page_ins += 1
+
+    # --- Truncating ---
+
+    def truncate(self, length: int):
+        """Drops every entry from `length` onwards, paging in the chunk it ends in if needed."""
+        length = max(length, 0)
+        chunks = self._chunks
+        while self._length > length:
+            last = len(chunks) - 1
+            chunk = chunks[last]
+            first = last * self.segment_rows
+            if length <= first:
+                # The whole chunk goes
+                if isinstance(chunk, _Segment):
+                    self._drop_segment(chunk)
+                    self._spilled -= 1
+                else:
+                    self._memory_bytes -= self._chunk_bytes.pop(id(chunk), 0)
+                chunks.pop()
+                self._length = first
+                continue
+            if isinstance(chunk, _Segment):
+                self._page_in(last)
+                chunk = chunks[last]
+            self._memory_bytes -= self._chunk_bytes.pop(id(chunk), 0)  # It is the open chunk again
+            del chunk[length - first:]
+            self._length = length
+
+    def _drop_segment(self, segment: _Segment):
+        history_file = self._open.pop(segment.path, None)
+        if history_file is not None:
+            history_file.close()
+        self.spilled_bytes -= os.path.getsize(segment.path)
+        os.remove(segment.path)
+
+    def clear(self):
+        self.truncate(0)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step == 1 and stop >= self._length:
+                # Deleting from the end (undo) is the common case
+                self.truncate(min(start, self._length))
+                return
+        elif index in (-1, self._length - 1) and self._length:
+            self.truncate(self._length - 1)
+            return
+        remaining = list(self)
+        del remaining[index]
+        self._replace(remaining)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice) and index == slice(None):
+            self._replace(list(value))
+            return
+        if not isinstance(index, slice):
+            self._set_entry(index, value)
+            return
+        remaining = list(self)
+        remaining[index] = value
+        self._replace(remaining)
+
+    def _set_entry(self, index: int, calculation):
+        """Replaces one entry; a spilled segment is rewritten with the new entry."""
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("history index out of range")
+        number, offset = self._locate(index)
+        chunk = self._chunks[number]
+        if not isinstance(chunk, _Segment):
+            chunk[offset] = calculation
+            return
+        entries = list(self._chunk_view(number))
+        entries[offset] = calculation
+        self._drop_segment(chunk)
+        path = os.path.join(self._spill_directory(), f"segment-{self._next_segment:08d}.bin")
+        self._next_segment += 1
+        write_binary(path, entries)
+        self._chunks[number] = _Segment(path, len(entries))
+        self.spilled_bytes += os.path.getsize(path)
+
+    def insert(self, index, calculation):
+        if index >= self._length:
+            self.append(calculation)
+            return
+        remaining = list(self)
+        remaining.insert(index, calculation)
+        self._replace(remaining)
+
+    def _replace(self, calculations: list):
+        self.clear()
+        self.extend(calculations)
+
+    # --- Other ---
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence) and not isinstance(other, (str, bytes)):
+            return len(self) == len(other) and all(x == y for x, y in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"SegmentedHistoryStore({len(self)} entries, {self._spilled} spilled segments)"
+
+    def __deepcopy__(self, memo):
+        # A copy of a spilled history is a plain list of its entries
+        return list(self)
+
+    def nbytes(self) -> int:
+        """Estimates the memory held by the entries that are in memory."""
+        open_chunk = 0
+        if self._chunks and not isinstance(self._chunks[-1], _Segment) and id(self._chunks[-1]) not in self._chunk_bytes:
+            open_chunk = _chunk_bytes(self._chunks[-1])
+        return self._memory_bytes + open_chunk
+
+    def stats(self) -> dict:
+        spilled_rows = sum(chunk.size for chunk in self._chunks[:self._spilled])
+        return {
+            "entries": self._length,
+            "in_memory": self._length - spilled_rows,
+            "spilled": spilled_rows,
+            "segments": self._spilled,
+            "spills": self.spills,
+            "page_ins": self.page_ins,
+            "disk_bytes": self.spilled_bytes,
+        }
+
+    def close(self):
+        """Closes the mapped segment files and removes the spill directory."""
+        for history_file in self._open.values():
+            history_file.close()
+        self._open.clear()
+        if self._cleanup is not None:
+            self._cleanup()
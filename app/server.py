@@ -0,0 +1,302 @@
+# app/server.py
+import asyncio
+import json
+import logging
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from app.exceptions import CalculatorError, ValidationError
+from app.history import History
+from app.metrics import METRICS
+
+# The longest request line accepted, in bytes
+MAX_LINE = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+def _to_decimal(value) -> Decimal:
+    if isinstance(value, float):
+        # Go through repr so 0.1 stays 0.1 rather than its binary expansion
+        value = repr(value)
+    try:
+        return Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValidationError(f"Invalid number: {value!r}") from None
+
+def _calculation_to_json(calculation) -> dict:
+    return {
+        "operation": calculation.operation,
+        "a": str(calculation.a),
+        "b": str(calculation.b),
+        "result": str(calculation.result),
+    }
+
+class Session:
+    """The state of one client connection."""
+    def __init__(self, session_id: int, history: History):
+        self.id = session_id
+        self.history = history
+        self.requests = 0
+
+class CalculationServer:
+    """
+    A long-lived calculation service speaking line-delimited JSON.
+
+    Each request is one line such as
+        {"id": 1, "method": "calculate", "params": {"operation": "add", "a": "2", "b": "3"}}
+    and gets one response line carrying the same id, with either a "result" or
+    an "error". Clients may pipeline requests: a connection's requests are
+    handled in order and its responses come back in the same order.
+
+    With sessions="shared" every connection works on `history`; with
+    sessions="isolated" each connection gets a history of its own. Observers
+    attached to the calculator (logging, autosave) are shared either way, so
+    in isolated mode an autosave observer still saves the history it was
+    given, not the sessions' histories: those live only as long as their
+    connections.
+
+    Requests that compute or change a history run on the event loop's default
+    executor: they notify the calculator's observers, whose work (an autosave
+    rewrite, a log write) would otherwise hold up every other connection.
+    Read-only requests are quick and run on the loop.
+    """
+    SESSION_MODES = ("shared", "isolated")
+    # Methods that run observers or grow with the request, run off the event loop
+    OFFLOADED = frozenset(("calculate", "batch", "eval", "undo", "redo"))
+
+    def __init__(self, calculator, history: History = None, sessions: str = "shared",
+                 history_backend: str = "list"):
+        if sessions not in self.SESSION_MODES:
+            raise ValueError(f"Unknown session mode: {sessions}")
+        self.calculator = calculator
+        self.history = history if history is not None else History(history_backend, verbose=False)
+        self.sessions = sessions
+        self.history_backend = history_backend
+        self._methods = {
+            "calculate": self._calculate,
+            "batch": self._batch,
+            "eval": self._eval,
+            "history": self._history,
+            "undo": self._undo,
+            "redo": self._redo,
+            "health": self._health,
+            "metrics": self._metrics,
+        }
+        self._server = None
+        self._next_session = 1
+        self._started = time.monotonic()
+        self.connections = 0
+        self.active_connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.request_seconds = 0.0
+        self.method_counts = dict.fromkeys(self._methods, 0)
+        # Offloaded requests update the counters from executor threads
+        self._counter_lock = threading.Lock()
+
+    # --- Lifecycle ---
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        """Starts listening on TCP. Port 0 picks a free port (see `address`)."""
+        self._server = await asyncio.start_server(self._handle_connection, host, port, limit=MAX_LINE)
+        return self._server
+
+    async def start_unix(self, path: str):
+        """Starts listening on a Unix domain socket."""
+        self._server = await asyncio.start_unix_server(self._handle_connection, path, limit=MAX_LINE)
+        return self._server
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname() if self._server is not None else None
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def new_session(self) -> Session:
+        if self.sessions == "shared":
+            history = self.history
+        else:
+            history = History(self.history_backend, verbose=False)
+        session = Session(self._next_session, history)
+        self._next_session += 1
+        return session
+
+    # --- Connections ---
+
+    async def _handle_connection(self, reader, writer):
+        session = self.new_session()
+        self.connections += 1
+        self.active_connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    writer.write(self._encode({"id": None, "error": "Request line is too long."}))
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                writer.write(self._encode(await self._handle_line_async(session, line)))
+                # Only wait for the socket when its buffer is full, so pipelined
+                # responses are sent together
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.active_connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    def _encode(response: dict) -> bytes:
+        return (json.dumps(response, separators=(",", ":")) + "\n").encode()
+
+    async def _handle_line_async(self, session: Session, line) -> dict:
+        """Like handle_line, but runs offloaded methods on the loop's executor."""
+        request = self._decode(line)
+        if "error" in request:
+            return request
+        if request.get("method") in self.OFFLOADED:
+            # The calculator and history are thread-safe; the connection waits for
+            # its response, so its requests still run in order
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.handle_request, session, request)
+        return self.handle_request(session, request)
+
+    def _decode(self, line) -> dict:
+        """Returns the decoded request, or the error response for a malformed line."""
+        try:
+            request = json.loads(line)
+        except ValueError:
+            self._count(None)
+            self._finish(failed=True)
+            return {"id": None, "error": "Invalid JSON."}
+        if not isinstance(request, dict):
+            self._count(None)
+            self._finish(failed=True)
+            return {"id": None, "error": "A request must be a JSON object."}
+        return request
+
+    def handle_line(self, session: Session, line) -> dict:
+        """Decodes one request line and returns the response object."""
+        request = self._decode(line)
+        if "error" in request:
+            return request
+        return self.handle_request(session, request)
+
+    def handle_request(self, session: Session, request: dict) -> dict:
+        """Runs one decoded request for a session and returns the response object."""
+        start = time.perf_counter()
+        request_id = request.get("id")
+        name = request.get("method")
+        method = self._methods.get(name) if isinstance(name, str) else None
+        session.requests += 1
+        self._count(name if method is not None else None)
+        try:
+            if method is None:
+                raise ValidationError(f"Unknown method: {name}")
+            params = request.get("params") or {}
+            if not isinstance(params, dict):
+                raise ValidationError("params must be a JSON object.")
+            response = {"id": request_id, "result": method(session, params)}
+        except (CalculatorError, ArithmeticError, KeyError, TypeError, ValueError) as e:
+            message = f"Missing parameter: {e}" if isinstance(e, KeyError) else str(e)
+            response = {"id": request_id, "error": message}
+        except Exception as e:
+            # Anything else is a bug, not a bad request: log it and keep the connection going
+            logger.exception("Request %r failed", name)
+            response = {"id": request_id, "error": f"Internal error: {type(e).__name__}"}
+        self._finish("error" in response, time.perf_counter() - start)
+        return response
+
+    def _count(self, method_name):
+        """Counts a request as it starts, so "metrics" includes itself."""
+        with self._counter_lock:
+            self.requests += 1
+            if method_name is not None:
+                self.method_counts[method_name] += 1
+
+    def _finish(self, failed: bool, seconds: float = 0.0):
+        with self._counter_lock:
+            if failed:
+                self.errors += 1
+            self.request_seconds += seconds
+
+    # --- Methods ---
+
+    def _calculate(self, session, params):
+        calculation = self.calculator.calculate(
+            _to_decimal(params["a"]), _to_decimal(params["b"]), str(params["operation"]).lower())
+        session.history.add_calculation(calculation)
+        return _calculation_to_json(calculation)
+
+    def _batch(self, session, params):
+        rows = []
+        for row in params["rows"]:
+            if isinstance(row, dict):
+                row = (row["operation"], row["a"], row["b"])
+            operation, a, b = row
+            rows.append((_to_decimal(a), _to_decimal(b), str(operation).lower()))
+        result = self.calculator.calculate_many(rows, fast=bool(params.get("fast", False)), notify=False)
+        session.history.add_calculations(result.succeeded)
+        self.calculator.notify_batch(result.succeeded)
+        errors = dict(result.errors)
+        return [
+            _calculation_to_json(calculation) if calculation is not None else {"error": str(errors[index])}
+            for index, calculation in enumerate(result.calculations)
+        ]
+
+    def _eval(self, session, params):
+        variables = {name: _to_decimal(value) for name, value in (params.get("variables") or {}).items()}
+        calculation = self.calculator.evaluate(str(params["expression"]), variables)
+        session.history.add_calculation(calculation)
+        return _calculation_to_json(calculation)
+
+    def _history(self, session, params):
+        calculations = session.history.calculations
+        limit = params.get("limit")
+        start = max(len(calculations) - int(limit), 0) if limit is not None else 0
+        return [_calculation_to_json(calculations[index]) for index in range(start, len(calculations))]
+
+    def _undo(self, session, params):
+        return {"changed": session.history.undo(), "size": len(session.history.calculations)}
+
+    def _redo(self, session, params):
+        return {"changed": session.history.redo(), "size": len(session.history.calculations)}
+
+    def _health(self, session, params):
+        return {
+            "status": "ok",
+            "uptime": round(time.monotonic() - self._started, 3),
+            "sessions": self.sessions,
+            "active_connections": self.active_connections,
+        }
+
+    def _metrics(self, session, params):
+        metrics = {
+            "connections": self.connections,
+            "active_connections": self.active_connections,
+            "requests": self.requests,
+            "errors": self.errors,
+            "request_seconds": round(self.request_seconds, 6),
+            "methods": dict(self.method_counts),
+            "history_size": len(session.history.calculations),
+        }
+        if self.calculator.cache is not None:
+            metrics["cache"] = self.calculator.cache.stats()
+        if METRICS.enabled:
+            metrics["instrumentation"] = METRICS.snapshot()
+        return metrics
@@ -0,0 +1,380 @@
+# app/storage.py
+import time
+from abc import ABC, abstractmethod
+from itertools import islice
+from app.calculation import Calculation
+from app.calculator_memento import CalculatorMemento, AppendRecord, ExtendRecord, BulkLoadRecord, UpdateRecord
+from app.history_io import DEFAULT_CHUNK_SIZE, iter_csv_chunks, parse_number, write_csv
+from app.binary_history import BinaryHistoryFile, write_binary
+
+class HistoryBackend(ABC):
+    """
+    A durable store for a History. save() writes the whole history; load()
+    fills `container` with the stored calculations and returns the undo and
+    redo stacks to restore, which are empty for formats that only keep the
+    calculations.
+    """
+    @abstractmethod
+    def save(self, file_path: str, history, progress=None) -> int:
+        """Writes `history` to `file_path` and returns the number of rows written."""
+
+    @abstractmethod
+    def load(self, file_path: str, container, progress=None) -> tuple:
+        """Extends `container` with the stored calculations and returns (undo_stack, redo_stack)."""
+
+class CsvBackend(HistoryBackend):
+    """Plain CSV, one row per calculation (see app.history_io)."""
+    def save(self, file_path: str, history, progress=None) -> int:
+        return write_csv(file_path, history.calculations, progress=progress)
+
+    def load(self, file_path: str, container, progress=None) -> tuple:
+        for chunk in iter_csv_chunks(file_path, progress=progress):
+            container.extend(chunk)
+        return [], []
+
+class BinaryBackend(HistoryBackend):
+    """The fixed-width binary format (see app.binary_history)."""
+    def save(self, file_path: str, history, progress=None) -> int:
+        return write_binary(file_path, history.calculations, progress=progress)
+
+    def load(self, file_path: str, container, progress=None) -> tuple:
+        with BinaryHistoryFile(file_path) as history_file:
+            container.extend(history_file)
+        if progress is not None:
+            progress(len(container))
+        return [], []
+
+# --- SQLite ---
+# The database stores the history as a timeline: the baseline (step 0, which
+# cannot be undone) followed by every undoable step, including those that can
+# currently be redone. Each step owns a contiguous range of calculation rows:
+# an "append" step adds its rows to the history, a "replace" step (a memento
+# restore) replaces the history with them and an "update" step (a
+# recomputation) writes them over the positions listed in the updates table.
+# meta.applied is the number of steps currently applied, so the undo/redo
+# position survives a crash. Numbers are stored as their exact decimal text.
+SCHEMA_VERSION = "1"
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS calculations (position INTEGER PRIMARY KEY, operation TEXT NOT NULL, "
+    "operand_a TEXT NOT NULL, operand_b TEXT NOT NULL, result TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS steps (step INTEGER PRIMARY KEY, kind TEXT NOT NULL, "
+    "start INTEGER NOT NULL, stop INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS updates (row INTEGER PRIMARY KEY, target INTEGER NOT NULL)",
+)
+_INSERT_ROW = "INSERT INTO calculations VALUES (?, ?, ?, ?, ?)"
+_INSERT_STEP = "INSERT INTO steps VALUES (?, ?, ?, ?)"
+_INSERT_UPDATE = "INSERT INTO updates VALUES (?, ?)"
+_SET_META = "INSERT OR REPLACE INTO meta VALUES (?, ?)"
+
+def connect_sqlite(file_path: str, synchronous: str = "NORMAL"):
+    """
+    Opens a history database in WAL mode, creating the schema if needed.
+    Transactions are managed explicitly (BEGIN/COMMIT), so several changes can
+    be committed together. sqlite3 is imported here, on first use.
+    """
+    import sqlite3
+    connection = sqlite3.connect(file_path, isolation_level=None, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(f"PRAGMA synchronous={synchronous}")
+    for statement in _SCHEMA:
+        connection.execute(statement)
+    return connection
+
+def _step_rows(record) -> tuple:
+    """Returns (kind, rows) for an undo log record."""
+    if record.replaces_all:
+        return "replace", record.current.get_state()
+    if isinstance(record, UpdateRecord):
+        return "update", record.after
+    if isinstance(record, AppendRecord):
+        return "append", [record.calculation]
+    return "append", record.calculations
+
+def _baseline(calculations, steps, applied: int):
+    """Iterates over the calculations as they were before the first step of the timeline."""
+    first_replace = next((i for i in range(applied) if steps[i].replaces_all), None)
+    if first_replace is None:
+        state, appended = calculations, range(applied)
+    else:
+        state, appended = steps[first_replace].previous.get_state(), range(first_replace)
+    if any(isinstance(steps[i], UpdateRecord) for i in appended):
+        # Entries were replaced in place: take the steps back on a copy
+        state = list(state)
+        for i in reversed(appended):
+            step = steps[i]
+            if isinstance(step, UpdateRecord):
+                for position, calculation in zip(step.positions, step.before):
+                    state[position] = calculation
+            else:
+                del state[len(state) - len(_step_rows(step)[1]):]
+        return state
+    count = sum(len(_step_rows(steps[i])[1]) for i in appended)
+    return islice(state, len(state) - count)
+
+def _insert_rows(connection, start: int, rows, progress=None) -> int:
+    """Inserts rows at consecutive positions from `start` in chunks and returns the next position."""
+    iterator = iter(rows)
+    position = start
+    while True:
+        chunk = list(islice(iterator, DEFAULT_CHUNK_SIZE))
+        if not chunk:
+            return position
+        connection.executemany(_INSERT_ROW, (
+            (position + i, calc.operation, str(calc.a), str(calc.b), str(calc.result))
+            for i, calc in enumerate(chunk)
+        ))
+        position += len(chunk)
+        if progress is not None:
+            progress(position - start)
+
+def _insert_steps(connection, first_number: int, records, start: int) -> list:
+    """Inserts `records` as steps numbered from `first_number` and returns where each one's rows end."""
+    stops = []
+    for number, record in enumerate(records, first_number):
+        kind, rows = _step_rows(record)
+        stop = _insert_rows(connection, start, rows)
+        connection.execute(_INSERT_STEP, (number, kind, start, stop))
+        if kind == "update":
+            connection.executemany(_INSERT_UPDATE, zip(range(start, stop), record.positions))
+        stops.append(stop)
+        start = stop
+    return stops
+
+def _write_timeline(connection, history, progress=None) -> tuple:
+    """Replaces the database contents with the history's timeline. Returns (baseline_rows, step_stops)."""
+    steps, applied = history.timeline()
+    connection.execute("DELETE FROM calculations")
+    connection.execute("DELETE FROM steps")
+    connection.execute("DELETE FROM updates")
+    baseline = _baseline(history.calculations, steps, applied)
+    baseline_rows = _insert_rows(connection, 0, baseline, progress)
+    connection.execute(_INSERT_STEP, (0, "replace", 0, baseline_rows))
+    stops = _insert_steps(connection, 1, steps, baseline_rows)
+    connection.executemany(_SET_META, [("version", SCHEMA_VERSION), ("applied", str(applied))])
+    return baseline_rows, stops
+
+class SQLiteBackend(HistoryBackend):
+    """An SQLite database in WAL mode that also keeps the undo/redo position."""
+    def save(self, file_path: str, history, progress=None) -> int:
+        connection = connect_sqlite(file_path)
+        try:
+            connection.execute("BEGIN")
+            try:
+                _write_timeline(connection, history, progress)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            return len(history.calculations)
+        finally:
+            connection.close()
+
+    def load(self, file_path: str, container, progress=None) -> tuple:
+        # sqlite3 would silently create a missing file
+        with open(file_path, "rb"):
+            pass
+        connection = connect_sqlite(file_path)
+        try:
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+            if meta.get("version", SCHEMA_VERSION) != SCHEMA_VERSION:
+                raise ValueError(f"Unsupported history database version: {meta['version']}")
+            steps = connection.execute("SELECT kind, start, stop FROM steps ORDER BY step").fetchall()
+            first = steps[0][1] if steps else 0
+            cursor = connection.execute("SELECT operation, operand_a, operand_b, result FROM calculations "
+                                        "WHERE position >= ? ORDER BY position", (first,))
+            rows = self._iter_rows(cursor, progress)
+            if not steps:
+                container.extend(rows)
+                return [], []
+            targets = connection.execute("SELECT target FROM updates WHERE row >= ? ORDER BY row", (first,))
+            return self._replay(rows, steps, int(meta.get("applied", 0)), container,
+                                [target for target, in targets])
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _iter_rows(cursor, progress=None):
+        read = 0
+        while True:
+            chunk = cursor.fetchmany(DEFAULT_CHUNK_SIZE)
+            if not chunk:
+                return
+            read += len(chunk)
+            if progress is not None:
+                progress(read)
+            yield from (Calculation(parse_number(a), parse_number(b), operation, parse_number(result))
+                        for operation, a, b, result in chunk)
+
+    @staticmethod
+    def _replay(rows, steps: list, applied: int, container, targets=()) -> tuple:
+        """
+        Fills `container` with the baseline and the applied steps, streaming the
+        rows in position order, and rebuilds the undo and redo stacks.
+        `targets` lists the positions the update steps' rows replace, in order.
+        """
+        _, start, stop = steps[0]
+        container.extend(islice(rows, stop - start))
+        undo_stack, redone = [], []
+        state = container
+        targets = iter(targets)
+        for number, (kind, start, stop) in enumerate(steps[1:], 1):
+            part = list(islice(rows, stop - start))
+            if number == applied + 1 and any(step[0] != "append" for step in steps[number:]):
+                # Redoable restores and updates need the states before them: replay on a copy
+                state = list(container)
+            if kind == "replace":
+                record = BulkLoadRecord(CalculatorMemento(state), CalculatorMemento(part))
+            elif kind == "update":
+                record = UpdateRecord(state, dict(zip(islice(targets, len(part)), part)))
+            elif len(part) == 1:
+                record = AppendRecord(part[0])
+            else:
+                record = ExtendRecord(part)
+            if number <= applied:
+                record.apply(container)
+                undo_stack.append(record)
+            else:
+                if state is not container:
+                    record.apply(state)
+                redone.append(record)
+        return undo_stack, redone[::-1]
+
+class SQLiteHistoryWriter:
+    """
+    Keeps an SQLite history database in step with a History, writing only what
+    changed since the last sync(): new steps are inserted with executemany and
+    undone steps that were overwritten are deleted; an undo or a redo only
+    updates the stored position. Steps the history forgot (see
+    History.max_undo_depth) are merged into the stored baseline.
+
+    Changes are grouped into transactions that are committed every
+    `batch_size` syncs or, if `batch_interval` is set, once that many seconds
+    have passed since the last commit (checked on each sync), and always by
+    commit() and close(). A sync that fails rolls its transaction back.
+    The history's lock is held while the changes are written, so they are
+    always a consistent state.
+    """
+    def __init__(self, file_path: str, history, batch_size: int = 1, batch_interval: float = 0,
+                 synchronous: str = "NORMAL", clock=time.monotonic):
+        self.history = history
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._clock = clock
+        self._connection = connect_sqlite(file_path, synchronous)
+        self._cursor = history.track_changes()
+        self._base_step = 0
+        self._baseline_start = 0
+        self._baseline_stop = None  # Unknown until the first full write
+        self._evicted = 0
+        self._steps = []
+        self._stops = []
+        self._pending = 0
+        self._last_commit = clock()
+
+    def sync(self):
+        """Writes the changes since the last sync, committing when a batch is complete."""
+        with self.history.lock:
+            if self._pending == 0:
+                self._connection.execute("BEGIN")
+            try:
+                self._sync()
+            except BaseException:
+                self._rollback()
+                raise
+        self._pending += 1
+        if self._pending >= self.batch_size or (
+                self.batch_interval > 0 and self._clock() - self._last_commit >= self.batch_interval):
+            self.commit()
+
+    def _rollback(self):
+        """Abandons the open transaction; the next sync() rewrites the whole database."""
+        if self._connection.in_transaction:
+            self._connection.execute("ROLLBACK")
+        self._pending = 0
+        self._baseline_stop = None
+        self._steps, self._stops = [], []
+
+    def _sync(self):
+        steps, applied = self.history.timeline()
+        evicted = self.history.evicted_steps - self._evicted
+        if evicted and self._baseline_stop is not None:
+            if (evicted < len(self._steps) and len(steps) and self._steps[evicted] is steps[0]
+                    and not any(isinstance(step, UpdateRecord) for step in self._steps[:evicted])):
+                self._merge_into_baseline(evicted)
+            else:
+                self._baseline_stop = None
+        common = min(len(self._steps), len(steps))
+        while common and self._steps[common - 1] is not steps[common - 1]:
+            common -= 1
+        if self._baseline_needs_rewrite(common, steps):
+            self._base_step, self._baseline_start = 0, 0
+            self._baseline_stop, self._stops = _write_timeline(self._connection, self.history)
+            self._steps = list(steps)
+        else:
+            if common < len(self._steps):
+                self._connection.execute("DELETE FROM steps WHERE step > ?", (self._base_step + common,))
+                self._connection.execute("DELETE FROM calculations WHERE position >= ?", (self._end(common),))
+                self._connection.execute("DELETE FROM updates WHERE row >= ?", (self._end(common),))
+                del self._steps[common:], self._stops[common:]
+            new_steps = [steps[i] for i in range(common, len(steps))]
+            self._stops += _insert_steps(self._connection, self._base_step + common + 1, new_steps,
+                                         self._end(common))
+            self._steps += new_steps
+            self._connection.execute(_SET_META, ("applied", str(applied)))
+        self._evicted = self.history.evicted_steps
+        self._cursor.stable = len(self.history.calculations)
+
+    def _merge_into_baseline(self, count: int):
+        """Folds the oldest `count` stored steps into the baseline and deletes the rows nothing needs."""
+        start = self._baseline_start
+        for i in range(count):
+            if self._steps[i].replaces_all:
+                start = self._end(i)
+        stop = self._stops[count - 1]
+        base_step = self._base_step + count
+        self._connection.execute("UPDATE steps SET kind = 'replace', start = ?, stop = ? WHERE step = ?",
+                                 (start, stop, base_step))
+        self._connection.execute("DELETE FROM steps WHERE step < ?", (base_step,))
+        self._connection.execute("DELETE FROM calculations WHERE position < ?", (start,))
+        self._base_step, self._baseline_start, self._baseline_stop = base_step, start, stop
+        del self._steps[:count], self._stops[:count]
+
+    def _end(self, steps: int) -> int:
+        """Returns the row position where the first `steps` steps end."""
+        return self._stops[steps - 1] if steps else self._baseline_stop
+
+    def _baseline_needs_rewrite(self, common: int, steps) -> bool:
+        if self._baseline_stop is None:
+            return True
+        if common:
+            return False
+        # No step in common: a load (or undoing everything and starting over) may have changed the baseline
+        if self._steps or len(steps):
+            return True
+        baseline_rows = self._baseline_stop - self._baseline_start
+        return self._cursor.stable < baseline_rows or len(self.history.calculations) != baseline_rows
+
+    def commit(self):
+        """Commits the open transaction, if any."""
+        if self._pending:
+            self._connection.execute("COMMIT")
+            self._pending = 0
+        self._last_commit = self._clock()
+
+    def close(self):
+        self.commit()
+        self._connection.close()
+
+STORAGE_BACKENDS = {
+    "csv": CsvBackend(),
+    "binary": BinaryBackend(),
+    "sqlite": SQLiteBackend(),
+}
+
+def get_backend(file_format: str) -> HistoryBackend:
+    """Returns the storage backend for a history file format."""
+    try:
+        return STORAGE_BACKENDS[file_format]
+    except KeyError:
+        raise ValueError(f"Unknown history file format: {file_format}") from None
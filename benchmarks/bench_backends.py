@@ -0,0 +1,92 @@
+# benchmarks/bench_backends.py
+"""Compares the numeric backends on throughput and accuracy over every built-in operation.
+
+Throughput is calculations per second through Calculator.calculate_many.
+Accuracy is the worst relative error against a 60-digit Decimal reference;
+for intervals it is the worst relative width, and "miss" marks an interval
+that failed to enclose the reference. Rows a backend rejects (for example an
+irrational result on the rational backend) are counted, not timed.
+
+Run from the project root:
+    python -m benchmarks.bench_backends [rows]
+"""
+import decimal
+import random
+import sys
+import time
+from decimal import Decimal
+from app.calculator import Calculator
+from app.exceptions import OperationError
+from app.numeric_backends import Interval, as_decimal, get_backend
+from app.operations import OperationFactory
+
+BACKENDS = ["decimal", "rational", "interval", "float"]
+REFERENCE_PRECISION = 60
+
+def make_operands(count: int, integers: bool = False) -> tuple:
+    """Returns operand columns every built-in operation accepts (small positive exponents and degrees)."""
+    generator = random.Random(42)
+    if integers:
+        a = [Decimal(generator.randint(1, 10**6)) for _ in range(count)]
+        b = [Decimal(generator.randint(1, 9)) for _ in range(count)]
+    else:
+        a = [Decimal(generator.randint(1, 10**9)).scaleb(-4) for _ in range(count)]
+        b = [Decimal(generator.randint(1, 40)).scaleb(-1) for _ in range(count)]
+    return a, b
+
+def reference(operation: str, a: list, b: list) -> list:
+    with decimal.localcontext() as context:
+        context.prec = REFERENCE_PRECISION
+        return Calculator().calculate_many(a=a, b=b, operations=operation, notify=False).calculations
+
+def accuracy(results: list, expected: list) -> tuple:
+    """Returns (worst relative error or width, number of intervals that missed the reference)."""
+    worst, misses = Decimal(0), 0
+    with decimal.localcontext() as context:
+        context.prec = REFERENCE_PRECISION
+        for calc, exact in zip(results, expected):
+            if calc is None or exact is None or exact.result == 0:
+                continue
+            value = calc.result
+            if isinstance(value, Interval):
+                if exact.result not in value:
+                    misses += 1
+                error = value.width()
+            else:
+                error = abs(as_decimal(value) - exact.result)
+            worst = max(worst, error / abs(exact.result))
+    return worst, misses
+
+def measure(operation: str, backend: str, a: list, b: list) -> tuple:
+    calculator = Calculator()
+    start = time.perf_counter()
+    result = calculator.calculate_many(a=a, b=b, operations=operation, backend=backend, notify=False)
+    elapsed = time.perf_counter() - start
+    return len(a) / elapsed, result
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    a, b = make_operands(rows)
+    print(f"{'operation':<12} {'backend':<10} {'calcs/s':>12} {'rel. error':>12} {'rejected':>9} {'miss':>5}")
+    for operation in sorted(OperationFactory._operations):
+        expected = reference(operation, a, b)
+        for backend in BACKENDS:
+            rate, result = measure(operation, backend, a, b)
+            worst, misses = accuracy(result.calculations, expected)
+            print(f"{operation:<12} {backend:<10} {rate:>12,.0f} {float(worst):>12.1e} "
+                  f"{len(result.errors):>9} {misses:>5}")
+
+    # The automatic choice for integer operands against forcing Decimal
+    ints_a, ints_b = make_operands(rows, integers=True)
+    ints_a, ints_b = [int(x) for x in ints_a], [int(x) for x in ints_b]
+    print(f"\n{'operation':<12} {'int auto':>12} {'decimal':>12}  (calcs/s, integer operands)")
+    for operation in sorted(OperationFactory._operations):
+        auto_rate, _ = measure(operation, None, ints_a, ints_b)
+        decimal_rate, _ = measure(operation, get_backend("decimal"), ints_a, ints_b)
+        print(f"{operation:<12} {auto_rate:>12,.0f} {decimal_rate:>12,.0f}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except OperationError as e:
+        sys.exit(f"Benchmark failed: {e}")
@@ -0,0 +1,58 @@
+# benchmarks/bench_history.py
+"""Measures the per-operation cost of History.add_calculation and undo/redo.
+
+Run from the project root:
+    python -m benchmarks.bench_history
+
+With the delta-based undo log, the cost per operation should stay flat as the
+history grows instead of growing linearly with its size.
+"""
+import contextlib
+import io
+import time
+from decimal import Decimal
+from app.calculation import Calculation
+from app.history import History
+
+SIZES = [1_000, 10_000, 100_000]
+SAMPLE = 1_000
+
+def measure(size: int) -> dict:
+    """Returns the average cost in microseconds of each operation at a given history size."""
+    calc = Calculation(Decimal('1'), Decimal('2'), 'add', Decimal('3'))
+    history = History()
+    for _ in range(size):
+        history.add_calculation(calc)
+
+    # undo()/redo() print a message on every call; keep it out of the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(SAMPLE):
+            history.add_calculation(calc)
+        add_cost = (time.perf_counter() - start) / SAMPLE
+
+        start = time.perf_counter()
+        for _ in range(SAMPLE):
+            history.undo()
+        undo_cost = (time.perf_counter() - start) / SAMPLE
+
+        start = time.perf_counter()
+        for _ in range(SAMPLE):
+            history.redo()
+        redo_cost = (time.perf_counter() - start) / SAMPLE
+
+    return {
+        'size': size,
+        'add_us': add_cost * 1e6,
+        'undo_us': undo_cost * 1e6,
+        'redo_us': redo_cost * 1e6,
+    }
+
+def main():
+    print(f"{'size':>10} {'add (us)':>10} {'undo (us)':>10} {'redo (us)':>10}")
+    for size in SIZES:
+        row = measure(size)
+        print(f"{row['size']:>10} {row['add_us']:>10.2f} {row['undo_us']:>10.2f} {row['redo_us']:>10.2f}")
+
+if __name__ == "__main__":
+    main()
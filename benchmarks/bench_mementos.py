@@ -0,0 +1,118 @@
+# benchmarks/bench_mementos.py
+"""Measures what each additional history snapshot (CalculatorMemento) costs.
+
+A history of `entries` calculations takes a memento after every one of
+`levels` further changes, as an editor keeping a snapshot per undo level
+would. For each kind of change the script reports the memory and time per
+additional snapshot. Memory is what tracemalloc sees allocated and kept.
+The same is reported for a deep copy of the list, which is what a memento
+cost before snapshots shared structure.
+
+It then restores a snapshot with compress_after=1, so the next change
+compresses the restore step's two mementos. It reports the memory held by
+the history and its undo log before and after, and how long that change
+took. The restored snapshot is either one taken before 100 edits, which
+shares most chunks with the history, or one of another history. Only the
+chunks no other snapshot holds are packed, and packing frees the entries
+in them only when no other undo step holds them too. So the run is made
+with an unlimited undo log and with max_undo_depth=2, where older steps
+are dropped.
+
+Run from the project root:
+    python -m benchmarks.bench_mementos [entries] [levels]
+"""
+import copy
+import gc
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+from app.calculation import Calculation
+from app.history import History
+
+def make_history(entries: int, backend: str = "list") -> History:
+    history = History(backend=backend, verbose=False)
+    history.add_calculations([Calculation(Decimal(i), Decimal('2.5'), 'multiply', Decimal(i) * Decimal('2.5'))
+                              for i in range(entries)])
+    return history
+
+def per_level(history: History, levels: int, change, snapshot) -> tuple:
+    """Returns (bytes, seconds) per snapshot taken after each of `levels` changes."""
+    kept = [snapshot()]  # The first snapshot is a full one; the rest are the cost of an undo level
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    elapsed = 0.0
+    for level in range(levels):
+        change(history, level)
+        start = time.perf_counter()
+        kept.append(snapshot())
+        elapsed += time.perf_counter() - start
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / levels, elapsed / levels
+
+def append(history: History, level: int):
+    history.add_calculation(Calculation(Decimal(level), Decimal(1), 'add', Decimal(level + 1)))
+
+def edit_middle(history: History, level: int):
+    position = len(history.calculations) // 2 + level
+    history.replace_calculations({position: Calculation(Decimal(level), Decimal(1), 'add', Decimal(level + 1))})
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    levels = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print(f"{entries:,} entries, {levels} snapshots; cost per additional snapshot")
+    print(f"{'backend':<9} {'change':<12} {'snapshot':<11} {'bytes':>12} {'time':>12}")
+    for backend in ("list", "columnar"):
+        for change in (append, edit_middle):
+            history = make_history(entries, backend)
+            rows = [("shared", history.create_memento)]
+            if backend == "list":
+                rows.append(("deep copy", lambda: copy.deepcopy(history.calculations)))
+            for name, snapshot in rows:
+                # Deep copies are slow and large: a few levels give their cost
+                size, seconds = per_level(history, levels if name == "shared" else 3, change, snapshot)
+                print(f"{backend:<9} {change.__name__:<12} {name:<11} {size:>12,.0f} {seconds * 1e6:>10,.1f}us")
+
+    print(f"\nCompressing a cold restore step; memory held by the history and its undo log")
+    print(f"{'restored snapshot':<19} {'undo depth':<11} {'before':>12} {'after':>12} {'net win':>12}"
+          f" {'change took':>12}")
+    for restored in (edited_snapshot, other_history):
+        for depth in (0, 2):
+            before, after, seconds = compression(entries, restored, depth)
+            print(f"{restored.__name__.replace('_', ' '):<19} {depth or 'unlimited':<11} {before:>12,} {after:>12,}"
+                  f" {before - after:>12,} {seconds * 1e3:>10,.1f}ms")
+
+def edited_snapshot(history: History, entries: int):
+    """A snapshot of the history taken before 100 entries were edited."""
+    memento = history.create_memento()
+    for level in range(100):
+        edit_middle(history, level)
+    return memento
+
+def other_history(history: History, entries: int):
+    """A snapshot of a different history of the same size."""
+    other = History(verbose=False)
+    other.add_calculations([Calculation(Decimal(-i), Decimal('4'), 'add', Decimal(4 - i)) for i in range(entries)])
+    return other.create_memento()
+
+def compression(entries: int, restored, max_undo_depth: int) -> tuple:
+    """Returns (bytes held before, bytes held after, seconds) for the change that compresses a restore step."""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    history = make_history(entries)
+    history.compress_after, history.max_undo_depth = 1, max_undo_depth
+    history.restore_from_memento(restored(history, entries))
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0] - base
+    start = time.perf_counter()
+    append(history, 0)  # Pushes the restore step back: its mementos are compressed
+    seconds = time.perf_counter() - start
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return before, after, seconds
+
+if __name__ == "__main__":
+    main()
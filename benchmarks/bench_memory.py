@@ -0,0 +1,34 @@
+# benchmarks/bench_memory.py
+"""Compares the memory used by the "list" and "columnar" history backends.
+
+Run from the project root (the row count defaults to 10**6):
+    python -m benchmarks.bench_memory [rows]
+"""
+import sys
+import tracemalloc
+from decimal import Decimal
+from app.calculation import Calculation
+from app.history import History
+
+def measure(backend: str, rows: int) -> int:
+    """Returns the bytes allocated by a history of `rows` distinct calculations."""
+    operations = ['add', 'subtract', 'multiply', 'divide']
+    tracemalloc.start()
+    history = History(backend)
+    for i in range(rows):
+        a = Decimal(i)
+        b = Decimal('2.5')
+        history.calculations.append(Calculation(a, b, operations[i % 4], a * b))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"{'backend':>10} {'rows':>10} {'MB':>10} {'bytes/row':>10}")
+    for backend in History.BACKENDS:
+        used = measure(backend, rows)
+        print(f"{backend:>10} {rows:>10} {used / 2**20:>10.1f} {used / rows:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# benchmarks/bench_numeric.py
+"""Times power and root from app.numeric across operand sizes and precisions.
+
+Run from the project root:
+    python -m benchmarks.bench_numeric
+"""
+import decimal
+import time
+from decimal import Decimal
+from app import numeric
+
+CASES = [
+    # (label, function, a, b)
+    ("power small int exp", numeric.power, Decimal('1.0001'), Decimal('100')),
+    ("power large int exp", numeric.power, Decimal('1.0001'), Decimal('100000')),
+    ("power fractional exp", numeric.power, Decimal('12345.678'), Decimal('2.5')),
+    ("root square", numeric.root, Decimal('2'), Decimal('2')),
+    ("root 7th of big number", numeric.root, Decimal('9' * 200), Decimal('7')),
+    ("root degree 1000", numeric.root, Decimal('123456789'), Decimal('1000')),
+]
+PRECISIONS = [28, 100, 1000]
+REPEAT = 20
+
+def measure(function, a, b, precision: int) -> float:
+    """Returns the average time of one call in microseconds."""
+    with decimal.localcontext() as ctx:
+        ctx.prec = precision
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            function(a, b)
+        return (time.perf_counter() - start) / REPEAT * 1e6
+
+def main():
+    header = f"{'case':<26}" + "".join(f"{f'prec {p} (us)':>16}" for p in PRECISIONS)
+    print(header)
+    for label, function, a, b in CASES:
+        timings = [measure(function, a, b, precision) for precision in PRECISIONS]
+        print(f"{label:<26}" + "".join(f"{t:>16.1f}" for t in timings))
+
+if __name__ == "__main__":
+    main()
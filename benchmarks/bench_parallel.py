@@ -0,0 +1,52 @@
+# benchmarks/bench_parallel.py
+"""Measures how a batch of high-precision power and root rows scales from 1 to N worker processes.
+
+Run from the project root:
+    python -m benchmarks.bench_parallel [max_workers]
+"""
+import decimal
+import os
+import sys
+import time
+from decimal import Decimal
+from app.calculator import Calculator
+
+ROWS = 2000
+PRECISION = 200
+
+def make_rows(count: int) -> list:
+    rows = []
+    for i in range(count):
+        if i % 2:
+            rows.append((Decimal(i) + Decimal('0.5'), Decimal(7), 'root'))
+        else:
+            rows.append((Decimal('1.0001') + Decimal(i) / 10**6, Decimal(5000 + i), 'power'))
+    return rows
+
+def measure(rows: list, workers: int) -> float:
+    calculator = Calculator()
+    if workers > 1:
+        calculator.start_parallel(workers=workers, min_rows=0)
+        # Start the worker processes outside the timed run
+        calculator.calculate_many(rows[:workers])
+    start = time.perf_counter()
+    calculator.calculate_many(rows)
+    elapsed = time.perf_counter() - start
+    calculator.close()
+    return elapsed
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+    rows = make_rows(ROWS)
+    with decimal.localcontext() as ctx:
+        ctx.prec = PRECISION
+        print(f"{ROWS} rows at {PRECISION} digits")
+        print(f"{'workers':>8}{'seconds':>12}{'rows/s':>12}{'speedup':>10}")
+        baseline = None
+        for workers in range(1, max_workers + 1):
+            elapsed = measure(rows, workers)
+            baseline = baseline or elapsed
+            print(f"{workers:>8}{elapsed:>12.3f}{ROWS / elapsed:>12,.0f}{baseline / elapsed:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/bench_soak.py
+"""Soak test: runs many calculations through a Calculator and a History with
+retention limits and reports the process RSS as it goes, which should level off.
+
+Run from the project root (the calculation count defaults to 10**7):
+    python -m benchmarks.bench_soak [calculations] [max_in_memory] [max_undo_depth]
+"""
+import os
+import sys
+import time
+from decimal import Decimal
+from app.calculator import Calculator
+from app.history import History
+
+REPORTS = 10
+
+def rss_mb() -> float:
+    """Returns the current resident set size in MB (from /proc where available)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class HistoryObserver:
+    def __init__(self, history):
+        self.history = history
+
+    def update(self, calculation):
+        self.history.add_calculation(calculation)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10**7
+    max_in_memory = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    max_undo_depth = int(sys.argv[3]) if len(sys.argv) > 3 else 1_000
+    history = History(verbose=False, max_in_memory=max_in_memory, max_undo_depth=max_undo_depth)
+    calculator = Calculator()
+    calculator.attach(HistoryObserver(history))
+    operations = ['add', 'subtract', 'multiply', 'divide']
+
+    print(f"{'calculations':>14} {'RSS MB':>10} {'in memory':>10} {'spilled':>12} {'disk MB':>10} {'s':>8}")
+    start = time.perf_counter()
+    step = max(count // REPORTS, 1)
+    for i in range(1, count + 1):
+        calculator.calculate(Decimal(i), Decimal('2.5'), operations[i % 4])
+        if i % step == 0 or i == count:
+            stats = history.calculations.stats()
+            print(f"{i:>14} {rss_mb():>10.1f} {stats['in_memory']:>10} {stats['spilled']:>12} "
+                  f"{stats['disk_bytes'] / 2**20:>10.1f} {time.perf_counter() - start:>8.1f}")
+    # A deep undo pages spilled entries back in
+    undo_start = time.perf_counter()
+    while history.undo():
+        pass
+    stats = history.calculations.stats()
+    print(f"undid {max_undo_depth} steps in {time.perf_counter() - undo_start:.3f}s; "
+          f"{stats['spills']} spills, {stats['page_ins']} page-ins, RSS {rss_mb():.1f} MB")
+    history.calculations.close()
+
+if __name__ == "__main__":
+    main()
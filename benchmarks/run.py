@@ -0,0 +1,309 @@
+# benchmarks/run.py
+"""Runs the benchmark suite over every hot path and records the results as JSON.
+
+Run from the project root:
+    python -m benchmarks.run                      # full run, writes benchmark_results.json
+    python -m benchmarks.run --quick              # smaller sizes, for a fast check
+    python -m benchmarks.run --suites history,startup
+    python -m benchmarks.run --compare baseline.json --threshold 0.25
+
+Every result is a time in seconds per operation (lower is better). With
+--compare, results more than `threshold` slower than the baseline are flagged
+and the run exits with status 1.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from app.calculation import Calculation
+from app.calculator import Calculator
+from app.history import History
+from app.logger import LoggingObserver
+from app.numeric_backends import NUMERIC_BACKENDS
+from app.operations import OperationFactory
+from app.saver import AutoSaveObserver
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FULL_SIZES = [10**3, 10**5, 10**6]
+QUICK_SIZES = [10**3, 10**4]
+FAN_OUT = [1, 10, 100]
+THREAD_COUNTS = [1, 2, 4, 8]
+# Operands that every built-in operation accepts
+OPERANDS = (Decimal('12345.678'), Decimal('3'))
+
+def best_time(function, number: int, repeat: int = 3) -> float:
+    """Returns the best average time per call of `function` over `repeat` rounds of `number` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+def make_calculations(count: int) -> list:
+    names = ['add', 'subtract', 'multiply', 'divide']
+    return [Calculation(Decimal(i), Decimal('2.5'), names[i % 4], Decimal(i) * Decimal('2.5')) for i in range(count)]
+
+class NullObserver:
+    def update(self, calculation):
+        pass
+
+class HistoryObserver:
+    def __init__(self, history):
+        self.history = history
+
+    def update(self, calculation):
+        self.history.add_calculation(calculation)
+
+# --- Benchmarks: each yields (name, seconds_per_operation) ---
+
+def bench_operations(quick: bool):
+    calculator = Calculator()
+    number = 2_000 if quick else 20_000
+    a, b = OPERANDS
+    for name in sorted(OperationFactory._operations):
+        yield f"operation.{name}", best_time(lambda: calculator.calculate(a, b, name), number)
+
+def bench_history(quick: bool):
+    sample = 1_000
+    for backend in History.BACKENDS:
+        for size in QUICK_SIZES if quick else FULL_SIZES:
+            history = History(backend, verbose=False)
+            history.add_calculations(make_calculations(size))
+            calc = Calculation(Decimal('1'), Decimal('2'), 'add', Decimal('3'))
+            yield f"history.{backend}.add.{size}", best_time(lambda: history.add_calculation(calc), sample, 1)
+            yield f"history.{backend}.undo.{size}", best_time(history.undo, sample, 1)
+            yield f"history.{backend}.redo.{size}", best_time(history.redo, sample, 1)
+
+def bench_query(quick: bool):
+    sample = 100
+    for size in QUICK_SIZES if quick else FULL_SIZES:
+        history = History(verbose=False)
+        history.add_calculations(make_calculations(size))
+        index = history.enable_index()
+        low, high = Decimal(size // 2), Decimal(size // 2 + 1000)
+        yield f"query.operation.{size}", best_time(lambda: index.query(operation='add', limit=100), sample, 1)
+        yield f"query.range.{size}", best_time(lambda: index.query(min_result=low, max_result=high), sample, 1)
+        yield f"query.top.{size}", best_time(lambda: index.top(10, operation='divide'), sample, 1)
+        yield f"query.aggregates.{size}", best_time(index.aggregates, sample, 1)
+
+def bench_persistence(quick: bool):
+    with tempfile.TemporaryDirectory() as directory:
+        for size in QUICK_SIZES if quick else FULL_SIZES:
+            history = History(verbose=False)
+            history.add_calculations(make_calculations(size))
+            for file_format in History.FILE_FORMATS:
+                path = os.path.join(directory, f"history.{file_format}")
+                yield (f"persistence.save.{file_format}.{size}",
+                       best_time(lambda: history.save_history(path, file_format=file_format), 1))
+                loaded = History(verbose=False)
+                yield (f"persistence.load.{file_format}.{size}",
+                       best_time(lambda: loaded.load_history(path, file_format=file_format), 1))
+
+            path = os.path.join(directory, "autosave.csv")
+            rewrite = AutoSaveObserver(history, path, verbose=False)
+            yield f"autosave.rewrite.{size}", best_time(lambda: rewrite.update(None), 1)
+            append = AutoSaveObserver(history, path, mode="append", flush_every=100, verbose=False)
+            append.update(None)  # The first save is a full rewrite
+            calc = Calculation(Decimal('1'), Decimal('2'), 'add', Decimal('3'))
+
+            def add_and_append():
+                history.add_calculation(calc)
+                append.update(calc)
+            yield f"autosave.append.{size}", best_time(add_and_append, 1_000, 1)
+            append.close()
+
+def bench_observers(quick: bool):
+    number = 1_000 if quick else 10_000
+    calc = Calculation(Decimal('1'), Decimal('2'), 'add', Decimal('3'))
+    for count in FAN_OUT:
+        calculator = Calculator()
+        for _ in range(count):
+            calculator.attach(NullObserver())
+        yield f"observers.sync.{count}", best_time(lambda: calculator.notify(calc), number)
+        calculator.start_async_dispatch(max_queue=number)
+
+        def notify_and_drain():
+            for _ in range(100):
+                calculator.notify(calc)
+            calculator.flush()
+        yield f"observers.async.{count}", best_time(notify_and_drain, number // 100) / 100
+        calculator.close()
+
+def bench_logging(quick: bool):
+    number = 2_000 if quick else 20_000
+    calcs = make_calculations(100)
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in LoggingObserver.MODES:
+            for log_format in LoggingObserver.FORMATS:
+                observer = LoggingObserver(os.path.join(directory, f"{mode}.{log_format}.log"),
+                                           mode=mode, log_format=log_format)
+
+                def log_and_flush():
+                    for calc in calcs:
+                        observer.update(calc)
+                    observer.flush()
+                yield f"logging.{mode}.{log_format}", best_time(log_and_flush, number // 100) / 100
+                observer.close()
+
+def bench_threads(quick: bool):
+    """Throughput of one shared Calculator and History as the number of calling threads grows."""
+    total = 8_000 if quick else 80_000
+    a, b = OPERANDS
+    for count in THREAD_COUNTS:
+        history = History(verbose=False)
+        history.enable_index()
+        calculator = Calculator()
+        calculator.attach(HistoryObserver(history))
+        per_thread = total // count
+
+        def work():
+            for _ in range(per_thread):
+                calculator.calculate(a, b, 'add')
+
+        def run_threads():
+            threads = [threading.Thread(target=work) for _ in range(count)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        yield f"threads.calculate.{count}", best_time(run_threads, 1) / (per_thread * count)
+
+def bench_backends(quick: bool):
+    """Per-calculation time of each numeric backend, and of integer operands on the automatic path."""
+    number = 1_000 if quick else 10_000
+    a, b = OPERANDS
+    for backend in NUMERIC_BACKENDS:
+        if backend == "integer":
+            continue
+        calculator = Calculator(backend=backend)
+        for name in ("add", "divide", "power"):
+            yield f"backends.{backend}.{name}", best_time(lambda: calculator.calculate(a, b, name), number)
+    calculator = Calculator()
+    for name in ("add", "divide", "power"):
+        yield f"backends.auto_int.{name}", best_time(lambda: calculator.calculate(12345, 3, name), number)
+
+def bench_mementos(quick: bool):
+    """Time to take a history snapshot after one more calculation, at each size."""
+    for size in (QUICK_SIZES if quick else FULL_SIZES):
+        history = History(verbose=False)
+        history.add_calculations(make_calculations(size))
+        kept = [history.create_memento()]
+        extra = make_calculations(1)[0]
+
+        def snapshot():
+            history.add_calculation(extra)
+            kept.append(history.create_memento())
+        yield f"mementos.snapshot.{size}", best_time(snapshot, 100)
+
+def bench_startup(quick: bool):
+    runs = 3 if quick else 10
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+
+    def run(*args, **kwargs):
+        subprocess.run([sys.executable, *args], cwd=PROJECT_ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **kwargs)
+    yield "startup.import", best_time(lambda: run("-c", "import main"), runs, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        batch_env = dict(env, CALCULATOR_HISTORY_FILE=os.path.join(directory, "history.csv"),
+                         CALCULATOR_LOG_FILE=os.path.join(directory, "calculator.log"))
+        yield "startup.batch", best_time(
+            lambda: subprocess.run([sys.executable, "main.py", "--batch", "-"], input=b"add 1 2\n",
+                                   cwd=PROJECT_ROOT, env=batch_env, check=True, capture_output=True),
+            runs, 1)
+
+SUITES = {
+    "operations": bench_operations,
+    "history": bench_history,
+    "query": bench_query,
+    "persistence": bench_persistence,
+    "observers": bench_observers,
+    "logging": bench_logging,
+    "threads": bench_threads,
+    "backends": bench_backends,
+    "mementos": bench_mementos,
+    "startup": bench_startup,
+}
+
+# --- Results ---
+
+def machine_metadata(quick: bool) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "quick": quick,
+    }
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Prints each shared result against the baseline and returns the names that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':<40}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None or previous <= 0:
+            continue
+        change = current / previous - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40}{previous:>14.3e}{current:>14.3e}{change:>+10.1%}{flag}")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Runs the calculator benchmark suite.")
+    parser.add_argument("--quick", action="store_true", help="use smaller sizes and fewer repeats")
+    parser.add_argument("--suites", default=",".join(SUITES),
+                        help=f"comma-separated suites to run (default: {','.join(SUITES)})")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the results")
+    parser.add_argument("--compare", metavar="BASELINE", help="a previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown that counts as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    selected = [name.strip() for name in args.suites.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(unknown)}")
+
+    results = {}
+    for suite_name in selected:
+        for name, seconds in SUITES[suite_name](args.quick):
+            results[name] = seconds
+            print(f"{name:<40}{seconds:>14.3e} s/op")
+
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump({"metadata": machine_metadata(args.quick), "results": results}, output, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}.")
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,113 @@
 # main.py
+import argparse
+import decimal
+import os
+import sys
+import time
 from decimal import Decimal, InvalidOperation
 from app.calculator import Calculator
+from app.cache import ResultCache
 from app.history import History
 from app.logger import LoggingObserver
 from app.saver import AutoSaveObserver
 from app.calculator_config import Config
+from app.operations import OperationFactory
+from app import numeric
+from app.numeric_backends import get_backend
+from app.provenance import ProvenanceGraph
+from app.metrics import METRICS
 from app.exceptions import ValidationError
 from app.commands import command, COMMANDS
+from app.expression import compile_expression
+from app.pipeline import OUTPUT_FORMATS, run_batch
 
 class App:
-    def __init__(self):
+    def __init__(self, quiet: bool = False):
         Config.load()
-        self.calculator = Calculator()
-        self.history_manager = History()
+        OperationFactory.load_entry_points()
+        precision = Config.get_int("CALCULATOR_PRECISION", 0)
+        if precision > 0:
+            decimal.getcontext().prec = precision
+            # Threads started later (server sessions, worker threads) copy DefaultContext
+            decimal.DefaultContext.prec = precision
+        numeric.configure(
+            max_exponent=Config.get_int("CALCULATOR_MAX_EXPONENT", numeric.LIMITS.max_exponent),
+            max_digits=Config.get_int("CALCULATOR_MAX_DIGITS", numeric.LIMITS.max_digits),
+        )
+        METRICS.enabled = Config.get_bool("CALCULATOR_METRICS", False)
+        backend = Config.get("CALCULATOR_NUMERIC_BACKEND", "auto")
+        self.calculator = Calculator(self._build_cache(), backend=None if backend == "auto" else backend)
+        workers = Config.get_int("CALCULATOR_WORKERS", 0)
+        if workers > 0:
+            self.calculator.start_parallel(
+                workers=workers,
+                chunk_size=Config.get_int("CALCULATOR_PARALLEL_CHUNK_SIZE", 256),
+                min_rows=Config.get_int("CALCULATOR_PARALLEL_MIN_ROWS", 1000),
+            )
+        self.history_manager = History(
+            Config.get("CALCULATOR_HISTORY_BACKEND", "list"),
+            verbose=not quiet,
+            max_in_memory=Config.get_int("CALCULATOR_HISTORY_MAX_IN_MEMORY", 0),
+            max_bytes=Config.get_int("CALCULATOR_HISTORY_MAX_BYTES", 0),
+            max_undo_depth=Config.get_int("CALCULATOR_HISTORY_MAX_UNDO", 0),
+            spill_dir=Config.get("CALCULATOR_HISTORY_SPILL_DIR"),
+            compress_after=Config.get_int("CALCULATOR_HISTORY_COMPRESS_AFTER", 0),
+        )
+        # The index keeps every result in memory, so it is off by default once memory is bounded
+        bounded = self.history_manager.max_in_memory or self.history_manager.max_bytes
+        if Config.get_bool("CALCULATOR_HISTORY_INDEX", not bounded):
+            self.history_manager.enable_index()
 
         log_file = Config.get("CALCULATOR_LOG_FILE", "calculator.log")
         history_file = Config.get("CALCULATOR_HISTORY_FILE", "history.csv")
         
-        log_observer = LoggingObserver(log_file)
-        save_observer = AutoSaveObserver(self.history_manager, history_file)
+        log_observer = LoggingObserver(
+            log_file,
+            mode=Config.get("CALCULATOR_LOG_MODE", "sync"),
+            log_format=Config.get("CALCULATOR_LOG_FORMAT", "text"),
+            max_bytes=Config.get_int("CALCULATOR_LOG_MAX_BYTES", 0),
+            rotate_seconds=Config.get_int("CALCULATOR_LOG_ROTATE_SECONDS", 0),
+            backup_count=Config.get_int("CALCULATOR_LOG_BACKUPS", 5),
+            compress=Config.get_bool("CALCULATOR_LOG_COMPRESS", False),
+        )
+        self.save_observer = AutoSaveObserver(
+            self.history_manager,
+            history_file,
+            mode=Config.get("CALCULATOR_AUTOSAVE_MODE", "rewrite"),
+            flush_every=Config.get_int("CALCULATOR_AUTOSAVE_FLUSH_EVERY", 1),
+            fsync=Config.get_bool("CALCULATOR_AUTOSAVE_FSYNC", False),
+            file_format=Config.get("CALCULATOR_HISTORY_FORMAT", "csv"),
+            verbose=not quiet,
+            flush_interval=Config.get_int("CALCULATOR_AUTOSAVE_FLUSH_INTERVAL_MS", 0) / 1000,
+        )
+        self.graph = ProvenanceGraph(self.history_manager, self.calculator)
+        self.graph_file = Config.get("CALCULATOR_GRAPH_FILE", os.path.splitext(history_file)[0] + ".graph.json")
+        # New references are written out in batches; edits, undo, redo, save and exit write them at once
+        self.graph_save_every = max(Config.get_int("CALCULATOR_GRAPH_SAVE_EVERY", 50), 1)
+        self._unsaved_refs = 0
+        self.snapshots = {}
+        METRICS.add_collector(self.history_manager.metrics)
         self.calculator.attach(log_observer)
-        self.calculator.attach(save_observer)
+        self.calculator.attach(self.save_observer)
+
+        if Config.get("CALCULATOR_NOTIFY_MODE", "sync") == "async":
+            self.calculator.start_async_dispatch(
+                max_queue=Config.get_int("CALCULATOR_NOTIFY_QUEUE_SIZE", 1024),
+                policy=Config.get("CALCULATOR_NOTIFY_BACKPRESSURE", "block"),
+            )
+
+    @staticmethod
+    def _build_cache():
+        """Creates the result cache from the configuration, or None when it is disabled."""
+        cache_size = Config.get_int("CALCULATOR_CACHE_SIZE", 0)
+        if cache_size <= 0:
+            return None
+        operations = Config.get("CALCULATOR_CACHE_OPERATIONS", "power,root")
+        return ResultCache(
+            max_size=cache_size,
+            ttl=Config.get_int("CALCULATOR_CACHE_TTL", 0),
+            operations=[name.strip() for name in operations.split(",") if name.strip()],
+        )
 
     @command("Displays this help message.")
     def help(self):
@@ -30,32 +117,228 @@ class App:
 
     @command("Shows the calculation history.")
     def history(self):
-        if not self.history_manager.calculations:
-            print("History is empty.")
-        for calc in self.history_manager.calculations:
-            print(calc)
+        # Iterated under the lock rather than copied, so spilled entries are paged in one segment at a time
+        with self.history_manager.lock:
+            if not self.history_manager.calculations:
+                print("History is empty.")
+            for calc in self.history_manager.calculations:
+                print(calc)
+
+    @command("Queries the history: query [op NAME] [min X] [max X] [since SECONDS] [limit N] | query top N [op NAME] | query agg [op NAME]")
+    def query(self, *args):
+        index = self.history_manager.enable_index()
+        if args and args[0] == "top":
+            if len(args) < 2 or not args[1].isdigit():
+                raise ValidationError("Usage: query top N [op NAME]")
+            filters = self._parse_query_filters(args[2:])
+            positions = index.top(int(args[1]), operation=filters.get("operation"))
+        elif args and args[0] == "agg":
+            filters = self._parse_query_filters(args[1:])
+            summary = index.aggregates(filters.get("operation"))
+            if not summary:
+                print("No matching calculations.")
+            for name, values in summary.items():
+                print(f"  {name}: count={values['count']} sum={values['sum']} mean={values['mean']}")
+            return
+        else:
+            positions = index.query(**self._parse_query_filters(args))
+        if not positions:
+            print("No matching calculations.")
+        for position in positions:
+            print(self.history_manager.calculations[position])
+
+    @staticmethod
+    def _parse_query_filters(args) -> dict:
+        """Turns "op add min 1 max 10 since 60 limit 5" into HistoryIndex.query() keyword arguments."""
+        if len(args) % 2:
+            raise ValidationError("Query filters come in pairs, e.g. op add min 1 max 10")
+        filters = {}
+        for key, value in zip(args[::2], args[1::2]):
+            try:
+                if key == "op":
+                    filters["operation"] = value
+                elif key in ("min", "max"):
+                    filters[f"{key}_result"] = Decimal(value)
+                elif key == "since":
+                    filters["since"] = time.time() - float(value)
+                elif key == "limit":
+                    filters["limit"] = int(value)
+                else:
+                    raise ValidationError(f"Unknown query filter: {key}")
+            except (InvalidOperation, ValueError):
+                raise ValidationError(f"Invalid value for {key}: {value}") from None
+        return filters
+
+    @command("Shows or selects the numeric backend: numeric [auto|decimal|rational|interval|float]")
+    def numeric(self, *args):
+        if args:
+            if args[0] == "auto":
+                self.calculator.backend = None
+            else:
+                try:
+                    self.calculator.backend = get_backend(args[0])
+                except ValueError as e:
+                    raise ValidationError(str(e)) from None
+        current = self.calculator.backend
+        print(f"Numeric backend: {current.name if current is not None else 'auto'}")
+
+    def _parse_number(self, text: str):
+        """Parses a number for the session's backend: "1/3" for rational, "[1,2]" or "1.5+-0.1" for interval."""
+        backend = self.calculator.backend
+        if backend is None:
+            return Decimal(text)
+        return backend.parse(text)
+
+    def _parse_operand(self, text: str) -> tuple:
+        """Returns (value, ref): a number, or the value of "ans", "$N" or a cell along with the reference."""
+        return self.graph.parse_operand(text, self._parse_number)
+
+    @staticmethod
+    def _operand_refs(ref_a, ref_b) -> dict:
+        return {slot: ref for slot, ref in (("a", ref_a), ("b", ref_b)) if ref is not None}
+
+    def _add(self, calculation, refs: dict, kind: str = "operation"):
+        """Adds a calculation to the history and records where its operands came from."""
+        with self.history_manager.lock:
+            self.history_manager.add_calculation(calculation)
+            self.graph.record(len(self.history_manager.calculations) - 1, calculation, refs, kind)
+        if refs:
+            self._unsaved_refs += 1
+            if self._unsaved_refs >= self.graph_save_every:
+                self._save_graph()
+        print(f"Result: {calculation.result}")
+
+    def _save_graph(self):
+        if self.graph or os.path.exists(self.graph_file):
+            self.graph.save(self.graph_file)
+        self._unsaved_refs = 0
+
+    @command("Evaluates an expression, e.g. eval (3 + 4) ^ 2 % 5 or eval ans * rate")
+    def eval(self, *tokens):
+        source = " ".join(tokens)
+        variables, refs = self.graph.variables(compile_expression(source).variables)
+        calculation = self.calculator.evaluate(source, variables)
+        self._add(calculation, refs, kind="expression")
+
+    @command("Defines a named cell for later calculations: let NAME VALUE|ans|$N|NAME")
+    def let(self, *args):
+        if len(args) != 2:
+            raise ValidationError("Usage: let NAME VALUE|ans|$N|NAME")
+        value, ref = self._parse_operand(args[1])
+        recomputed = self.graph.let(args[0], ref if ref is not None else value)
+        self._changed(recomputed)
+        print(f"{args[0]} = {value}")
+
+    @command("Changes the operands of entry N and recomputes what depends on it: edit N A B")
+    def edit(self, *args):
+        if len(args) != 3 or not args[0].isdigit():
+            raise ValidationError("Usage: edit N A B")
+        (a, ref_a), (b, ref_b) = self._parse_operand(args[1]), self._parse_operand(args[2])
+        recomputed = self.graph.edit(int(args[0]) - 1, a, b, self._operand_refs(ref_a, ref_b))
+        self._changed(recomputed)
+
+    def _changed(self, recomputed: int):
+        """Saves the history and the graph after an edit."""
+        if recomputed:
+            print(f"Recomputed {recomputed} dependent calculation{'s' if recomputed != 1 else ''}.")
+        self.save_observer.flush()
+        self._save_graph()
+
+    @command("Shows performance metrics: stats [json|prometheus|reset|on|off|profile start|profile stop]")
+    def stats(self, *args):
+        action = args[0] if args else "summary"
+        if action == "json":
+            print(METRICS.to_json())
+        elif action == "prometheus":
+            print(METRICS.to_prometheus(), end="")
+        elif action == "reset":
+            METRICS.reset()
+            print("Metrics reset.")
+        elif action in ("on", "off"):
+            METRICS.enabled = action == "on"
+            print(f"Metrics {'enabled' if METRICS.enabled else 'disabled'}.")
+        elif action == "profile" and args[1:] == ("start",):
+            METRICS.start_profile()
+            print("Profiling started.")
+        elif action == "profile" and args[1:] == ("stop",):
+            print(METRICS.stop_profile(Config.get("CALCULATOR_PROFILE_FILE")) or "Profiling is not running.")
+        elif action == "summary":
+            self._print_stats_summary()
+        else:
+            raise ValidationError("Usage: stats [json|prometheus|reset|on|off|profile start|profile stop]")
+
+    @staticmethod
+    def _print_stats_summary():
+        if not METRICS.enabled:
+            print("Metrics are disabled. Turn them on with 'stats on' or CALCULATOR_METRICS=on.")
+        snapshot = METRICS.snapshot()
+        for name, histogram in snapshot["histograms"].items():
+            if name.split("{")[0].endswith("_seconds"):
+                print(f"  {name}: n={histogram['count']} mean={histogram['mean'] * 1e6:.1f}us "
+                      f"p50<={histogram['p50'] * 1e6:.1f}us p99<={histogram['p99'] * 1e6:.1f}us")
+            else:
+                print(f"  {name}: n={histogram['count']} mean={histogram['mean']:.0f} max={histogram['max']:.0f}")
+        for name, value in {**snapshot["counters"], **snapshot["gauges"]}.items():
+            print(f"  {name}: {value}")
 
     @command("Undoes the last calculation.")
     def undo(self):
-        self.history_manager.undo()
+        if self.history_manager.undo():
+            self.save_observer.save_steps()
+            self._save_graph()
 
     @command("Redoes the last undone calculation.")
     def redo(self):
-        self.history_manager.redo()
+        if self.history_manager.redo():
+            self.save_observer.save_steps()
+            self._save_graph()
 
-    @command("Saves the current history to the configured CSV file.")
+    @command("Keeps a named snapshot of the history, or lists the snapshots: snapshot [NAME]")
+    def snapshot(self, *args):
+        if not args:
+            if not self.snapshots:
+                print("No snapshots.")
+            for name, memento in self.snapshots.items():
+                print(f"  {name}: {len(memento.get_state())} calculations")
+            return
+        # Snapshots share the entries they have in common, so keeping many is cheap
+        self.snapshots[args[0]] = self.history_manager.create_memento()
+        print(f"Snapshot {args[0]} taken.")
+
+    @command("Returns the history to a named snapshot as one undoable step: restore NAME")
+    def restore(self, *args):
+        if len(args) != 1:
+            raise ValidationError("Usage: restore NAME")
+        memento = self.snapshots.get(args[0])
+        if memento is None:
+            raise ValidationError(f"No snapshot named {args[0]}.")
+        self.history_manager.restore_from_memento(memento)
+        self.save_observer.flush()
+        print(f"Restored snapshot {args[0]} ({len(memento.get_state())} calculations).")
+
+    @command("Saves the current history to the configured history file.")
     def save(self):
         history_file = Config.get("CALCULATOR_HISTORY_FILE", "history.csv")
-        self.history_manager.save_history(history_file)
+        file_format = Config.get("CALCULATOR_HISTORY_FORMAT", "csv")
+        self.history_manager.save_history(history_file, file_format=file_format)
+        self._save_graph()
 
-    @command("Loads history from the configured CSV file.")
+    @command("Loads history from the configured history file.")
     def load(self):
         history_file = Config.get("CALCULATOR_HISTORY_FILE", "history.csv")
-        self.history_manager.load_history(history_file)
+        file_format = Config.get("CALCULATOR_HISTORY_FORMAT", "csv")
+        self.history_manager.load_history(history_file, file_format=file_format)
+        if os.path.exists(self.graph_file):
+            self.graph.load(self.graph_file)
+        else:
+            self.graph.clear()
 
     def start(self):
         print("Welcome to the Advanced Calculator!")
         self.help()
+        if Config.get("CALCULATOR_PROFILE_FILE"):
+            # Profile the whole session; the capture is written out on exit
+            METRICS.start_profile()
 
         while True:
             try:
@@ -68,6 +351,12 @@ class App:
                 args = parts[1:]
 
                 if cmd_name == "exit":
+                    # Deliver pending notifications and make the history durable
+                    self.calculator.close()
+                    if self._unsaved_refs:
+                        self._save_graph()
+                    if METRICS.profiling:
+                        METRICS.stop_profile(Config.get("CALCULATOR_PROFILE_FILE"))
                     print("Exiting. Goodbye!")
                     break
 
@@ -79,17 +368,85 @@ class App:
                         raise ValidationError("Invalid command format. Use: <operation> <a> <b>")
                     
                     op_name, val_a, val_b = parts
-                    a, b = Decimal(val_a), Decimal(val_b)
+                    (a, ref_a), (b, ref_b) = self._parse_operand(val_a), self._parse_operand(val_b)
                     
                     calculation = self.calculator.calculate(a, b, op_name)
-                    self.history_manager.add_calculation(calculation)
-                    print(f"Result: {calculation.result}")
+                    self._add(calculation, self._operand_refs(ref_a, ref_b))
 
             except (ValidationError, InvalidOperation) as e:
                 print(f"Error: {e}")
             except Exception as e:
                 print(f"An unexpected error occurred: {e}")
 
+    def run_batch(self, input_stream, output_stream, output_format: str = "plain", chunk_size: int = None):
+        """Runs a script of commands non-interactively and prints a throughput summary to stderr."""
+        if chunk_size is None:
+            chunk_size = Config.get_int("CALCULATOR_BATCH_CHUNK_SIZE", 1000)
+        try:
+            summary = run_batch(self.calculator, self.history_manager, input_stream, output_stream,
+                                output_format=output_format, chunk_size=chunk_size)
+        finally:
+            self.calculator.close()
+        print(summary, file=sys.stderr)
+        return summary
+
+    def serve(self, address: str = None, socket_path: str = None):
+        """Runs the line-delimited JSON calculation service until interrupted."""
+        # asyncio is only needed in server mode, so keep it off the CLI's startup path
+        import asyncio
+        from app.server import CalculationServer
+
+        server = CalculationServer(
+            self.calculator,
+            self.history_manager,
+            sessions=Config.get("CALCULATOR_SERVER_SESSIONS", "shared"),
+            history_backend=Config.get("CALCULATOR_HISTORY_BACKEND", "list"),
+        )
+
+        async def run():
+            if socket_path is not None:
+                await server.start_unix(socket_path)
+            else:
+                host, _, port = (address or Config.get("CALCULATOR_SERVER_ADDRESS", "127.0.0.1:8765")).rpartition(":")
+                await server.start(host or "127.0.0.1", int(port))
+            print(f"Serving on {server.address}", file=sys.stderr)
+            await server.serve_forever()
+
+        try:
+            asyncio.run(run())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.calculator.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Advanced Calculator")
+    parser.add_argument("--batch", metavar="PATH",
+                        help="run the commands in PATH non-interactively ('-' reads standard input)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="plain",
+                        help="output format for --batch results")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="rows calculated, saved and logged together in --batch mode")
+    parser.add_argument("--serve", metavar="HOST:PORT", nargs="?", const="",
+                        help="run as a local JSON-lines calculation server")
+    parser.add_argument("--socket", metavar="PATH",
+                        help="serve on a Unix domain socket instead of TCP")
+    args = parser.parse_args(argv)
+
+    if args.serve is not None or args.socket is not None:
+        App(quiet=True).serve(args.serve or None, args.socket)
+        return
+    if args.batch is None:
+        App().start()
+        return
+    if args.chunk_size is not None and args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    app = App(quiet=True)
+    if args.batch == "-":
+        app.run_batch(sys.stdin, sys.stdout, args.format, args.chunk_size)
+    else:
+        with open(args.batch, encoding="utf-8") as script:
+            app.run_batch(script, sys.stdout, args.format, args.chunk_size)
+
 if __name__ == "__main__":
-    app = App()
-    app.start()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,102 @@
+# tests/test_binary_history.py
+import pytest
+import pandas as pd
+from decimal import Decimal
+from fractions import Fraction
+from app.binary_history import (
+    BinaryHistoryError, BinaryHistoryFile, binary_to_csv, csv_to_binary,
+    read_binary, write_binary,
+)
+from app.calculation import Calculation
+from app.history import History
+from app.saver import AutoSaveObserver
+
+calcs = [
+    Calculation(Decimal('10'), Decimal('5'), 'add', Decimal('15')),
+    Calculation(Decimal('1.25'), Decimal('-4'), 'multiply', Decimal('-5.00')),
+    Calculation(Decimal('2'), Decimal('100'), 'power', Decimal('1.267650600228229401496703205E+30')),
+    Calculation(Decimal('-0'), Decimal('NaN'), 'add', Decimal('Infinity')),
+    Calculation(3, 0.5, 'divide', Fraction(6, 1)),
+]
+
+def test_binary_round_trip_and_random_access(tmp_path):
+    file_path = tmp_path / "history.bin"
+    progress = []
+    assert write_binary(str(file_path), calcs, chunk_size=2, progress=progress.append) == 5
+    assert progress == [2, 4, 5]
+
+    with BinaryHistoryFile(str(file_path)) as history_file:
+        assert len(history_file) == 5
+        assert history_file.schema == ['operand_a', 'operand_b', 'operation', 'result']
+        assert history_file.operations == ['add', 'multiply', 'power', 'divide']
+        assert history_file[1] == calcs[1]
+        assert str(history_file[1].result) == '-5.00'
+        assert str(history_file[2].result) == '1.267650600228229401496703205E+30'
+        assert str(history_file[3].a) == '-0'
+        assert history_file[3].b.is_nan()
+        assert type(history_file[4].b) is float
+        assert history_file[-1].result == Fraction(6, 1)
+        assert history_file[0:2] == calcs[0:2]
+        assert list(history_file.range(4, 99)) == list(history_file[4:])
+        assert list(history_file.range(-3, 2)) == calcs[0:2]
+        with pytest.raises(IndexError):
+            history_file[5]
+
+def test_binary_rejects_bad_files(tmp_path):
+    file_path = tmp_path / "history.bin"
+    file_path.write_bytes(b"")
+    with pytest.raises(BinaryHistoryError):
+        BinaryHistoryFile(str(file_path))
+    file_path.write_bytes(b"x" * 200)
+    with pytest.raises(BinaryHistoryError):
+        BinaryHistoryFile(str(file_path))
+
+    write_binary(str(file_path), calcs[:1])
+    data = bytearray(file_path.read_bytes())
+    data[8] = 99  # Corrupt the version
+    file_path.write_bytes(bytes(data))
+    with pytest.raises(BinaryHistoryError, match="Unsupported"):
+        BinaryHistoryFile(str(file_path))
+
+    with pytest.raises(BinaryHistoryError):
+        write_binary(str(file_path), [Calculation('1', '2', 'add', '3')])
+
+def test_csv_binary_converters(tmp_path):
+    csv_path = tmp_path / "history.csv"
+    bin_path = tmp_path / "history.bin"
+    back_path = tmp_path / "back.csv"
+    history = History()
+    history.add_calculations(calcs[:3])
+    history.save_history(str(csv_path))
+
+    assert csv_to_binary(str(csv_path), str(bin_path)) == 3
+    assert read_binary(str(bin_path)) == calcs[:3]
+    assert binary_to_csv(str(bin_path), str(back_path)) == 3
+    assert back_path.read_text() == csv_path.read_text()
+
+def test_history_save_and_load_binary(tmp_path):
+    file_path = tmp_path / "history.bin"
+    history = History()
+    history.add_calculations(calcs[:3])
+    history.save_history(str(file_path), file_format="binary")
+
+    progress = []
+    loaded = History(backend="columnar")
+    loaded.load_history(str(file_path), progress=progress.append, file_format="binary")
+    assert loaded.calculations == calcs[:3]
+    assert progress == [3]
+
+    with pytest.raises(ValueError):
+        history.save_history(str(file_path), file_format="xml")
+
+def test_autosave_binary_format(tmp_path):
+    file_path = tmp_path / "autosave.bin"
+    history = History()
+    saver = AutoSaveObserver(history, str(file_path), mode="append", file_format="binary", fsync=True)
+    assert saver.mode == "rewrite"
+    history.add_calculations(calcs[:2])
+    saver.update(calcs[1])
+    assert read_binary(str(file_path)) == calcs[:2]
+
+    with pytest.raises(ValueError):
+        AutoSaveObserver(history, str(file_path), file_format="xml")
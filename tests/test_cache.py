@@ -0,0 +1,78 @@
+# tests/test_cache.py
+import decimal
+import pytest
+from decimal import Decimal
+from app import numeric
+from app.cache import ResultCache
+from app.calculator import Calculator
+from app.exceptions import OperationError
+
+def test_cached_results_are_identical_to_fresh_ones():
+    cache = ResultCache(max_size=10)
+    calc = Calculator(cache)
+    fresh = Calculator().calculate(Decimal('2'), Decimal('0.5'), 'power').result
+
+    first = calc.calculate(Decimal('2'), Decimal('0.5'), 'power').result
+    second = calc.calculate(Decimal('2'), Decimal('0.5'), 'power').result
+    assert str(first) == str(second) == str(fresh)
+    assert cache.stats() == {'size': 1, 'max_size': 10, 'hits': 1, 'misses': 1, 'evictions': 0}
+
+    # Equal operands written differently are separate entries
+    calc.calculate(Decimal('2.0'), Decimal('0.5'), 'power')
+    assert cache.misses == 2
+
+def test_cache_key_tracks_decimal_context():
+    cache = ResultCache()
+    calc = Calculator(cache)
+    with decimal.localcontext() as ctx:
+        ctx.prec = 5
+        short = calc.calculate(Decimal('2'), Decimal('3'), 'root').result
+    long = calc.calculate(Decimal('2'), Decimal('3'), 'root').result
+    assert str(short) == '1.2599'
+    assert len(str(long)) > len(str(short))
+    assert cache.hits == 0
+
+def test_cache_key_tracks_numeric_limits():
+    cache = ResultCache()
+    calc = Calculator(cache)
+    limits = (numeric.LIMITS.max_exponent, numeric.LIMITS.max_digits)
+    try:
+        numeric.configure(max_exponent=10)
+        with pytest.raises(OperationError):
+            calc.calculate(Decimal('2'), Decimal('20'), 'power')
+    finally:
+        numeric.configure(*limits)
+    # The error cached under the lower limit is not replayed
+    assert calc.calculate(Decimal('2'), Decimal('20'), 'power').result == Decimal(2 ** 20)
+    assert cache.hits == 0
+
+def test_cached_errors_are_replayed():
+    cache = ResultCache(operations=['divide'])
+    calc = Calculator(cache)
+    for _ in range(2):
+        with pytest.raises(OperationError, match="Error during calculation: Cannot divide by zero."):
+            calc.calculate(Decimal('1'), Decimal('0'), 'divide')
+    assert cache.hits == 1
+
+    # Operations that are not enabled bypass the cache
+    calc.calculate(Decimal('1'), Decimal('2'), 'add')
+    assert len(cache) == 1
+
+def test_cache_eviction_and_ttl():
+    now = [0.0]
+    cache = ResultCache(max_size=2, ttl=10, clock=lambda: now[0])
+    cache.put('a', False, 1)
+    cache.put('b', False, 2)
+    assert cache.get('a') == (False, 1)
+    cache.put('c', False, 3)  # Evicts 'b', the least recently used
+    assert cache.get('b') is None
+    assert cache.evictions == 1
+
+    now[0] = 11.0
+    assert cache.get('a') is None
+    assert len(cache) == 1
+    cache.clear()
+    assert len(cache) == 0
+
+    with pytest.raises(ValueError):
+        ResultCache(max_size=0)
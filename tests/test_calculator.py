@@ -48,4 +48,95 @@ def test_calculator_notifies_observers():
     observer.notified = False # Reset the flag
     
     calc.calculate(Decimal('10'), Decimal('2'), 'add')
-    assert observer.notified is False # Should not have been notified
\ No newline at end of file
+    assert observer.notified is False # Should not have been notified
+
+class BatchObserver(MockObserver):
+    """A mock observer that also records batch notifications."""
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def update_batch(self, calculations):
+        self.batches.append(list(calculations))
+
+def test_calculate_many_from_triples():
+    calc = Calculator()
+    observer = BatchObserver()
+    calc.attach(observer)
+    rows = [
+        (Decimal('10'), Decimal('5'), 'add'),
+        (Decimal('10'), Decimal('0'), 'divide'),
+        (Decimal('3'), Decimal('4'), 'power'),
+        (Decimal('1'), Decimal('1'), 'unknown'),
+        (Decimal('9'), Decimal('3'), 'divide'),
+    ]
+    result = calc.calculate_many(rows)
+
+    assert len(result) == 5
+    assert result.calculations[0].result == Decimal('15')
+    assert result.calculations[1] is None
+    assert result.calculations[2].result == Decimal('81')
+    assert result.calculations[4].result == Decimal('3')
+    assert [index for index, _ in result.errors] == [1, 3]
+    assert "Cannot divide by zero." in str(result.errors[0][1])
+    assert "Unknown operation: unknown" in str(result.errors[1][1])
+
+    # Observers hear about the batch once, in input order
+    assert observer.notified is False
+    assert len(observer.batches) == 1
+    assert [c.operation for c in observer.batches[0]] == ['add', 'power', 'divide']
+
+def test_calculate_many_from_columns_falls_back_to_update():
+    calc = Calculator()
+    observer = MockObserver()
+    calc.attach(observer)
+    result = calc.calculate_many(a=[Decimal('1'), Decimal('2')], b=[Decimal('3'), Decimal('4')], operations='multiply')
+    assert [c.result for c in result.succeeded] == [Decimal('3'), Decimal('8')]
+    assert observer.calculation.result == Decimal('8')
+
+    with pytest.raises(ValueError):
+        calc.calculate_many(a=[Decimal('1')], b=[], operations='add')
+    with pytest.raises(ValueError):
+        calc.calculate_many(a=[Decimal('1')], b=[Decimal('1')], operations=['add', 'add'])
+
+@pytest.mark.parametrize("operation", [
+    'add', 'subtract', 'multiply', 'divide', 'power', 'root',
+    'modulus', 'int_divide', 'percent', 'abs_diff',
+])
+def test_calculate_many_fast_mode_matches_exact(operation):
+    calc = Calculator()
+    a = [Decimal('7'), Decimal('-7.5'), Decimal('16'), Decimal('0'), Decimal('-8')]
+    b = [Decimal('2'), Decimal('3'), Decimal('0'), Decimal('4'), Decimal('3')]
+    exact = calc.calculate_many(a=a, b=b, operations=operation)
+    fast = calc.calculate_many(a=a, b=b, operations=operation, fast=True)
+
+    assert [index for index, _ in fast.errors] == [index for index, _ in exact.errors]
+    for exact_calc, fast_calc in zip(exact.calculations, fast.calculations):
+        if exact_calc is None:
+            assert fast_calc is None
+        else:
+            assert float(fast_calc.result) == pytest.approx(float(exact_calc.result))
+
+def test_calculate_many_fast_mode_reports_float_overflow(recwarn):
+    calc = Calculator()
+    rows = [(Decimal('1e300'), Decimal('1e300'), 'multiply'), (Decimal('10'), Decimal('400'), 'power'),
+            (Decimal('2'), Decimal('3'), 'multiply')]
+    result = calc.calculate_many(rows, fast=True)
+    assert [index for index, _ in result.errors] == [0, 1]
+    assert all("out of float range" in str(error) for _, error in result.errors)
+    assert result.calculations[2].result == 6
+    assert not [w for w in recwarn if issubclass(w.category, RuntimeWarning)]
+
+def test_calculator_uses_runtime_registered_operations():
+    from app.operations import Operation, OperationFactory
+
+    @OperationFactory.register("average")
+    class AverageOperation(Operation):
+        def execute(self, a, b):
+            return (a + b) / 2
+
+    try:
+        calc = Calculator()
+        assert calc.calculate(Decimal('4'), Decimal('6'), 'average').result == Decimal('5')
+    finally:
+        OperationFactory.unregister('average')
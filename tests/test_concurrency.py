@@ -0,0 +1,118 @@
+# tests/test_concurrency.py
+import threading
+from decimal import Decimal
+from app.cache import ResultCache
+from app.calculation import Calculation
+from app.calculator import Calculator
+from app.history import History
+from app.metrics import Metrics
+from app.saver import AutoSaveObserver
+
+THREADS = 8
+ROUNDS = 200
+
+class HistoryObserver:
+    def __init__(self, history):
+        self.history = history
+
+    def update(self, calculation):
+        self.history.add_calculation(calculation)
+
+def _calc(i):
+    return Calculation(Decimal(i), Decimal(0), 'add', Decimal(i))
+
+def _run_threads(target):
+    start = threading.Barrier(THREADS)
+    errors = []
+
+    def run(number):
+        start.wait()
+        try:
+            target(number)
+        except Exception as e:  # Reported by the main thread
+            errors.append(e)
+    threads = [threading.Thread(target=run, args=(number,)) for number in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == [], errors
+
+def test_shared_calculator_and_history_under_load(tmp_path):
+    history = History(verbose=False)
+    index = history.enable_index()
+    calculator = Calculator(ResultCache(max_size=64))
+    calculator.attach(HistoryObserver(history))
+    saver = AutoSaveObserver(history, str(tmp_path / "history.csv"), mode="append", flush_every=50, verbose=False)
+    calculator.attach(saver)
+    undone = [0] * THREADS
+
+    def work(number):
+        for i in range(ROUNDS):
+            calculator.calculate(Decimal(number), Decimal(i % 16), 'add')
+            if i % 10 == 9:
+                if history.undo():
+                    undone[number] += 1
+                snapshot = history.snapshot()
+                assert all(calc.result == calc.a + calc.b for calc in snapshot)
+    _run_threads(work)
+
+    assert len(history.calculations) == THREADS * ROUNDS - sum(undone)
+    # The index followed every concurrent change
+    assert index.aggregates()['add']['count'] == len(history.calculations)
+    assert index.aggregates()['add']['sum'] == sum(calc.result for calc in history.calculations)
+    saver.close()
+    reloaded = History(verbose=False)
+    reloaded.load_history(str(tmp_path / "history.csv"))
+    assert reloaded.calculations == history.calculations
+
+def test_undo_and_redo_are_atomic():
+    history = History(verbose=False)
+    for i in range(THREADS):
+        history.add_calculation(_calc(i))
+
+    def work(number):
+        for _ in range(ROUNDS):
+            assert history.undo()
+            assert history.redo()
+    _run_threads(work)
+    assert history.calculations == [_calc(i) for i in range(THREADS)]
+
+def test_attach_and_detach_while_notifying():
+    calculator = Calculator()
+    received = []
+
+    class Recorder:
+        def update(self, calculation):
+            received.append(calculation)
+
+    def work(number):
+        observer = Recorder()
+        for i in range(ROUNDS):
+            calculator.attach(observer)
+            calculator.calculate(Decimal(i), Decimal(1), 'add')
+            calculator.detach(observer)
+    _run_threads(work)
+    # Each thread's own observer was attached for every one of its calculations
+    assert len(received) >= THREADS * ROUNDS
+    assert calculator._observers == ()
+
+def test_metrics_lose_no_updates_under_load():
+    metrics = Metrics()
+    snapshots = []
+
+    def work(number):
+        for i in range(ROUNDS):
+            metrics.increment("requests_total")
+            metrics.increment("requests_total", label=("thread", number % 2))
+            metrics.observe("operation_seconds", 0.001, ("operation", "add"))
+            if i % 50 == 0:
+                snapshots.append(metrics.snapshot())
+                metrics.to_prometheus()
+    _run_threads(work)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["requests_total"] == THREADS * ROUNDS
+    assert snapshot["counters"]["requests_total{thread=0}"] == THREADS * ROUNDS // 2
+    assert snapshot["histograms"]["operation_seconds{operation=add}"]["count"] == THREADS * ROUNDS
+    assert all(s["counters"].get("requests_total", 0) <= THREADS * ROUNDS for s in snapshots)
@@ -34,4 +34,33 @@ def test_logging_observer(tmp_path):
         log_content = f.read()
         assert "Operation: add" in log_content
         assert "Operands: (10, 5)" in log_content
-        assert "Result: 15" in log_content
\ No newline at end of file
+        assert "Result: 15" in log_content
+
+def test_config_typed_getters(monkeypatch):
+    monkeypatch.setenv("CALCULATOR_AUTOSAVE_FLUSH_EVERY", "25")
+    monkeypatch.setenv("CALCULATOR_AUTOSAVE_FSYNC", "true")
+    monkeypatch.setenv("BAD_INT", "abc")
+    assert Config.get_int("CALCULATOR_AUTOSAVE_FLUSH_EVERY", 1) == 25
+    assert Config.get_int("BAD_INT", 7) == 7
+    assert Config.get_int("NON_EXISTENT_VAR", 3) == 3
+    assert Config.get_bool("CALCULATOR_AUTOSAVE_FSYNC") is True
+    assert Config.get_bool("NON_EXISTENT_VAR", True) is True
+
+def test_logging_observer_batch(tmp_path):
+    log_file = tmp_path / "batch.log"
+    logger = LoggingObserver(str(log_file))
+    logger.update_batch([
+        Calculation(Decimal('1'), Decimal('2'), 'add', Decimal('3')),
+        Calculation(Decimal('4'), Decimal('2'), 'divide', Decimal('2')),
+    ])
+    log_content = log_file.read_text()
+    assert "Operation: add" in log_content
+    assert "Operation: divide" in log_content
+
+def test_logging_observer_opens_its_file_lazily(tmp_path):
+    log_file = tmp_path / "lazy.log"
+    observer = LoggingObserver(str(log_file))
+    assert not log_file.exists()
+    observer.update(Calculation(Decimal('1'), Decimal('2'), 'add', Decimal('3')))
+    observer.logger.handlers[0].flush()
+    assert "Result: 3" in log_file.read_text()
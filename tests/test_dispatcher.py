@@ -0,0 +1,103 @@
+# tests/test_dispatcher.py
+import threading
+import pytest
+from decimal import Decimal
+from app.calculator import Calculator
+from app.dispatcher import AsyncDispatcher
+
+class RecordingObserver:
+    """A mock observer that records everything it receives."""
+    def __init__(self, gate=None):
+        self.updates = []
+        self.batches = []
+        self.closed = False
+        self.gate = gate
+
+    def update(self, calculation):
+        if self.gate is not None:
+            self.gate.wait()
+        self.updates.append(calculation)
+
+    def update_batch(self, calculations):
+        self.batches.append(list(calculations))
+
+    def close(self):
+        self.closed = True
+
+class FailingObserver:
+    def update(self, calculation):
+        raise RuntimeError("disk full")
+
+def test_async_dispatch_delivers_in_order_and_isolates_errors():
+    calc = Calculator()
+    failing = FailingObserver()
+    observer = RecordingObserver()
+    calc.attach(failing)
+    calc.attach(observer)
+    dispatcher = calc.start_async_dispatch(max_queue=8)
+    assert calc.start_async_dispatch() is dispatcher
+
+    for i in range(20):
+        calc.calculate(Decimal(i), Decimal('1'), 'add')
+    calc.flush()
+
+    assert [c.result for c in observer.updates] == [Decimal(i + 1) for i in range(20)]
+    assert len(dispatcher.errors) == 20
+    assert dispatcher.errors[0][0] is failing
+
+    calc.notify_batch(calc.calculate_many(a=[Decimal('1'), Decimal('2')], b=[Decimal('1')] * 2, operations='add').succeeded)
+    calc.close()
+    assert len(observer.batches) == 2
+    assert observer.closed is True
+
+def test_drop_oldest_policy():
+    gate = threading.Event()
+    observer = RecordingObserver(gate)
+    dispatcher = AsyncDispatcher(max_queue=2, policy="drop_oldest")
+    for i in range(6):
+        dispatcher.submit((observer,), [i])
+    gate.set()
+    dispatcher.close()
+    # The first event may already be in delivery; later ones were dropped down to the newest two
+    assert observer.updates[-2:] == [4, 5]
+    assert dispatcher.dropped == 6 - len(observer.updates)
+
+def test_coalesce_policy_merges_into_batches():
+    gate = threading.Event()
+    blocker = RecordingObserver(gate)
+    observer = RecordingObserver()
+    dispatcher = AsyncDispatcher(max_queue=1, policy="coalesce")
+    dispatcher.submit((blocker,), [0])
+    assert dispatcher.flush(timeout=0.05) is False  # The worker is stuck on the gate
+    for i in range(1, 5):
+        dispatcher.submit((observer,), [i])
+    gate.set()
+    assert dispatcher.flush(timeout=5)
+    assert observer.batches == [[1, 2, 3, 4]]
+
+    # Events for different observers cannot be merged, so the oldest one is dropped
+    gate.clear()
+    dispatcher.submit((blocker,), [5])
+    dispatcher.flush(timeout=0.05)
+    dispatcher.submit((observer,), [6])
+    dispatcher.submit((blocker,), [7])
+    gate.set()
+    dispatcher.close()
+    assert dispatcher.dropped == 1
+    assert blocker.updates == [0, 5, 7]
+
+def test_block_policy_and_closed_dispatcher():
+    observer = RecordingObserver()
+    dispatcher = AsyncDispatcher(max_queue=1, policy="block")
+    for i in range(50):
+        dispatcher.submit((observer,), [i])
+    dispatcher.close()
+    assert observer.updates == list(range(50))
+    with pytest.raises(RuntimeError):
+        dispatcher.submit((observer,), [1])
+
+def test_dispatcher_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        AsyncDispatcher(policy="sometimes")
+    with pytest.raises(ValueError):
+        AsyncDispatcher(max_queue=0)
@@ -0,0 +1,90 @@
+# tests/test_expression.py
+import decimal
+import pytest
+from decimal import Decimal
+from app.calculator import Calculator
+from app.exceptions import OperationError, ValidationError
+from app import expression as expression_module
+from app.expression import CompiledExpression, compile_expression, parse, tokenize
+
+@pytest.mark.parametrize("source, expected", [
+    ("(3 + 4) ^ 2 % 5", Decimal('4')),
+    ("1 + 2 * 3", Decimal('7')),
+    ("10 - 4 - 3", Decimal('3')),
+    ("2 ^ 3 ^ 2", Decimal('512')),
+    ("-2 ^ 2", Decimal('-4')),
+    ("2 ^ -1", Decimal('0.5')),
+    ("+5 - -5", Decimal('10')),
+    ("10 // 3 * 2", Decimal('6')),
+    ("root(27, 3) + abs_diff(1, 4)", Decimal('6')),
+    ("1.5e2 / .5", Decimal('300')),
+    ("7", Decimal('7')),
+])
+def test_expression_values(source, expected):
+    assert compile_expression(source).evaluate() == expected
+
+def test_tokenizer_and_parser():
+    assert tokenize("2//x") == [('number', '2'), ('op', '//'), ('name', 'x')]
+    assert parse("-(1 + x)") == ('neg', ('op', 'add', ('num', Decimal('1')), ('var', 'x')))
+
+@pytest.mark.parametrize("source", ["", "1 +", "(1 + 2", "1 2", "3 $ 4", "nope(1, 2)", "root(1 2)", ")", "1..2"])
+def test_invalid_expressions(source):
+    with pytest.raises(ValidationError):
+        compile_expression(source)
+
+def test_constant_folding_and_cache():
+    expression = compile_expression("(3 + 4) ^ 2 % 5")
+    assert expression.constant == Decimal('4')
+    # Extra whitespace still hits the same cached expression
+    assert compile_expression("  (3 + 4)   ^ 2 % 5 ") is expression
+
+    # Folded constants depend on the decimal context, so the cache does too
+    third = compile_expression("1 / 3").evaluate()
+    with decimal.localcontext() as ctx:
+        ctx.prec = 5
+        assert compile_expression("1 / 3").evaluate() == Decimal('0.33333')
+    assert compile_expression("1 / 3").evaluate() == third
+
+def test_each_subtree_is_compiled_once(monkeypatch):
+    compiled = []
+    original = expression_module._compile
+
+    def counting(node):
+        compiled.append(node)
+        return original(node)
+    monkeypatch.setattr(expression_module, "_compile", counting)
+    tree = parse("(3 + x) ^ 2 % 5")
+    assert CompiledExpression("(3 + x) ^ 2 % 5", tree).evaluate({'x': Decimal('4')}) == Decimal('4')
+    # Every node below the root (^, +, 3, x, 2, 5) is compiled exactly once
+    assert len(compiled) == 6
+
+def test_variables():
+    expression = compile_expression("x * 2 + -y")
+    assert expression.variables == {'x', 'y'}
+    assert expression.constant is None
+    assert expression.evaluate({'x': Decimal('5'), 'y': Decimal('1')}) == Decimal('9')
+    assert compile_expression("-x").evaluate({'x': Decimal('2')}) == Decimal('-2')
+    with pytest.raises(OperationError, match="Unknown variable: y"):
+        expression.evaluate({'x': Decimal('5')})
+
+def test_calculator_evaluate_records_single_entry():
+    calc = Calculator()
+    seen = []
+
+    class Observer:
+        def update(self, calculation):
+            seen.append(calculation)
+
+    calc.attach(Observer())
+    calculation = calc.evaluate("(3 + 4) ^ 2 % 5")
+    assert (calculation.a, calculation.b, calculation.result) == (Decimal('49'), Decimal('5'), Decimal('4'))
+    assert calculation.operation == "(3 + 4) ^ 2 % 5"
+    assert seen == [calculation]
+
+    literal = calc.evaluate("42")
+    assert (literal.a, literal.b, literal.result) == (Decimal('42'), Decimal('0'), Decimal('42'))
+
+    # Errors in folded subexpressions surface at evaluation time
+    with pytest.raises(OperationError, match="Error during calculation: Cannot divide by zero."):
+        calc.evaluate("1 + 1 / 0")
+    assert len(seen) == 2
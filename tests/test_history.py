@@ -77,4 +77,133 @@ def test_new_action_clears_redo_stack():
     # Trying to redo should do nothing
     history.redo()
     assert len(history.calculations) == 2
-    assert history.calculations[-1] == calc3
\ No newline at end of file
+    assert history.calculations[-1] == calc3
+
+def test_add_does_not_snapshot_history(monkeypatch):
+    """Adding calculations must not deep-copy the whole history each time."""
+    import app.calculator_memento as memento_module
+
+    def fail_snapshot(*args, **kwargs):
+        raise AssertionError("add_calculation should not snapshot the history")
+
+    monkeypatch.setattr(memento_module.CalculatorMemento, "__init__", fail_snapshot)
+    history = History()
+    for _ in range(100):
+        history.add_calculation(calc1)
+    history.undo()
+    history.redo()
+    assert len(history.calculations) == 100
+    assert len(history._undo_stack) == 100
+
+def test_undo_after_load_history(tmp_path):
+    file_path = tmp_path / "history.csv"
+    saved = History()
+    saved.add_calculation(calc1)
+    saved.add_calculation(calc2)
+    saved.save_history(str(file_path))
+
+    history = History()
+    history.add_calculation(calc3)
+    history.load_history(str(file_path))
+    assert len(history.calculations) == 2
+
+    # The loaded state is the baseline, so there is nothing to undo yet
+    history.undo()
+    assert len(history.calculations) == 2
+
+    history.add_calculation(calc3)
+    history.undo()
+    assert len(history.calculations) == 2
+    assert history.calculations[-1] == calc2
+    history.redo()
+    assert history.calculations[-1] == calc3
+
+def test_restore_from_memento_is_undoable():
+    history = History()
+    history.add_calculation(calc1)
+    memento = history.create_memento()
+    history.add_calculation(calc2)
+    history.add_calculation(calc3)
+
+    history.restore_from_memento(memento)
+    assert history.calculations == [calc1]
+
+    history.undo()
+    assert history.calculations == [calc1, calc2, calc3]
+    history.redo()
+    assert history.calculations == [calc1]
+
+def test_add_calculations_is_one_undo_step():
+    history = History()
+    history.add_calculation(calc1)
+    history.add_calculations([calc2, calc3])
+    assert history.calculations == [calc1, calc2, calc3]
+
+    history.undo()
+    assert history.calculations == [calc1]
+    history.redo()
+    assert history.calculations == [calc1, calc2, calc3]
+
+    history.add_calculations([])
+    assert len(history._undo_stack) == 2
+
+def test_consecutive_mementos_share_unchanged_entries():
+    history = History(verbose=False)
+    history.add_calculations([calc1] * 1000)
+    first = history.create_memento()
+    history.add_calculation(calc2)
+    second = history.create_memento()
+    assert second.get_state() == [calc1] * 1000 + [calc2]
+    assert second.get_state().shared_nodes(first.get_state()) == 1000 // 32
+    assert first.get_state() == [calc1] * 1000  # Earlier snapshots are not affected
+    history.replace_calculations({500: calc3})
+    edited = history.create_memento()
+    assert edited.get_state()[500] == calc3 and second.get_state()[500] == calc1
+    assert edited.get_state().shared_nodes(second.get_state()) == 1000 // 32 - 1
+
+    for _ in range(3):
+        history.undo()
+    history.add_calculation(calc3)
+    third = history.create_memento()
+    assert third.get_state() == [calc3]
+    history.restore_from_memento(second)
+    assert history.calculations == [calc1] * 1000 + [calc2]
+
+def test_cold_mementos_are_compressed():
+    history = History(verbose=False, compress_after=2)
+    history.add_calculations([calc1] * 100)
+    memento = history.create_memento()
+    history.add_calculation(calc2)
+    history.restore_from_memento(memento)
+    restore = history._undo_stack[-1]
+    history.add_calculation(calc3)
+    assert not restore.previous.compressed
+    history.add_calculation(calc3)
+    assert restore.previous.compressed and restore.current.compressed
+    assert 0 < restore.previous.nbytes() < 1000
+
+    for _ in range(3):
+        history.undo()
+    assert history.calculations == [calc1] * 100 + [calc2]
+    history.redo()
+    assert history.calculations == [calc1] * 100
+
+def test_compressed_mementos_keep_the_chunks_they_share():
+    history = History(verbose=False, compress_after=2)
+    history.add_calculations([calc1] * 1000)
+    memento = history.create_memento()
+    history.add_calculation(calc2)
+    history.restore_from_memento(memento)
+    restore = history._undo_stack[-1]
+    history.add_calculation(calc3)
+    live = history.create_memento()
+    assert live.get_state().shared_nodes(memento.get_state()) == 1000 // 32
+    assert not restore.current.compressed
+    history.add_calculation(calc3)
+
+    assert restore.previous.compressed and restore.current.compressed
+    # Only the partial last chunks were packed; the full ones are still shared with the live snapshot
+    assert restore.current.get_state().shared_nodes(live.get_state()) == 1000 // 32
+    assert restore.previous.get_state().shared_nodes(live.get_state()) == 1000 // 32
+    assert restore.current.get_state() == [calc1] * 1000
+    assert restore.previous.get_state() == [calc1] * 1000 + [calc2]
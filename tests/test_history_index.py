@@ -0,0 +1,121 @@
+# tests/test_history_index.py
+import random
+from decimal import Decimal
+import pytest
+from app.calculation import Calculation
+from app.history import History
+from app.history_index import HistoryIndex, SortedKeys
+
+def _calc(a, b, operation, result):
+    return Calculation(Decimal(a), Decimal(b), operation, Decimal(result))
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def indexed():
+    history = History(verbose=False)
+    clock = FakeClock()
+    history.index = HistoryIndex(history, clock=clock)
+    return history, clock
+
+def test_sorted_keys_matches_sorted_list():
+    rng = random.Random(7)
+    keys = SortedKeys()
+    reference = []
+    for _ in range(3000):
+        key = rng.randrange(1000)
+        keys.add(key)
+        reference.append(key)
+    for key in reference[:1000]:
+        keys.remove(key)
+    reference = sorted(reference[1000:])
+    keys.update(list(range(5)))
+    reference = sorted(reference + list(range(5)))
+    assert list(keys) == reference
+    assert list(keys.irange(100, 200)) == [k for k in reference if 100 <= k <= 200]
+    assert list(keys.irange(100, 200, reverse=True)) == [k for k in reversed(reference) if 100 <= k <= 200]
+    assert keys.count(100, 200) == sum(1 for k in reference if 100 <= k <= 200)
+    with pytest.raises(KeyError):
+        keys.remove(5000)
+
+def test_query_filters(indexed):
+    history, clock = indexed
+    history.add_calculation(_calc(1, 2, 'add', 3))
+    clock.now += 100
+    history.add_calculations([_calc(3, 4, 'multiply', 12), _calc(10, 20, 'add', 30), _calc(1, 0, 'divide', 'NaN')])
+    index = history.index
+    assert index.query(operation='add') == [0, 2]
+    assert index.query(min_result=Decimal(5)) == [1, 2]
+    assert index.query(operation='add', min_result=Decimal(5), max_result=Decimal(30)) == [2]
+    assert index.query(since=1050) == [1, 2, 3]
+    assert index.query(until=1050) == [0]
+    assert index.query(limit=2) == [2, 3]
+    assert index.query(limit=0) == []
+    assert index.query(operation='power') == []
+    assert [c.result for c in history.query(operation='add')] == [Decimal(3), Decimal(30)]
+
+def test_top_and_aggregates(indexed):
+    history, _ = indexed
+    history.add_calculations([_calc(i, 1, 'add' if i % 2 else 'subtract', i) for i in range(10)])
+    assert history.index.top(3) == [9, 8, 7]
+    assert history.index.top(2, operation='subtract', smallest=True) == [0, 2]
+    assert history.index.top(2, operation='power') == []
+    assert history.index.top(0) == [] and history.index.top(-1) == []
+    summary = history.index.aggregates()
+    assert summary['add'] == {"count": 5, "sum": Decimal(25), "mean": Decimal(5)}
+    assert summary['subtract']['sum'] == Decimal(20)
+
+def test_index_follows_undo_redo_and_load(indexed, tmp_path):
+    history, _ = indexed
+    history.add_calculation(_calc(1, 2, 'add', 3))
+    history.add_calculations([_calc(2, 3, 'add', '0.1'), _calc(2, 3, 'multiply', 6)])
+    history.undo()
+    assert history.index.query() == [0]
+    assert history.index.aggregates() == {'add': {"count": 1, "sum": Decimal(3), "mean": Decimal(3)}}
+    history.redo()
+    assert history.index.query(operation='multiply') == [2]
+    assert history.index.aggregates('add')['add']['sum'] == Decimal('3.1')
+
+    path = tmp_path / "history.csv"
+    history.save_history(str(path))
+    history.restore_from_memento(History(verbose=False).create_memento())
+    assert len(history.index) == 0
+    history.load_history(str(path))
+    assert history.index.query(operation='add') == [0, 1]
+    assert history.index.top(1) == [2]
+
+def test_exact_sums_survive_undo(indexed):
+    history, _ = indexed
+    history.add_calculation(_calc(0, 0, 'add', '1E+40'))
+    history.add_calculation(_calc(0, 0, 'add', '1'))
+    history.add_calculation(_calc(0, 0, 'add', '-1E+40'))
+    assert history.index.aggregates()['add']['sum'] == Decimal(1)
+    history.undo()
+    history.undo()
+    assert history.index.aggregates()['add']['sum'] == Decimal('1E+40')
+
+def test_timestamps_survive_replacements_and_reloads(indexed, tmp_path):
+    history, clock = indexed
+    history.add_calculations([_calc(1, 1, 'add', 2), _calc(2, 2, 'add', 4)])
+    clock.now += 100
+    history.add_calculation(_calc(3, 3, 'multiply', 9))
+    clock.now += 100
+    history.replace_calculations({0: _calc(1, 1, 'multiply', 1)})
+    assert history.index.query(until=1050) == [0, 1]
+    assert history.index.query(operation='multiply') == [0, 2]
+    assert history.index.top(1, operation='add') == [1]
+    assert history.index.aggregates('add')['add']['sum'] == Decimal(4)
+    history.undo()
+    assert history.index.query(operation='add') == [0, 1]
+    assert history.index.query(since=1050) == [2]
+
+    path = tmp_path / "history.csv"
+    history.save_history(str(path))
+    clock.now += 100
+    history.load_history(str(path))
+    assert [history.index.timestamp(p) for p in range(3)] == [1000.0, 1000.0, 1100.0]
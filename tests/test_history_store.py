@@ -0,0 +1,79 @@
+# tests/test_history_store.py
+import sys
+import pytest
+from decimal import Decimal
+from fractions import Fraction
+from app.calculation import Calculation
+from app.history import History
+from app.history_store import ColumnarHistoryStore
+
+calc1 = Calculation(Decimal('10'), Decimal('5'), 'add', Decimal('15'))
+calc2 = Calculation(Decimal('1.50'), Decimal('-2'), 'multiply', Decimal('-3.00'))
+calc3 = Calculation(Decimal('30'), Decimal('10'), 'subtract', Decimal('20'))
+
+def test_calculation_is_slotted_and_interns_operation():
+    calc = Calculation(Decimal('1'), Decimal('2'), ''.join(['a', 'dd']), Decimal('3'))
+    assert not hasattr(calc, '__dict__')
+    assert calc.operation is sys.intern('add')
+
+def test_store_round_trips_values_exactly():
+    awkward = [
+        Calculation(Decimal('12345678901234567890.123'), Decimal('1E+40000'), 'power', Decimal('Infinity')),
+        Calculation(Decimal('-0'), Decimal('NaN'), 'add', Decimal('0.000')),
+        Calculation(3, 1.5, 'divide', Fraction(2, 1)),
+    ]
+    store = ColumnarHistoryStore([calc1, calc2] + awkward)
+    assert len(store) == 5
+    assert store[1] == calc2
+    assert str(store[1].result) == '-3.00'
+    assert str(store[2].a) == '12345678901234567890.123'
+    assert str(store[3].a) == '-0'
+    assert store[3].b.is_nan()
+    assert type(store[4].b) is float
+    assert store[4].result == Fraction(2, 1)
+    assert store[-5] == calc1
+    assert store[0:2] == [calc1, calc2]
+    with pytest.raises(IndexError):
+        store[5]
+
+def test_store_supports_list_operations():
+    store = ColumnarHistoryStore()
+    store.append(calc1)
+    store.extend([calc2, calc3])
+    assert store == [calc1, calc2, calc3]
+
+    del store[-1]
+    assert store == [calc1, calc2]
+    del store[0]
+    assert store == [calc2]
+    store.insert(0, calc1)
+    store.insert(5, calc3)
+    assert store == [calc1, calc2, calc3]
+    store[1] = calc3
+    assert store == [calc1, calc3, calc3]
+    store[:] = [calc2]
+    assert list(store) == [calc2]
+    assert store != "not a list"
+    assert "ColumnarHistoryStore" in repr(store)
+    assert store.nbytes() > 0
+
+    store.clear()
+    assert len(store) == 0
+
+def test_store_grows_operation_codes():
+    store = ColumnarHistoryStore()
+    for i in range(0x10002):
+        store._op_code(f"op{i}")
+    assert store._op_codes.typecode == 'I'
+
+def test_columnar_history_undo_redo():
+    history = History(backend="columnar")
+    history.add_calculation(calc1)
+    history.add_calculations([calc2, calc3])
+    history.undo()
+    assert history.calculations == [calc1]
+    history.redo()
+    assert history.calculations[-1] == calc3
+
+    with pytest.raises(ValueError):
+        History(backend="sqlite")
@@ -0,0 +1,100 @@
+# tests/test_log_handlers.py
+import gzip
+import json
+import logging
+from decimal import Decimal
+import pytest
+from app.calculation import Calculation
+from app.log_handlers import BatchFileHandler, CALCULATION_MESSAGE
+from app.logger import LoggingObserver
+
+def _calculations(count):
+    return [Calculation(Decimal(i), Decimal('1'), 'add', Decimal(i + 1)) for i in range(count)]
+
+def _record(message, *args):
+    return logging.LogRecord("test", logging.INFO, __file__, 0, message, args, None)
+
+def test_buffered_mode_writes_everything_by_flush(tmp_path):
+    log_file = tmp_path / "buffered.log"
+    observer = LoggingObserver(str(log_file), mode="buffered", batch_size=16)
+    observer.update_batch(_calculations(100))
+    observer.flush()
+    lines = log_file.read_text().splitlines()
+    assert len(lines) == 100
+    assert lines[0].endswith("Operation: add, Operands: (0, 1), Result: 1")
+    assert lines[-1].endswith("Result: 100")
+    observer.update(_calculations(1)[0])
+    observer.close()
+    assert len(log_file.read_text().splitlines()) == 101
+
+def test_formatting_is_deferred_until_written(tmp_path):
+    class CountingDecimal(Decimal):
+        formatted = 0
+
+        def __str__(self):
+            CountingDecimal.formatted += 1
+            return super().__str__()
+
+    observer = LoggingObserver(str(tmp_path / "deferred.log"), mode="buffered")
+    observer.logger.setLevel(logging.WARNING)  # Filtered out: never formatted
+    observer.update(Calculation(CountingDecimal(1), Decimal(2), 'add', Decimal(3)))
+    observer.close()
+    assert CountingDecimal.formatted == 0
+
+def test_jsonl_format(tmp_path):
+    log_file = tmp_path / "calc.jsonl"
+    observer = LoggingObserver(str(log_file), log_format="jsonl")
+    observer.update(Calculation(Decimal('1.5'), Decimal('2'), 'multiply', Decimal('3.0')))
+    observer.logger.info("plain message")
+    observer.close()
+    first, second = (json.loads(line) for line in log_file.read_text().splitlines())
+    assert (first["operation"], first["a"], first["b"], first["result"]) == ("multiply", "1.5", "2", "3.0")
+    assert first["level"] == "INFO" and "time" in first
+    assert second["message"] == "plain message"
+
+def test_size_rotation_keeps_backups(tmp_path):
+    log_file = tmp_path / "rotating.log"
+    handler = BatchFileHandler(str(log_file), max_bytes=100, backup_count=2)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler.emit_batch([_record("x" * 39) for _ in range(7)])  # 40 bytes per line
+    handler.close()
+    assert log_file.read_text() == "x" * 39 + "\n"
+    assert (tmp_path / "rotating.log.1").read_text() == ("x" * 39 + "\n") * 2
+    assert (tmp_path / "rotating.log.2").exists()
+    assert not (tmp_path / "rotating.log.3").exists()
+
+def test_rotated_files_can_be_compressed(tmp_path):
+    log_file = tmp_path / "compressed.log"
+    handler = BatchFileHandler(str(log_file), max_bytes=50, backup_count=3, compress=True)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    for i in range(3):
+        handler.emit(_record("line %d " + "y" * 30, i))
+    handler.close()
+    with gzip.open(tmp_path / "compressed.log.2.gz", "rt") as rotated:
+        assert rotated.read().startswith("line 0")
+    with gzip.open(tmp_path / "compressed.log.1.gz", "rt") as rotated:
+        assert rotated.read().startswith("line 1")
+    assert log_file.read_text().startswith("line 2")
+
+def test_time_rotation(tmp_path, monkeypatch):
+    import app.log_handlers as log_handlers
+    now = [1000.0]
+    monkeypatch.setattr(log_handlers.time, "time", lambda: now[0])
+    log_file = tmp_path / "timed.log"
+    handler = BatchFileHandler(str(log_file), rotate_seconds=60)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler.emit(_record("first"))
+    now[0] += 61
+    handler.emit(_record("second"))
+    handler.close()
+    assert (tmp_path / "timed.log.1").read_text() == "first\n"
+    assert log_file.read_text() == "second\n"
+
+def test_calculation_message_is_unchanged(tmp_path):
+    assert CALCULATION_MESSAGE % ("add", 1, 2, 3) == "Operation: add, Operands: (1, 2), Result: 3"
+
+def test_rejects_unknown_settings(tmp_path):
+    with pytest.raises(ValueError, match="Unknown logging mode"):
+        LoggingObserver(str(tmp_path / "x.log"), mode="async")
+    with pytest.raises(ValueError, match="Unknown log format"):
+        LoggingObserver(str(tmp_path / "x.log"), log_format="xml")
@@ -0,0 +1,105 @@
+# tests/test_metrics.py
+import json
+from decimal import Decimal
+import pytest
+from app.calculator import Calculator
+from app.history import History
+from app.metrics import METRICS, Histogram, Metrics, SIZE_BUCKETS
+from app.saver import AutoSaveObserver
+
+@pytest.fixture
+def metrics():
+    METRICS.reset()
+    METRICS.enabled = True
+    yield METRICS
+    METRICS.enabled = False
+    METRICS.reset()
+
+class NullObserver:
+    def update(self, calculation):
+        pass
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram((1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0, 10.0):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.count == 5 and histogram.sum == 16.5 and histogram.max == 10.0
+    assert histogram.quantile(0.5) == 2.0
+    assert histogram.quantile(1.0) == 10.0
+    assert Histogram().quantile(0.5) == 0.0
+
+def test_disabled_metrics_record_nothing():
+    METRICS.reset()
+    calc = Calculator()
+    calc.attach(NullObserver())
+    calc.calculate(Decimal('1'), Decimal('2'), 'add')
+    assert METRICS.histograms == {} and METRICS.counters == {}
+
+def test_calculator_records_operation_and_observer_latency(metrics):
+    calc = Calculator()
+    calc.attach(NullObserver())
+    calc.calculate(Decimal('1'), Decimal('2'), 'add')
+    calc.calculate(Decimal('2'), Decimal('3'), 'add')
+    with pytest.raises(Exception):
+        calc.calculate(Decimal('1'), Decimal('0'), 'divide')
+    calc.evaluate("1 + 2 * 3")
+    calc.calculate_many([(Decimal('1'), Decimal('1'), 'add'), (Decimal('1'), Decimal('0'), 'divide')])
+
+    snapshot = metrics.snapshot()
+    assert snapshot["histograms"]["operation_seconds{operation=add}"]["count"] == 2
+    assert snapshot["histograms"]["operation_seconds{operation=eval}"]["count"] == 1
+    assert snapshot["histograms"]["observer_seconds{observer=NullObserver}"]["count"] == 4
+    assert snapshot["histograms"]["batch_seconds"]["count"] == 1
+    assert snapshot["counters"]["batch_rows_total"] == 2
+    assert snapshot["counters"]["operation_errors_total"] == 2
+
+def test_history_and_autosave_metrics(metrics, tmp_path):
+    history = History()
+    collector = Metrics()
+    collector.add_collector(history.metrics)
+    calc = Calculator()
+    saver = AutoSaveObserver(history, str(tmp_path / "history.csv"), verbose=False)
+    calc.attach(saver)
+    calculation = calc.calculate(Decimal('1'), Decimal('2'), 'add')
+    history.add_calculation(calculation)
+    saver.flush()
+
+    snapshot = metrics.snapshot()
+    saved = snapshot["histograms"]["autosave_bytes{mode=rewrite}"]
+    assert saved["count"] == 2
+    assert saved["max"] == (tmp_path / "history.csv").stat().st_size
+    assert snapshot["counters"]["autosave_bytes_total"] == saved["sum"]
+    assert snapshot["histograms"]["history_record_seconds"]["count"] == 1
+    gauges = collector.snapshot()["gauges"]
+    assert gauges["history_entries"] == 1
+    assert gauges["history_memory_bytes"] > 0
+    assert History("columnar").memory_bytes() == 0
+
+def test_prometheus_and_json_export():
+    registry = Metrics()
+    registry.observe("autosave_bytes", 300, ("mode", 'a"b'), buckets=SIZE_BUCKETS)
+    registry.increment("rows_total", 3)
+    registry.set_gauge("queue_depth", 7)
+    text = registry.to_prometheus()
+    assert "# TYPE calculator_autosave_bytes histogram" in text
+    assert 'calculator_autosave_bytes_bucket{mode="a\\"b",le="256"} 0' in text
+    assert 'calculator_autosave_bytes_bucket{mode="a\\"b",le="1024"} 1' in text
+    assert 'calculator_autosave_bytes_bucket{mode="a\\"b",le="+Inf"} 1' in text
+    assert "calculator_rows_total 3" in text
+    assert "# TYPE calculator_queue_depth gauge\ncalculator_queue_depth 7" in text
+    data = json.loads(registry.to_json())
+    assert data["counters"] == {"rows_total": 3}
+    registry.reset()
+    assert registry.snapshot()["histograms"] == {}
+
+def test_profile_capture(tmp_path):
+    registry = Metrics()
+    assert registry.stop_profile() == ""
+    registry.start_profile()
+    assert registry.profiling
+    Calculator().calculate(Decimal('2'), Decimal('10'), 'power')
+    report = registry.stop_profile(str(tmp_path / "session.prof"))
+    assert "function calls" in report
+    assert (tmp_path / "session.prof").exists()
+    assert not registry.profiling
@@ -0,0 +1,74 @@
+# tests/test_numeric.py
+import decimal
+import pytest
+from decimal import Decimal
+from app import numeric
+from app.exceptions import OperationError
+
+@pytest.mark.parametrize("a, b", [
+    ('2', '10'), ('1.1', '50'), ('-3', '7'), ('7', '-3'), ('123.456', '12'), ('2', '100'),
+])
+def test_integer_power_matches_decimal(a, b):
+    assert numeric.power(Decimal(a), Decimal(b)) == Decimal(a) ** Decimal(b)
+
+def test_power_special_cases():
+    assert numeric.power(Decimal('9'), Decimal('0.5')) == Decimal('3')
+    assert numeric.power(Decimal('0'), Decimal('3')) == Decimal('0')
+    assert numeric.power(Decimal('2'), Decimal('10'), precision=2) == Decimal('1.0E+3')
+    with pytest.raises(OperationError, match="zero to a negative power"):
+        numeric.power(Decimal('0'), Decimal('-1'))
+    with pytest.raises(OperationError, match="fractional power"):
+        numeric.power(Decimal('-8'), Decimal('0.5'))
+    with pytest.raises(OperationError, match="Precision"):
+        numeric.power(Decimal('2'), Decimal('2'), precision=0)
+
+def test_power_rejects_pathological_inputs():
+    with pytest.raises(OperationError, match="Exponent is larger"):
+        numeric.power(Decimal('10'), Decimal('10000000'))
+    with pytest.raises(OperationError, match="too large"):
+        numeric.power(Decimal('10'), Decimal('1000001.5'))
+    with pytest.raises(OperationError, match="too large"):
+        numeric.power(Decimal('1E+10'), Decimal('200000'))
+    with pytest.raises(OperationError, match="too small"):
+        numeric.power(Decimal('1E-10'), Decimal('200000'))
+    with pytest.raises(OperationError, match="digits"):
+        numeric.power(Decimal('1' * 10001), Decimal('2'))
+
+def test_limits_are_configurable():
+    original = (numeric.LIMITS.max_exponent, numeric.LIMITS.max_digits)
+    try:
+        numeric.configure(max_exponent=10, max_digits=3)
+        with pytest.raises(OperationError):
+            numeric.power(Decimal('2'), Decimal('11'))
+        with pytest.raises(OperationError):
+            numeric.root(Decimal('1234'), Decimal('2'))
+        with pytest.raises(OperationError, match="Root degree"):
+            numeric.root(Decimal('2'), Decimal('11'))
+    finally:
+        numeric.configure(*original)
+
+@pytest.mark.parametrize("a, n, expected", [
+    ('64', '2', '8'),
+    ('27', '3', '3'),
+    ('-8', '3', '-2'),
+    ('2', '-2', '0.7071067811865475244008443621'),
+    ('10', '3', '2.154434690031883721759293567'),
+    ('0', '5', '0'),
+])
+def test_newton_root(a, n, expected):
+    assert numeric.root(Decimal(a), Decimal(n)) == Decimal(expected)
+
+def test_root_precision_and_errors():
+    sqrt2 = numeric.root(Decimal('2'), Decimal('2'), precision=60)
+    with decimal.localcontext() as ctx:
+        ctx.prec = 60
+        assert sqrt2 == Decimal('2').sqrt()
+    assert str(numeric.root(Decimal('64'), Decimal('2'))) == '8.000000000000000000000000000'
+    assert numeric.root(Decimal('16'), Decimal('0.5')) == Decimal('256')
+    assert numeric.root(Decimal('-32'), Decimal('2.5')) == -numeric.root(Decimal('32'), Decimal('2.5'))
+    with pytest.raises(OperationError, match="zeroth root"):
+        numeric.root(Decimal('4'), Decimal('0'))
+    with pytest.raises(OperationError, match="even root"):
+        numeric.root(Decimal('-4'), Decimal('2'))
+    with pytest.raises(OperationError, match="negative root of zero"):
+        numeric.root(Decimal('0'), Decimal('-2'))
@@ -0,0 +1,161 @@
+# tests/test_numeric_backends.py
+import decimal
+from decimal import Decimal
+from fractions import Fraction
+import pytest
+from app.calculator import Calculator
+from app.exceptions import OperationError, ValidationError
+from app.history import History
+from app.numeric_backends import FLOAT, INTEGER, RATIONAL, Interval, auto_backend, get_backend
+
+OPERATIONS = ['add', 'subtract', 'multiply', 'divide', 'power', 'root',
+              'modulus', 'int_divide', 'percent', 'abs_diff']
+
+def test_rational_backend_is_exact():
+    calc = Calculator(backend="rational")
+    assert calc.calculate(1, 3, 'divide').result == Fraction(1, 3)
+    assert calc.calculate(Fraction(1, 3), Fraction(1, 6), 'add').result == Fraction(1, 2)
+    assert calc.calculate(Decimal('0.1'), Decimal('0.2'), 'add').result == Fraction(3, 10)
+    assert calc.calculate(Fraction(8, 27), Fraction(2, 3), 'power').result == Fraction(4, 9)
+    assert calc.calculate(-8, 3, 'root').result == -2
+    # Truncating division and remainder, as Decimal does
+    assert calc.calculate(-7, 2, 'int_divide').result == -3
+    assert calc.calculate(-7, 2, 'modulus').result == -1
+    with pytest.raises(OperationError, match="irrational"):
+        calc.calculate(2, 2, 'root')
+    with pytest.raises(OperationError, match="divide by zero"):
+        calc.calculate(1, 0, 'divide')
+
+@pytest.mark.parametrize("operation", OPERATIONS)
+def test_intervals_enclose_the_decimal_result(operation):
+    decimal_calc = Calculator()
+    interval_calc = Calculator(backend="interval")
+    for a, b in [('7', '2'), ('-7.5', '3'), ('16', '4'), ('2', '0.5'), ('10', '3')]:
+        try:
+            expected = decimal_calc.calculate(Decimal(a), Decimal(b), operation).result
+        except OperationError:
+            continue
+        with decimal.localcontext() as ctx:
+            ctx.prec = 60
+            precise = decimal_calc.calculate(Decimal(a), Decimal(b), operation).result
+        result = interval_calc.calculate(Decimal(a), Decimal(b), operation).result
+        assert precise in result, (a, b)
+        assert result.width() <= abs(expected) * Decimal('1E-26'), (a, b)
+
+def test_interval_arithmetic_widens_with_uncertainty():
+    calc = Calculator(backend="interval")
+    result = calc.calculate(Interval.parse("2+-0.1"), Interval.parse("[1, 3]"), 'multiply').result
+    assert result == Interval(Decimal('1.9'), Decimal('6.3'))
+    # An even power of an interval around zero bottoms out at zero
+    assert calc.calculate(Interval(-2, 3), 2, 'power').result == Interval(0, 9)
+    assert calc.calculate(Interval(4), 2, 'root').result == Interval(2)
+    with pytest.raises(OperationError, match="contains zero"):
+        calc.calculate(1, Interval(-1, 1), 'divide')
+    with pytest.raises(OperationError, match="even root of a negative number"):
+        calc.calculate(Interval(-1, 4), 2, 'root')
+
+@pytest.mark.parametrize("a, b, operation, message", [
+    (0, -1, 'power', "zero to a negative power"),
+    (-8, Fraction(1, 3), 'power', "negative number to a fractional power"),
+    (2, 10 ** 9, 'power', "Exponent is larger"),
+    (8, 0, 'root', "zeroth root"),
+    (-4, 2, 'root', "even root of a negative number"),
+    (7, 0, 'int_divide', "integer division by zero"),
+    (7, 0, 'modulus', "modulus by zero"),
+    (Interval(1, 2), 1, 'add', "as an exact rational"),
+    (Decimal('Infinity'), 1, 'add', "as a rational number"),
+])
+def test_rational_backend_errors(a, b, operation, message):
+    with pytest.raises(OperationError, match=message):
+        Calculator(backend="rational").calculate(a, b, operation)
+
+@pytest.mark.parametrize("a, b, operation, message", [
+    (Interval(-1, 1), -2, 'power', "contains zero to a negative power"),
+    (Interval(-1, 4), '0.5', 'power', "negative values to a fractional power"),
+    (Interval(0, 4), Interval('-0.5', '-0.25'), 'power', "zero to a negative power"),
+    (8, Interval(-1, 1), 'root', "zeroth root"),
+    (Interval(-8, -1), Interval('1.5', '2.5'), 'root', "even root of a negative number"),
+    (Interval(0, 8), -3, 'root', "negative root of an interval that contains zero"),
+    (7, Interval(0), 'int_divide', "integer division by zero"),
+    (7, Interval(0), 'modulus', "modulus by zero"),
+    (Interval(5, 7), 3, 'modulus', "remainder jumps"),
+])
+def test_interval_backend_errors(a, b, operation, message):
+    b = Decimal(b) if isinstance(b, str) else b
+    with pytest.raises(OperationError, match=message):
+        Calculator(backend="interval").calculate(a, b, operation)
+
+def test_interval_root_follows_decimal_root():
+    calc = Calculator(backend="interval")
+    # Odd and fractional roots of negative numbers are negative, as in numeric.root
+    assert Decimal(-4) in calc.calculate(Interval(-8), Decimal('1.5'), 'root').result
+    assert calc.calculate(Interval(-27, -8), 3, 'root').result == Interval(-3, -2)
+
+def test_backends_reject_invalid_text():
+    for name in ("rational", "interval"):
+        with pytest.raises(ValidationError):
+            get_backend(name).parse("twelve")
+    with pytest.raises(ValueError):
+        Interval.parse("[1 2]")
+    with pytest.raises(ValueError):
+        Interval(2, 1)
+
+def test_float_backend_keeps_decimal_semantics():
+    calc = Calculator(backend="float")
+    assert calc.calculate(Decimal('0.1'), Decimal('0.2'), 'add').result == 0.1 + 0.2
+    assert calc.calculate(-7.0, 2.0, 'modulus').result == -1.0
+    assert calc.calculate(-7.0, 2.0, 'int_divide').result == -3.0
+    with pytest.raises(OperationError, match="fractional power"):
+        calc.calculate(-8.0, 0.5, 'power')
+    with pytest.raises(OperationError, match="too large"):
+        calc.calculate(10.0, 400.0, 'power')
+
+def test_backend_can_be_chosen_per_call():
+    calc = Calculator()
+    assert calc.calculate(Decimal(1), Decimal(3), 'divide', backend="rational").result == Fraction(1, 3)
+    assert isinstance(calc.calculate(Decimal(1), Decimal(3), 'divide').result, Decimal)
+    with pytest.raises(ValueError, match="Unknown numeric backend"):
+        get_backend("quaternion")
+
+def test_integer_and_float_operands_pick_their_backend():
+    assert auto_backend([1, 2, 3]) is INTEGER
+    assert auto_backend([1.5, 2.0]) is FLOAT
+    assert auto_backend([1, Decimal(2)]) is None
+    # A Fraction or Interval anywhere among the operands picks its backend
+    assert auto_backend([Decimal(1), Fraction(1, 3)]) is RATIONAL
+    assert auto_backend([Decimal(1), Interval(1, 2)]) is get_backend("interval")
+
+    calc = Calculator()
+    big = 10 ** 40
+    assert calc.calculate(big, big, 'multiply').result == 10 ** 80  # Exact, where Decimal would round
+    assert calc.calculate(7, 2, 'divide').result == Fraction(7, 2)
+    assert calc.calculate(6, 3, 'divide').result == 2
+    assert calc.calculate(2, 2, 'root').result == Decimal(2).sqrt()  # Irrational: falls back to Decimal
+
+    result = calc.calculate_many(a=[7, -7, 2], b=[2, 2, 0], operations='modulus')
+    assert [c.result for c in result.succeeded] == [1, -1]
+    assert [index for index, _ in result.errors] == [2]
+    result = calc.calculate_many(a=[-7.0, 9.0], b=[2.0, 2.0], operations='int_divide')
+    assert [c.result for c in result.succeeded] == [-3.0, 4.0]
+    assert calc.calculate(Decimal(1), Fraction(1, 3), 'add').result == Fraction(4, 3)
+    assert calc.calculate(Decimal(1), Interval(1, 2), 'add').result == Interval(2, 3)
+    result = calc.calculate_many(a=[Decimal(1), Decimal(2)], b=[Decimal(3), Fraction(1, 2)], operations='divide')
+    assert [c.result for c in result.succeeded] == [Fraction(1, 3), Fraction(4)]
+
+def test_other_backend_results_can_be_indexed_and_saved(tmp_path):
+    calc = Calculator(backend="rational")
+    history = History(verbose=False)
+    index = history.enable_index()
+    history.add_calculation(calc.calculate(1, 3, 'divide'))
+    history.add_calculation(calc.calculate(1, 4, 'divide', backend="interval"))
+    history.add_calculation(calc.calculate(0.5, 0.25, 'add', backend="float"))
+    summary = index.aggregates('divide')['divide']
+    assert (summary['count'], summary['sum']) == (2, Decimal(7) / 12)
+    assert index.top(1) == [2]
+
+    for file_format in History.FILE_FORMATS:
+        path = str(tmp_path / f"history.{file_format}")
+        history.save_history(path, file_format=file_format)
+        loaded = History(verbose=False)
+        loaded.load_history(path, file_format=file_format)
+        assert [c.result for c in loaded.calculations][:2] == [Fraction(1, 3), Interval(Decimal('0.25'))]
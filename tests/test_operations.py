@@ -1,7 +1,11 @@
 # tests/test_operations.py
+import numpy as np
 import pytest
 from decimal import Decimal
 from app.operations import (
+    Operation,
+    OperationFactory,
+    Domain,
     AddOperation,
     SubtractOperation,
     MultiplyOperation,
@@ -81,4 +85,97 @@ def test_percentage_operation():
 
 def test_absolute_difference_operation():
     op = AbsoluteDifferenceOperation()
-    assert op.execute(Decimal('5'), Decimal('15')) == Decimal('10')
\ No newline at end of file
+    assert op.execute(Decimal('5'), Decimal('15')) == Decimal('10')
+
+def test_factory_returns_shared_instances():
+    assert OperationFactory.get_operation('add') is OperationFactory.get_operation('add')
+    assert isinstance(OperationFactory.get_operation('add'), AddOperation)
+    with pytest.raises(OperationError, match="Unknown operation: nope"):
+        OperationFactory.get_operation('nope')
+
+def test_factory_spec_metadata():
+    add = OperationFactory.get_spec('add')
+    divide = OperationFactory.get_spec('divide')
+    assert add.arity == 2
+    assert add.commutative is True
+    assert add.domain is None
+    assert divide.commutative is False
+    assert isinstance(divide.domain, Domain)
+    with pytest.raises(OperationError, match="Cannot divide by zero."):
+        divide.domain.check(Decimal('1'), Decimal('0'))
+    assert divide.vectorizable is True
+    assert OperationFactory.dispatch_table()['divide'] == divide.execute
+    assert "DivideOperation" in repr(divide)
+
+def test_factory_register_decorator():
+    @OperationFactory.register("hypot")
+    class HypotOperation(Operation):
+        commutative = True
+
+        def execute(self, a, b):
+            return (a * a + b * b).sqrt()
+
+    try:
+        assert OperationFactory.get_operation('hypot').execute(Decimal('3'), Decimal('4')) == Decimal('5')
+        assert OperationFactory.get_spec('hypot').vectorizable is False
+        # Operations without a NumPy version are run row by row
+        results, invalid = OperationFactory.get_operation('hypot').execute_vectorized(
+            np.array([3.0, 5.0]), np.array([4.0, 12.0]))
+        assert results.tolist() == [5.0, 13.0]
+        assert not invalid.any()
+    finally:
+        OperationFactory.unregister('hypot')
+    assert 'hypot' not in OperationFactory.dispatch_table()
+
+    with pytest.raises(TypeError):
+        OperationFactory.register("bogus", object)
+
+def test_declared_domain_is_enforced_in_fast_mode():
+    from app.calculator import Calculator
+
+    @OperationFactory.register("ratio")
+    class RatioOperation(Operation):
+        domain = Domain((lambda a, b: b != 0, "Ratio needs a nonzero denominator."))
+        vectorizable = True
+
+        def execute(self, a, b):
+            self.domain.check(a, b)
+            return a / b
+
+        def execute_vectorized(self, a, b):
+            # Does not mask its own invalid rows: the calculator applies the domain
+            return a / b, None
+
+    try:
+        result = Calculator().calculate_many(a=[Decimal('6'), Decimal('1')], b=[Decimal('3'), Decimal('0')],
+                                             operations='ratio', fast=True)
+        assert result.calculations[0].result == Decimal('2')
+        assert [index for index, _ in result.errors] == [1]
+        assert "Ratio needs a nonzero denominator." in str(result.errors[0][1])
+    finally:
+        OperationFactory.unregister('ratio')
+
+def test_root_rejects_a_zeroth_root():
+    with pytest.raises(OperationError, match="Cannot calculate a zeroth root."):
+        RootOperation().execute(8.0, 0.0)
+
+def test_factory_loads_entry_points(monkeypatch):
+    class FakeEntryPoint:
+        name = "plugin_add"
+
+        def load(self):
+            return AddOperation
+
+    import importlib.metadata
+    requested = []
+    def fake_entry_points(group):
+        requested.append(group)
+        return [FakeEntryPoint()]
+    monkeypatch.setattr(importlib.metadata, "entry_points", fake_entry_points)
+
+    try:
+        assert OperationFactory.load_entry_points() == ["plugin_add"]
+        assert requested == [OperationFactory.ENTRY_POINT_GROUP]
+        assert OperationFactory.get_operation('plugin_add').execute(Decimal('1'), Decimal('2')) == Decimal('3')
+    finally:
+        OperationFactory.unregister('plugin_add')
@@ -0,0 +1,112 @@
+# tests/test_parallel.py
+import decimal
+from decimal import Decimal
+import pytest
+from app import numeric
+from app.calculator import Calculator
+from app.operations import Operation, OperationFactory
+from app.parallel import ParallelExecutor, _init_worker, _run_chunk
+
+class BatchObserver:
+    def __init__(self):
+        self.batches = []
+
+    def update(self, calculation):
+        self.batches.append([calculation])
+
+    def update_batch(self, calculations):
+        self.batches.append(list(calculations))
+
+@pytest.fixture
+def calculator():
+    calc = Calculator()
+    calc.start_parallel(workers=2, chunk_size=3, min_rows=0)
+    yield calc
+    calc.close()
+
+def test_parallel_results_keep_input_order(calculator):
+    rows = [(Decimal(i), Decimal(2), 'power') for i in range(20)]
+    result = calculator.calculate_many(rows)
+    assert [calc.result for calc in result.calculations] == [Decimal(i * i) for i in range(20)]
+    assert result.errors == []
+
+def test_parallel_errors_are_reported_per_row(calculator):
+    rows = [
+        (Decimal('1'), Decimal('2'), 'add'),
+        (Decimal('1'), Decimal('0'), 'divide'),
+        (Decimal('4'), Decimal('2'), 'root'),
+        (Decimal('1'), Decimal('2'), 'unknown'),
+    ]
+    result = calculator.calculate_many(rows)
+    assert result.calculations[0].result == Decimal('3')
+    assert result.calculations[2].result == Decimal('2')
+    assert [index for index, _ in result.errors] == [1, 3]
+    assert "Cannot divide by zero." in str(result.errors[0][1])
+    assert "Unknown operation: unknown" in str(result.errors[1][1])
+
+def test_parallel_uses_callers_decimal_context(calculator):
+    rows = [(Decimal('1'), Decimal('3'), 'divide')] * 4
+    with decimal.localcontext() as ctx:
+        ctx.prec = 50
+        expected = Decimal('1') / Decimal('3')
+        result = calculator.calculate_many(rows)
+    assert all(calc.result == expected for calc in result.calculations)
+    assert len(str(result.calculations[0].result)) == 52
+
+def test_parallel_batch_notifies_observers_once_in_order(calculator):
+    observer = BatchObserver()
+    calculator.attach(observer)
+    rows = [(Decimal(i), Decimal(1), 'add') for i in range(10)]
+    calculator.calculate_many(rows)
+    assert len(observer.batches) == 1
+    assert [calc.a for calc in observer.batches[0]] == [Decimal(i) for i in range(10)]
+
+def test_chunks_keep_errors_in_row_order():
+    rows = [(Decimal(i), Decimal(i % 3), 'divide') for i in range(10)]
+    with ParallelExecutor(workers=2, chunk_size=3) as executor:
+        outcomes = executor.run(rows)
+    assert [is_error for is_error, _ in outcomes] == [i % 3 == 0 for i in range(10)]
+    assert outcomes[4] == (False, Decimal(4))
+    assert outcomes[9] == (True, "Cannot divide by zero.")
+
+def test_operations_registered_at_runtime_run_in_process(calculator):
+    calculator.calculate_many([(Decimal(1), Decimal(1), 'add')] * 4)  # The workers are running now
+
+    @OperationFactory.register("triple")
+    class TripleOperation(Operation):
+        def execute(self, a, b):
+            return a * 3
+
+    try:
+        rows = [(Decimal(i), Decimal(0), 'triple' if i % 2 else 'add') for i in range(8)]
+        result = calculator.calculate_many(rows)
+    finally:
+        OperationFactory.unregister("triple")
+    assert [calc.result for calc in result.calculations] == [Decimal(i * 3 if i % 2 else i) for i in range(8)]
+    assert result.errors == []
+
+def test_worker_functions_in_process():
+    limits = (numeric.LIMITS.max_exponent, numeric.LIMITS.max_digits)
+    try:
+        _init_worker(7, 9)
+        assert (numeric.LIMITS.max_exponent, numeric.LIMITS.max_digits) == (7, 9)
+    finally:
+        numeric.configure(*limits)
+    rows = [(Decimal(1), Decimal(0), 'divide'), (Decimal(1), Decimal(0), 'missing'), (Decimal(2), Decimal(3), 'add')]
+    assert _run_chunk(decimal.getcontext().copy(), rows) == [
+        (True, "Cannot divide by zero."), (None, None), (False, Decimal(5))]
+
+def test_small_batches_stay_in_process():
+    calc = Calculator()
+    executor = calc.start_parallel(workers=2, min_rows=100)
+    calc.calculate_many([(Decimal('1'), Decimal('1'), 'add')])
+    assert executor._pool is None
+    calc.close()
+
+def test_executor_validates_settings():
+    with pytest.raises(ValueError):
+        ParallelExecutor(workers=0)
+    with pytest.raises(ValueError):
+        ParallelExecutor(chunk_size=0)
+    with ParallelExecutor(workers=1) as executor:
+        assert executor.run([]) == []
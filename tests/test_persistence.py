@@ -1,4 +1,5 @@
 # tests/test_persistence.py
+import sys
 import pandas as pd
 from decimal import Decimal
 from app.history import History
@@ -53,4 +54,144 @@ def test_autosave_observer(tmp_path):
     assert file_path.exists()
     df = pd.read_csv(file_path)
     assert len(df) == 1
-    assert df.iloc[0]['result'] == 150
\ No newline at end of file
+    assert df.iloc[0]['result'] == 150
+
+def test_autosave_append_mode_appends_new_rows(tmp_path):
+    file_path = tmp_path / "autosave_history.csv"
+    history = History()
+    saver = AutoSaveObserver(history, str(file_path), mode="append")
+
+    history.add_calculation(calc1)
+    saver.update(calc1)
+    history.add_calculation(calc2)
+    saver.update(calc2)
+    saver.close()
+
+    df = pd.read_csv(file_path)
+    assert list(df.columns) == ['operation', 'operand_a', 'operand_b', 'result']
+    assert list(df['result']) == [150, 100]
+    assert b'\r' not in file_path.read_bytes()  # Appended rows end lines like the header
+
+def test_autosave_append_mode_compacts_after_undo(tmp_path):
+    file_path = tmp_path / "autosave_history.csv"
+    history = History()
+    saver = AutoSaveObserver(history, str(file_path), mode="append")
+    history.add_calculation(calc1)
+    history.add_calculation(calc2)
+    saver.update(calc2)
+
+    history.undo()
+    history.add_calculation(calc2)
+    history.add_calculation(calc1)
+    saver.update(calc1)
+    saver.close()
+
+    df = pd.read_csv(file_path)
+    assert list(df['operation']) == ['add', 'multiply', 'add']
+
+def test_autosave_append_mode_flush_policy(tmp_path):
+    file_path = tmp_path / "autosave_history.csv"
+    history = History()
+    saver = AutoSaveObserver(history, str(file_path), mode="append", flush_every=0, fsync=True)
+    history.add_calculation(calc1)
+    saver.update(calc1)  # First update writes the full file
+    history.add_calculation(calc2)
+    saver.update(calc2)  # Buffered, not yet flushed
+
+    history.undo()
+    saver.flush()  # Flushing after an undo compacts the file
+    assert len(pd.read_csv(file_path)) == 1
+    saver.close()
+
+def test_autosave_rejects_unknown_mode(tmp_path):
+    import pytest
+    with pytest.raises(ValueError):
+        AutoSaveObserver(History(), str(tmp_path / "h.csv"), mode="sometimes")
+
+def test_autosave_update_batch_saves_once(tmp_path):
+    file_path = tmp_path / "autosave_history.csv"
+    history = History()
+    history.add_calculations([calc1, calc2])
+    saver = AutoSaveObserver(history, str(file_path))
+    saver.update_batch([calc1, calc2])
+    assert len(pd.read_csv(file_path)) == 2
+
+def test_load_keeps_full_decimal_precision(tmp_path):
+    file_path = tmp_path / "history.csv"
+    precise = Calculation(Decimal('0.1000000000000000055511151231257827'), Decimal('3'),
+                          'multiply', Decimal('0.3000000000000000166533453693773481'))
+    history = History()
+    history.add_calculation(precise)
+    history.save_history(str(file_path))
+
+    loaded = History()
+    loaded.load_history(str(file_path))
+    assert str(loaded.calculations[0].a) == '0.1000000000000000055511151231257827'
+    assert loaded.calculations[0] == precise
+
+def test_streaming_save_and_load_report_progress(tmp_path):
+    from app.history_io import iter_csv_chunks, write_csv
+    file_path = tmp_path / "history.csv"
+    calcs = [Calculation(Decimal(i), Decimal('1'), 'add', Decimal(i + 1)) for i in range(25)]
+
+    written = []
+    assert write_csv(str(file_path), calcs, chunk_size=10, progress=written.append) == 25
+    assert written == [10, 20, 25]
+    assert b'\r' not in file_path.read_bytes()
+
+    read = []
+    chunks = list(iter_csv_chunks(str(file_path), chunk_size=10, progress=read.append))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert read == [10, 20, 25]
+    assert chunks[2][-1] == calcs[-1]
+
+def test_load_accepts_autosave_column_order(tmp_path):
+    file_path = tmp_path / "autosave.csv"
+    history = History()
+    history.add_calculation(calc1)
+    AutoSaveObserver(history, str(file_path)).update(calc1)
+
+    loaded = History()
+    loaded.load_history(str(file_path))
+    assert loaded.calculations == [calc1]
+
+def test_failed_load_keeps_current_history(tmp_path, capsys):
+    file_path = tmp_path / "broken.csv"
+    file_path.write_text("operand_a,operand_b,operation,result\n1,2,add,3\n1,oops,add,3\n")
+    history = History()
+    history.add_calculation(calc1)
+    history.load_history(str(file_path))
+    assert history.calculations == [calc1]
+    assert "Invalid number" in capsys.readouterr().out
+
+    file_path.write_text("a,b\n1,2\n")
+    history.load_history(str(file_path))
+    assert history.calculations == [calc1]
+
+    file_path.write_text("")
+    history.load_history(str(file_path))
+    assert len(history.calculations) == 0
+
+def test_autosave_rewrite_mode_flush_catches_up(tmp_path):
+    file_path = tmp_path / "autosave_history.csv"
+    history = History()
+    saver = AutoSaveObserver(history, str(file_path))
+    saver.update(calc1)  # Notified before the calculation reaches the history
+    history.add_calculation(calc1)
+    assert len(pd.read_csv(file_path)) == 0
+
+    saver.close()
+    assert len(pd.read_csv(file_path)) == 1
+
+def test_autosave_csv_without_pandas_matches_pandas_output(tmp_path, monkeypatch):
+    history = History()
+    history.add_calculation(calc1)
+    history.add_calculation(Calculation(Decimal('1'), Decimal('3'), 'divide', Decimal('1') / Decimal('3')))
+    with_pandas = tmp_path / "pandas.csv"
+    AutoSaveObserver(history, str(with_pandas), verbose=False).update(calc1)
+
+    # A None entry in sys.modules makes `import pandas` raise ImportError
+    monkeypatch.setitem(sys.modules, "pandas", None)
+    without_pandas = tmp_path / "fallback.csv"
+    AutoSaveObserver(history, str(without_pandas), verbose=False).update(calc1)
+    assert without_pandas.read_text() == with_pandas.read_text()
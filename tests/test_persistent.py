@@ -0,0 +1,52 @@
+# tests/test_persistent.py
+import random
+import pytest
+from app.persistent import PersistentVector
+
+def test_behaves_like_an_immutable_list():
+    generator = random.Random(7)
+    expected, vector = [], PersistentVector()
+    versions = []
+    for step in range(3000):
+        choice = generator.random()
+        if choice < 0.5 or not expected:
+            expected.append(step)
+            vector = vector.append(step)
+        elif choice < 0.7:
+            items = list(range(step, step + generator.randrange(100)))
+            expected += items
+            vector = vector.extend(items)
+        elif choice < 0.85:
+            index = generator.randrange(len(expected))
+            expected[index] = -step
+            vector = vector.set(index, -step)
+        else:
+            length = generator.randrange(len(expected) + 1)
+            del expected[length:]
+            vector = vector.truncate(length)
+        versions.append((list(expected), vector))
+    # Every earlier version is left as it was
+    for items, version in versions[::50]:
+        assert version == items and len(version) == len(items)
+        assert list(version[len(items) // 3:]) == items[len(items) // 3:]
+        if items:
+            assert version[-1] == items[-1]
+    with pytest.raises(IndexError):
+        PersistentVector([1, 2])[2]
+
+def test_new_versions_share_unchanged_chunks():
+    vector = PersistentVector(range(100_000))
+    leaves = 100_000 // 32 - 1  # The last full chunk is still the tail
+    assert vector.append(1).shared_nodes(vector) == leaves
+    assert vector.set(5, -1).shared_nodes(vector) == leaves - 1
+    assert vector.truncate(50_000).extend(range(10)).shared_nodes(vector) == 50_000 // 32
+    assert PersistentVector(vector) is vector
+
+@pytest.mark.parametrize("length", [0, 20, 32, 1000, 40_000])
+def test_rebuilt_from_chunks(length):
+    vector = PersistentVector(range(length))
+    leaves, tail = vector.chunks()
+    rebuilt = PersistentVector.from_chunks(leaves, tail)
+    assert rebuilt == list(range(length)) and len(rebuilt) == length
+    assert rebuilt.shared_nodes(vector) == len(leaves)
+    assert rebuilt.append(-1)[-1] == -1
@@ -0,0 +1,107 @@
+# tests/test_pipeline.py
+import io
+import json
+import os
+import subprocess
+import sys
+from decimal import Decimal
+import pytest
+from app.calculator import Calculator
+from app.history import History
+from app.pipeline import read_commands, parse_commands, calculate_chunks, ResultWriter, run_batch
+
+SCRIPT = """# a comment
+add 2 3
+
+divide 1 0
+eval (3 + 4) ^ 2
+multiply 2 x
+bogus 1 2
+subtract 10 4
+"""
+
+class BatchObserver:
+    def __init__(self):
+        self.batches = []
+        self.updates = 0
+
+    def update(self, calculation):
+        self.updates += 1
+
+    def update_batch(self, calculations):
+        self.batches.append(list(calculations))
+
+def test_read_commands_skips_blank_lines_and_comments():
+    lines = list(read_commands(io.StringIO(SCRIPT)))
+    assert lines[0] == (2, "add 2 3")
+    assert [number for number, _ in lines] == [2, 4, 5, 6, 7, 8]
+
+def test_parse_commands_classifies_rows():
+    jobs = list(parse_commands([(1, "ADD 2 3"), (2, "eval 1 + 1"), (3, "add 1"), (4, "add 1 x")]))
+    assert jobs[0] == (1, "calc", (Decimal('2'), Decimal('3'), 'add'))
+    assert jobs[1] == (2, "eval", "1 + 1")
+    assert jobs[2][1] == "error"
+    assert jobs[3][1] == "error"
+
+def test_run_batch_keeps_input_order_and_counts_errors():
+    calculator, history = Calculator(), History()
+    output = io.StringIO()
+    summary = run_batch(calculator, history, io.StringIO(SCRIPT), output)
+    lines = output.getvalue().splitlines()
+    assert lines[0] == "Result: 5"
+    assert lines[1].startswith("Error (line 4): ") and "divide by zero" in lines[1]
+    assert lines[2] == "Result: 49"
+    assert lines[3].startswith("Error (line 6)")
+    assert "Unknown operation: bogus" in lines[4]
+    assert lines[5] == "Result: 6"
+    assert (summary.rows, summary.errors) == (6, 3)
+    assert [calc.result for calc in history.calculations] == [Decimal('5'), Decimal('49'), Decimal('6')]
+
+def test_observers_are_notified_once_per_chunk():
+    calculator, history = Calculator(), History()
+    observer = BatchObserver()
+    calculator.attach(observer)
+    script = io.StringIO("".join(f"add {i} 1\n" for i in range(5)))
+    run_batch(calculator, history, script, io.StringIO(), chunk_size=2)
+    assert [len(batch) for batch in observer.batches] == [2, 2, 1]
+    assert observer.updates == 0
+    # Each chunk is one undoable step
+    history.undo()
+    assert len(history.calculations) == 4
+
+def test_calculate_chunks_is_lazy():
+    calculator = Calculator()
+    jobs = parse_commands(read_commands(io.StringIO("add 1 1\n" * 10)))
+    results = calculate_chunks(calculator, None, jobs, chunk_size=3)
+    assert next(results)[1].result == Decimal('2')
+
+@pytest.mark.parametrize("output_format", ["csv", "jsonl"])
+def test_structured_output_formats(output_format):
+    output = io.StringIO()
+    run_batch(Calculator(), History(), io.StringIO("add 2 3\ndivide 1 0\n"), output, output_format)
+    lines = output.getvalue().splitlines()
+    if output_format == "csv":
+        assert lines[0] == "line,operation,operand_a,operand_b,result,error"
+        assert lines[1] == "1,add,2,3,5,"
+        assert lines[2].startswith("2,,,,,")
+    else:
+        first, second = (json.loads(line) for line in lines)
+        assert first == {"line": 1, "error": None, "operation": "add", "a": "2", "b": "3", "result": "5"}
+        assert second["line"] == 2 and "divide by zero" in second["error"]
+
+def test_writer_rejects_unknown_format():
+    with pytest.raises(ValueError, match="Unknown output format"):
+        ResultWriter(io.StringIO(), "xml")
+
+def test_main_batch_mode_reads_stdin(tmp_path):
+    env = {"CALCULATOR_HISTORY_FILE": str(tmp_path / "history.csv"),
+           "CALCULATOR_LOG_FILE": str(tmp_path / "calculator.log")}
+    completed = subprocess.run(
+        [sys.executable, "main.py", "--batch", "-", "--format", "jsonl"],
+        input="add 2 3\nmultiply 4 5\n", capture_output=True, text=True,
+        env={**os.environ, **env}, cwd=os.path.dirname(os.path.dirname(__file__)), check=True,
+    )
+    results = [json.loads(line)["result"] for line in completed.stdout.splitlines()]
+    assert results == ["5", "20"]
+    assert "Processed 2 rows (0 errors)" in completed.stderr
+    assert (tmp_path / "history.csv").exists()
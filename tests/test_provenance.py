@@ -0,0 +1,143 @@
+# tests/test_provenance.py
+from decimal import Decimal
+import pytest
+from app.calculator import Calculator
+from app.exceptions import OperationError, ValidationError
+from app.history import History
+from app.provenance import ProvenanceGraph, Ref
+
+class Session:
+    """Enters calculations the way the REPL does: operands may be references."""
+    def __init__(self, **history_options):
+        self.calculator = Calculator()
+        self.history = History(verbose=False, **history_options)
+        self.graph = ProvenanceGraph(self.history, self.calculator)
+        self.calculated = []
+        self.calculator.attach(self)
+
+    def update(self, calculation):
+        self.calculated.append(calculation)
+
+    def run(self, operation, a, b):
+        (va, ra), (vb, rb) = self.graph.parse_operand(a, Decimal), self.graph.parse_operand(b, Decimal)
+        calculation = self.calculator.calculate(va, vb, operation)
+        self.history.add_calculation(calculation)
+        refs = {slot: ref for slot, ref in (("a", ra), ("b", rb)) if ref is not None}
+        self.graph.record(len(self.history.calculations) - 1, calculation, refs)
+
+    def eval(self, source, names):
+        variables, refs = self.graph.variables(names)
+        calculation = self.calculator.evaluate(source, variables)
+        self.history.add_calculation(calculation)
+        self.graph.record(len(self.history.calculations) - 1, calculation, refs, kind="expression")
+
+    def results(self):
+        return [c.result for c in self.history.calculations]
+
+def _chain(**history_options):
+    session = Session(**history_options)
+    session.graph.let("rate", Decimal(2))
+    session.run("add", "rate", "3")       # $1 = 5
+    session.run("multiply", "ans", "10")  # $2 = $1 * 10
+    session.run("add", "7", "1")          # $3 reads nothing
+    session.run("subtract", "$2", "rate") # $4 = $2 - rate
+    return session
+
+def test_editing_a_cell_recomputes_only_its_dependents():
+    session = _chain()
+    assert session.results() == [5, 50, 8, 48]
+    session.calculated.clear()
+    assert session.graph.let("rate", Decimal(5)) == 3
+    assert session.results() == [8, 80, 8, 75]
+    assert session.calculated == []  # Recomputation does not notify observers
+    # An unchanged input stops the propagation
+    assert session.graph.edit(0, Decimal(4), Decimal(4), {}) == 1
+    assert session.results() == [8, 80, 8, 75]
+
+def test_recomputation_is_one_undoable_step():
+    session = _chain()
+    session.graph.let("rate", Decimal(5))
+    assert session.history.undo()
+    assert session.results() == [5, 50, 8, 48]
+    assert session.graph.cells == {"rate": Decimal(2)}
+    assert session.history.redo()
+    assert session.results() == [8, 80, 8, 75]
+    assert session.graph.cells == {"rate": Decimal(5)}
+    # Dependencies still hold after undo and redo
+    session.history.undo()
+    session.graph.let("rate", Decimal(0))
+    assert session.results() == [3, 30, 8, 30]
+
+def test_sources_of_undone_entries_are_not_reused():
+    session = _chain()
+    session.history.undo()
+    session.run("subtract", "50", "2")  # Same values as the undone entry, but no references
+    session.graph.let("rate", Decimal(1))
+    assert session.results() == [4, 40, 8, 48]
+
+def test_edit_replaces_operands_and_rejects_cycles():
+    session = _chain()
+    session.graph.edit(2, Decimal(1), session.graph.value(Ref("entry", 3)), {"b": Ref("entry", 3)})
+    assert session.results() == [5, 50, 49, 48]
+    session.graph.let("rate", Decimal(3))
+    assert session.results() == [6, 60, 58, 57]
+    with pytest.raises(ValidationError, match="cannot depend on itself"):
+        session.graph.edit(0, Decimal(1), Decimal(1), {"a": Ref("entry", 3)})
+    with pytest.raises(ValidationError, match="cannot depend on itself"):
+        session.graph.let("rate", Ref("entry", 0))
+    with pytest.raises(ValidationError, match="no history entry"):
+        session.graph.parse_operand("$9", Decimal)
+
+def test_failed_recomputation_changes_nothing():
+    session = _chain()
+    session.run("divide", "1", "rate")
+    with pytest.raises(OperationError, match=r"Recomputing \$5 failed"):
+        session.graph.let("rate", Decimal(0))
+    assert session.results()[:4] == [5, 50, 8, 48]
+    assert session.graph.cells == {"rate": Decimal(2)}
+
+def test_expressions_are_recomputed():
+    session = _chain()
+    session.eval("ans * rate", ["ans", "rate"])
+    assert session.results()[-1] == 96
+    session.graph.let("rate", Decimal(1))
+    assert session.results() == [4, 40, 8, 39, 39]
+
+def test_graph_round_trips_next_to_the_history(tmp_path):
+    session = _chain(backend="columnar")
+    session.graph.let("base", Ref("entry", 2))
+    session.run("add", "base", "base")
+    session.history.save_history(str(tmp_path / "history.csv"))
+    session.graph.save(str(tmp_path / "history.graph.json"))
+
+    loaded = Session()
+    loaded.history.load_history(str(tmp_path / "history.csv"))
+    loaded.graph.load(str(tmp_path / "history.graph.json"))
+    assert loaded.graph.edit(2, Decimal(1), Decimal(1), {}) == 2
+    assert loaded.results() == [5, 50, 2, 48, 4]
+    loaded.graph.let("rate", Decimal(0))
+    assert loaded.results() == [3, 30, 2, 30, 4]
+
+def test_recomputes_entries_spilled_to_disk(tmp_path):
+    session = Session(max_in_memory=4, spill_dir=str(tmp_path))
+    session.graph.let("x", Decimal(1))
+    for _ in range(12):
+        session.run("add", "x", "1")
+    assert session.graph.let("x", Decimal(2)) == 12
+    assert session.results() == [3] * 12
+    session.history.undo()
+    assert session.results() == [2] * 12
+
+def test_recomputation_only_visits_dependents(monkeypatch):
+    session = _chain()
+    for _ in range(50):
+        session.run("add", "$3", "1")  # Reads $3, not the cell
+    visited = []
+    node = session.graph.node
+
+    def tracking(position):
+        visited.append(position)
+        return node(position)
+    monkeypatch.setattr(session.graph, "node", tracking)
+    assert session.graph.let("rate", Decimal(3)) == 3
+    assert set(visited) == {0, 1, 3}
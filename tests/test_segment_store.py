@@ -0,0 +1,83 @@
+# tests/test_segment_store.py
+import copy
+import os
+from decimal import Decimal
+import pytest
+from app.calculation import Calculation
+from app.history import History
+from app.history_store import ColumnarHistoryStore
+from app.segment_store import SegmentedHistoryStore
+
+def _calc(i):
+    return Calculation(Decimal(i), Decimal('0.5'), 'add', Decimal(i) + Decimal('0.5'))
+
+@pytest.mark.parametrize("chunk_factory", [list, ColumnarHistoryStore])
+def test_spills_old_entries_and_reads_them_back(tmp_path, chunk_factory):
+    store = SegmentedHistoryStore(max_in_memory=20, segment_rows=8, spill_dir=str(tmp_path),
+                                  chunk_factory=chunk_factory)
+    calcs = [_calc(i) for i in range(100)]
+    store.extend(calcs)
+    stats = store.stats()
+    assert stats["in_memory"] <= 20 + 8
+    assert stats["spilled"] == 100 - stats["in_memory"] and stats["disk_bytes"] > 0
+    assert store == calcs
+    assert store[3] == calcs[3] and store[-1] == calcs[-1]
+    assert store[5:30] == calcs[5:30]
+    with pytest.raises(IndexError):
+        store[100]
+
+    # Truncating into a spilled segment pages it back in
+    del store[10:]
+    assert store == calcs[:10]
+    assert store.stats()["page_ins"] == 1
+    store.append(calcs[10])
+    assert store[-1] == calcs[10]
+    store.close()
+    assert os.listdir(tmp_path) == []
+
+def test_byte_limit_and_replacing_everything(tmp_path):
+    store = SegmentedHistoryStore(max_bytes=4096, segment_rows=10, spill_dir=str(tmp_path))
+    store.extend(_calc(i) for i in range(200))
+    assert store.nbytes() > 0
+    assert store.stats()["spills"] > 0 and store.stats()["in_memory"] < 50
+    store[:] = [_calc(7), _calc(8)]
+    assert store == [_calc(7), _calc(8)]
+    assert store.stats()["segments"] == 0
+    store.insert(0, _calc(6))
+    del store[1]
+    assert store == [_calc(6), _calc(8)]
+    assert copy.deepcopy(store) == [_calc(6), _calc(8)]
+    store.close()
+
+def test_history_with_retention_limits(tmp_path):
+    history = History(verbose=False, max_in_memory=16, max_undo_depth=5, spill_dir=str(tmp_path / "spill"))
+    for i in range(100):
+        history.add_calculation(_calc(i))
+    assert isinstance(history.calculations, SegmentedHistoryStore)
+    assert history.evicted_steps == 95
+    for _ in range(5):
+        assert history.undo()
+    assert not history.undo()  # Older steps were forgotten
+    assert list(history.calculations) == [_calc(i) for i in range(95)]
+    assert history.redo()
+
+    gauges = {name: value for name, _, value in history.metrics()}
+    assert gauges["history_undo_evictions"] == 95
+    assert gauges["history_spilled_entries"] > 0
+
+    path = str(tmp_path / "history.csv")
+    history.save_history(path)
+    loaded = History(verbose=False, max_in_memory=16)
+    loaded.load_history(path)
+    assert loaded.calculations == history.calculations
+    assert loaded.calculations.stats()["in_memory"] <= 16 + 8
+
+def test_deep_undo_of_a_batch_pages_in(tmp_path):
+    history = History(verbose=False, max_in_memory=10, spill_dir=str(tmp_path))
+    history.add_calculation(_calc(-1))
+    history.add_calculations([_calc(i) for i in range(50)])
+    assert history.calculations.stats()["spilled"] > 0
+    history.undo()
+    assert list(history.calculations) == [_calc(-1)]
+    history.redo()
+    assert history.calculations[49] == _calc(48)
@@ -0,0 +1,210 @@
+# tests/test_server.py
+import asyncio
+import json
+import threading
+import pytest
+from app.calculator import Calculator
+from app.server import CalculationServer
+
+class MockObserver:
+    def __init__(self):
+        self.calculations = []
+
+    def update(self, calculation):
+        self.calculations.append(calculation)
+
+async def _exchange(server, *batches):
+    """Connects to a running server, sends each batch of requests in one write, and returns all responses."""
+    host, port = server.address[:2]
+    reader, writer = await asyncio.open_connection(host, port)
+    responses = []
+    for requests in batches:
+        writer.write("".join(json.dumps(request) + "\n" for request in requests).encode())
+        await writer.drain()
+        for _ in requests:
+            responses.append(json.loads(await reader.readline()))
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+def _run(server, coroutine_factory):
+    async def scenario():
+        await server.start()
+        try:
+            return await coroutine_factory()
+        finally:
+            await server.close()
+    return asyncio.run(scenario())
+
+def test_pipelined_requests_are_answered_in_order():
+    server = CalculationServer(Calculator())
+    requests = [
+        {"id": 1, "method": "calculate", "params": {"operation": "add", "a": "2", "b": "3"}},
+        {"id": 2, "method": "calculate", "params": {"operation": "divide", "a": 1, "b": 0}},
+        {"id": 3, "method": "eval", "params": {"expression": "x ^ 2", "variables": {"x": "7"}}},
+        {"id": 4, "method": "history"},
+    ]
+    responses = _run(server, lambda: _exchange(server, requests))
+    assert [response["id"] for response in responses] == [1, 2, 3, 4]
+    assert responses[0]["result"]["result"] == "5"
+    assert "Cannot divide by zero." in responses[1]["error"]
+    assert responses[2]["result"]["result"] == "49"
+    assert [row["result"] for row in responses[3]["result"]] == ["5", "49"]
+
+def test_batch_and_undo_redo():
+    server = CalculationServer(Calculator())
+    requests = [
+        {"id": "b", "method": "batch", "params": {"rows": [["add", "1", "1"], ["root", "-4", "2"],
+                                                          {"operation": "multiply", "a": "3", "b": "4"}]}},
+        {"id": "u", "method": "undo"},
+        {"id": "u2", "method": "undo"},
+        {"id": "r", "method": "redo"},
+    ]
+    responses = _run(server, lambda: _exchange(server, requests))
+    batch = responses[0]["result"]
+    assert batch[0]["result"] == "2" and "error" in batch[1] and batch[2]["result"] == "12"
+    assert responses[1]["result"] == {"changed": True, "size": 0}
+    assert responses[2]["result"] == {"changed": False, "size": 0}
+    assert responses[3]["result"] == {"changed": True, "size": 2}
+
+@pytest.mark.parametrize("sessions, expected", [("shared", 2), ("isolated", 1)])
+def test_session_modes(sessions, expected):
+    server = CalculationServer(Calculator(), sessions=sessions)
+    request = {"id": 1, "method": "calculate", "params": {"operation": "add", "a": "1", "b": "1"}}
+
+    async def two_clients():
+        await _exchange(server, [request])
+        return await _exchange(server, [request, {"id": 2, "method": "history"}])
+    responses = _run(server, two_clients)
+    assert len(responses[1]["result"]) == expected
+
+def test_observers_are_shared_by_every_session():
+    calculator = Calculator()
+    observer = MockObserver()
+    calculator.attach(observer)
+    server = CalculationServer(calculator, sessions="isolated")
+    request = {"id": 1, "method": "calculate", "params": {"operation": "add", "a": "1", "b": "1"}}
+
+    async def two_clients():
+        await _exchange(server, [request])
+        await _exchange(server, [request])
+    _run(server, two_clients)
+    assert len(observer.calculations) == 2
+
+def test_health_metrics_and_bad_requests():
+    server = CalculationServer(Calculator())
+    responses = _run(server, lambda: _exchange(server, [
+        {"id": 1, "method": "health"},
+        {"id": 2, "method": "nope"},
+        {"id": 3, "method": "calculate", "params": {"operation": "add", "a": "x", "b": "1"}},
+        {"id": 4, "method": "calculate", "params": {"operation": "add"}},
+        {"id": 5, "method": "metrics"},
+    ]))
+    assert responses[0]["result"]["status"] == "ok"
+    assert responses[1]["error"] == "Unknown method: nope"
+    assert "Invalid number" in responses[2]["error"]
+    assert "Missing parameter" in responses[3]["error"]
+    metrics = responses[4]["result"]
+    assert metrics["requests"] == 5
+    assert metrics["errors"] == 3
+    assert metrics["methods"]["calculate"] == 2
+
+def test_batches_do_not_block_other_connections():
+    from app.operations import Operation, OperationFactory
+    release = threading.Event()
+
+    @OperationFactory.register("wait")
+    class WaitOperation(Operation):
+        def execute(self, a, b):
+            release.wait(5)
+            return a
+
+    server = CalculationServer(Calculator())
+    batch = {"id": 1, "method": "batch", "params": {"rows": [["wait", "1", "0"]]}}
+
+    async def two_clients():
+        slow = asyncio.create_task(_exchange(server, [batch]))
+        # The other connection is answered while the batch is still running
+        health = await asyncio.wait_for(_exchange(server, [{"id": 2, "method": "health"}]), 2)
+        assert not slow.done()
+        release.set()
+        return health + await slow
+    try:
+        responses = _run(server, two_clients)
+    finally:
+        release.set()
+        OperationFactory.unregister("wait")
+    assert responses[0]["result"]["status"] == "ok"
+    assert responses[1]["result"][0]["result"] == "1"
+
+def test_calculations_with_slow_observers_do_not_block_other_connections():
+    release = threading.Event()
+
+    class SlowObserver:
+        def update(self, calculation):
+            release.wait(5)
+
+    calculator = Calculator()
+    calculator.attach(SlowObserver())
+    server = CalculationServer(calculator)
+    calculate = {"id": 1, "method": "calculate", "params": {"operation": "add", "a": "1", "b": "2"}}
+
+    async def two_clients():
+        slow = asyncio.create_task(_exchange(server, [calculate]))
+        health = await asyncio.wait_for(_exchange(server, [{"id": 2, "method": "health"}]), 2)
+        assert not slow.done()
+        release.set()
+        return health + await slow
+    try:
+        responses = _run(server, two_clients)
+    finally:
+        release.set()
+    assert responses[0]["result"]["status"] == "ok"
+    assert responses[1]["result"]["result"] == "3"
+
+def test_unexpected_errors_become_error_responses(caplog):
+    from app.operations import Operation, OperationFactory
+
+    @OperationFactory.register("broken")
+    class BrokenOperation(Operation):
+        def execute(self, a, b):
+            raise RuntimeError("bug")
+
+    server = CalculationServer(Calculator())
+    session = server.new_session()
+    try:
+        response = server.handle_request(session, {"id": 7, "method": "calculate",
+                                                   "params": {"operation": "broken", "a": "1", "b": "2"}})
+    finally:
+        OperationFactory.unregister("broken")
+    assert response == {"id": 7, "error": "Internal error: RuntimeError"}
+    assert server.errors == 1 and server.requests == 1
+    assert "Request 'calculate' failed" in caplog.text
+
+def test_handle_line_rejects_invalid_json():
+    server = CalculationServer(Calculator())
+    session = server.new_session()
+    assert server.handle_line(session, b"{not json")["error"] == "Invalid JSON."
+    assert server.handle_line(session, b"[1, 2]")["error"] == "A request must be a JSON object."
+    assert server.handle_request(session, {"id": 9, "method": ["x"]})["error"].startswith("Unknown method")
+
+def test_unix_socket(tmp_path):
+    server = CalculationServer(Calculator())
+    path = str(tmp_path / "calc.sock")
+
+    async def scenario():
+        await server.start_unix(path)
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(b'{"id": 1, "method": "calculate", "params": {"operation": "power", "a": "2", "b": "10"}}\n')
+            response = json.loads(await reader.readline())
+            writer.close()
+            await writer.wait_closed()
+            return response
+        finally:
+            await server.close()
+    assert asyncio.run(scenario())["result"]["result"] == "1024"
+
+def test_unknown_session_mode():
+    with pytest.raises(ValueError, match="Unknown session mode"):
+        CalculationServer(Calculator(), sessions="pooled")
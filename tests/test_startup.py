@@ -0,0 +1,35 @@
+# tests/test_startup.py
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Cold-start budget for importing the CLI, in milliseconds
+STARTUP_BUDGET_MS = int(os.environ.get("CALCULATOR_STARTUP_BUDGET_MS", "300"))
+# Dependencies that must only load once a code path actually needs them
+HEAVY_MODULES = ("pandas", "numpy", "dotenv", "asyncio", "concurrent.futures")
+
+def _import_times(statement: str) -> dict:
+    """Runs `statement` under -X importtime and returns {module: cumulative microseconds}."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+def test_cli_import_does_not_load_heavy_dependencies():
+    times = _import_times("import main")
+    loaded = [name for name in times if name.split(".")[0] in HEAVY_MODULES or name in HEAVY_MODULES]
+    assert loaded == []
+
+def test_cli_import_fits_the_startup_budget():
+    # Take the best of a few runs to keep the check stable on a busy machine
+    best = min(_import_times("import main")["main"] for _ in range(3))
+    assert best / 1000 < STARTUP_BUDGET_MS
@@ -0,0 +1,237 @@
+# tests/test_storage.py
+import sqlite3
+from decimal import Decimal
+import pytest
+from app.calculation import Calculation
+from app.history import History
+from app.saver import AutoSaveObserver
+from app.storage import SQLiteHistoryWriter, get_backend
+
+def _calc(i, result=None):
+    return Calculation(Decimal(i), Decimal('0.1'), 'add', Decimal(result if result is not None else i))
+
+def _state(history):
+    """The calculations plus what undo and redo would produce, for comparing sessions."""
+    steps, applied = history.timeline()
+    return list(history.calculations), len(steps), applied
+
+def test_sqlite_round_trip_keeps_undo_and_redo(tmp_path):
+    path = str(tmp_path / "history.db")
+    history = History(verbose=False)
+    history.add_calculation(_calc(1))
+    history.add_calculations([_calc(2), _calc(3)])
+    history.add_calculation(_calc(4, '1.2345678901234567890123456789E+999'))
+    history.undo()
+
+    progress = []
+    history.save_history(path, file_format="sqlite")
+    loaded = History(backend="columnar", verbose=False)
+    loaded.load_history(path, progress=progress.append, file_format="sqlite")
+    assert _state(loaded) == _state(history)
+    assert progress == [4]
+
+    assert loaded.redo()
+    assert loaded.calculations[-1].result == Decimal('1.2345678901234567890123456789E+999')
+    loaded.undo()
+    loaded.undo()
+    assert list(loaded.calculations) == [_calc(1)]
+
+def test_sqlite_keeps_memento_restores(tmp_path):
+    path = str(tmp_path / "history.db")
+    history = History(verbose=False)
+    history.add_calculations([_calc(1), _calc(2)])
+    snapshot = history.create_memento()
+    history.add_calculation(_calc(3))
+    history.restore_from_memento(snapshot)
+    history.add_calculation(_calc(4))
+    history.save_history(path, file_format="sqlite")
+
+    loaded = History(verbose=False)
+    loaded.load_history(path, file_format="sqlite")
+    assert loaded.calculations == [_calc(1), _calc(2), _calc(4)]
+    loaded.undo()
+    loaded.undo()
+    assert loaded.calculations == [_calc(1), _calc(2), _calc(3)]
+
+def test_sqlite_uses_wal_and_text_decimals(tmp_path):
+    path = str(tmp_path / "history.db")
+    history = History(verbose=False)
+    history.add_calculation(_calc(1, '0.30000000000000000000000000001'))
+    history.save_history(path, file_format="sqlite")
+    connection = sqlite3.connect(path)
+    assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    assert connection.execute("SELECT result FROM calculations").fetchone() == ("0.30000000000000000000000000001",)
+    connection.close()
+
+def test_writer_resumes_after_a_crash(tmp_path):
+    path = str(tmp_path / "session.db")
+    history = History(verbose=False)
+    writer = SQLiteHistoryWriter(path, history)
+    for i in range(5):
+        history.add_calculation(_calc(i))
+        writer.sync()
+    history.undo()
+    history.undo()
+    writer.sync()
+    history.add_calculation(_calc(9))  # Discards the two undone steps
+    writer.sync()
+    history.undo()
+    writer.sync()
+    # No close(): every sync was committed, as after a crash
+
+    resumed = History(verbose=False)
+    resumed.load_history(path, file_format="sqlite")
+    assert _state(resumed) == _state(history)
+    assert resumed.redo()
+    assert resumed.calculations[-1] == _calc(9)
+    writer.close()
+
+def test_writer_merges_forgotten_steps_into_the_baseline(tmp_path):
+    path = str(tmp_path / "bounded.db")
+    history = History(verbose=False, max_undo_depth=3)
+    writer = SQLiteHistoryWriter(path, history)
+    for i in range(20):
+        history.add_calculation(_calc(i))
+        writer.sync()
+    history.undo()
+    writer.sync()
+    writer.close()
+
+    connection = sqlite3.connect(path)
+    assert connection.execute("SELECT COUNT(*) FROM steps").fetchone() == (4,)  # Baseline plus 3 steps
+    connection.close()
+    resumed = History(verbose=False)
+    resumed.load_history(path, file_format="sqlite")
+    assert _state(resumed) == _state(history)
+    assert resumed.undo() and resumed.undo() and not resumed.undo()
+    assert resumed.calculations == [_calc(i) for i in range(17)]
+
+def test_sqlite_keeps_in_place_updates(tmp_path):
+    path = str(tmp_path / "updates.db")
+    history = History(verbose=False, max_undo_depth=2)
+    writer = SQLiteHistoryWriter(path, history)
+    for i in range(4):
+        history.add_calculation(_calc(i))
+        writer.sync()
+    history.replace_calculations({1: _calc(1, 10), 3: _calc(3, 30)})
+    writer.sync()
+    history.replace_calculations({2: _calc(2, 20)})
+    history.undo()
+    writer.sync()
+    writer.close()
+
+    resumed = History(verbose=False)
+    resumed.load_history(path, file_format="sqlite")
+    assert _state(resumed) == _state(history)
+    assert resumed.redo()
+    assert [c.result for c in resumed.calculations] == [0, 10, 20, 30]
+    assert resumed.undo() and resumed.undo()
+    assert [c.result for c in resumed.calculations] == [0, 1, 2, 3]
+
+def test_writer_batches_commits(tmp_path):
+    path = str(tmp_path / "batched.db")
+    history = History(verbose=False)
+    now = [0.0]
+    writer = SQLiteHistoryWriter(path, history, batch_size=3, batch_interval=10, clock=lambda: now[0])
+
+    def committed_rows():
+        reader = sqlite3.connect(path)
+        try:
+            return reader.execute("SELECT COUNT(*) FROM calculations").fetchone()[0]
+        finally:
+            reader.close()
+
+    for i in range(2):
+        history.add_calculation(_calc(i))
+        writer.sync()
+    assert committed_rows() == 0  # Readers only see committed transactions
+    history.add_calculation(_calc(2))
+    writer.sync()
+    assert committed_rows() == 3
+    history.add_calculation(_calc(3))
+    now[0] = 11.0
+    writer.sync()
+    assert committed_rows() == 4
+    writer.close()
+
+def test_writer_batches_commits_without_an_interval(tmp_path):
+    history = History(verbose=False)
+    writer = SQLiteHistoryWriter(str(tmp_path / "batched.db"), history, batch_size=100)
+    commits = []
+    original = writer.commit
+
+    def counting():
+        commits.append(writer._pending)
+        original()
+    writer.commit = counting
+    for i in range(10):
+        history.add_calculation(_calc(i))
+        writer.sync()
+    assert commits == []
+    writer.close()
+    assert commits == [10]
+
+def test_writer_recovers_from_a_failed_sync(tmp_path, monkeypatch):
+    path = str(tmp_path / "recover.db")
+    history = History(verbose=False)
+    writer = SQLiteHistoryWriter(path, history, batch_size=5)
+    history.add_calculation(_calc(0))
+    writer.sync()
+
+    def failing(*args):
+        raise sqlite3.OperationalError("disk I/O error")
+    monkeypatch.setattr("app.storage._insert_steps", failing)
+    history.add_calculation(_calc(1))
+    with pytest.raises(sqlite3.OperationalError):
+        writer.sync()
+    monkeypatch.undo()
+    # The failed transaction is gone and the next sync writes everything again
+    history.add_calculation(_calc(2))
+    writer.sync()
+    writer.close()
+    loaded = History(verbose=False)
+    loaded.load_history(path, file_format="sqlite")
+    assert _state(loaded) == _state(history)
+
+def test_writer_rewrites_after_a_load(tmp_path):
+    csv_path = str(tmp_path / "history.csv")
+    source = History(verbose=False)
+    source.add_calculations([_calc(7), _calc(8)])
+    source.save_history(csv_path)
+
+    path = str(tmp_path / "history.db")
+    history = History(verbose=False)
+    writer = SQLiteHistoryWriter(path, history)
+    history.add_calculation(_calc(1))
+    writer.sync()
+    history.load_history(csv_path)
+    writer.sync()
+    writer.close()
+
+    loaded = History(verbose=False)
+    loaded.load_history(path, file_format="sqlite")
+    assert _state(loaded) == ([_calc(7), _calc(8)], 0, 0)
+
+def test_autosave_sqlite_records_undo(tmp_path):
+    path = str(tmp_path / "autosave.db")
+    history = History(verbose=False)
+    saver = AutoSaveObserver(history, path, file_format="sqlite", flush_every=100, verbose=False)
+    for i in range(3):
+        history.add_calculation(_calc(i))
+        saver.update(history.calculations[-1])
+    history.undo()
+    saver.save_steps()
+    saver.close()
+
+    loaded = History(verbose=False)
+    loaded.load_history(path, file_format="sqlite")
+    assert loaded.calculations == [_calc(0), _calc(1)]
+    assert loaded.redo()
+
+def test_unknown_format_and_missing_database(tmp_path, capsys):
+    with pytest.raises(ValueError, match="Unknown history file format"):
+        get_backend("xml")
+    history = History()
+    history.load_history(str(tmp_path / "missing.db"), file_format="sqlite")
+    assert "No history file found" in capsys.readouterr().out
+    assert not (tmp_path / "missing.db").exists()